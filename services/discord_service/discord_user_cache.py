@@ -0,0 +1,168 @@
+"""
+Persistent username -> user ID -> DM channel ID cache for the Discord sender.
+
+Without it every DM costs three API calls: a guild member search, opening the
+DM channel, and the send itself. User IDs and DM channel IDs don't change, so
+both are kept in the Firestore `discord_user_cache` collection (one doc per
+lowercased username) and reused across runs until they expire. A run also warms
+the cache by paging through the guild's member list once, which re-confirms
+every username -> user ID mapping in a handful of requests.
+"""
+
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional
+
+import firebase_admin
+from firebase_admin import credentials, firestore
+
+from shared import settings
+
+logger = logging.getLogger(__name__)
+
+CACHE_COLLECTION = "discord_user_cache"
+DEFAULT_TTL = timedelta(days=7)
+# Largest page /guilds/{id}/members will return.
+MEMBERS_PAGE_SIZE = 1000
+# Firestore rejects a WriteBatch holding more than 500 writes.
+MAX_BATCH_WRITES = 500
+
+
+def init_firestore() -> firestore.Client:
+    """Initialize Firebase Admin SDK and return a Firestore client."""
+    if not firebase_admin._apps:
+        cred = credentials.Certificate(str(settings.FIREBASE_SERVICE_ACCOUNT_PATH))
+        firebase_admin.initialize_app(cred, {"projectId": settings.FIREBASE_PROJECT_ID})
+    return firestore.client()
+
+
+class DiscordUserCache:
+    """
+    In-memory view of `discord_user_cache`, loaded once per run and written back
+    with `save()`. Thread-safe, so concurrent senders can share one instance.
+    """
+
+    def __init__(self, db: Optional[firestore.Client] = None, ttl: timedelta = DEFAULT_TTL):
+        self._db = db
+        self.ttl = ttl
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._dirty: set = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(username: str) -> str:
+        return (username or "").strip().lower()
+
+    def load(self) -> int:
+        """Read every unexpired entry from Firestore. Returns the number loaded."""
+        cutoff = (datetime.now(timezone.utc) - self.ttl).isoformat()
+        try:
+            if self._db is None:
+                self._db = init_firestore()
+            docs = self._db.collection(CACHE_COLLECTION).stream()
+            loaded = {
+                doc.id: data
+                for doc, data in ((doc, doc.to_dict() or {}) for doc in docs)
+                if data.get("user_id") and (data.get("updated_at") or "") >= cutoff
+            }
+        except Exception as e:
+            logger.warning(f"Could not load Discord user cache, starting empty: {e}")
+            return 0
+        with self._lock:
+            self._entries.update(loaded)
+        print(f"Discord user cache: loaded {len(loaded)} entries")
+        return len(loaded)
+
+    def warm_up(self, base: str, guild_id: str, get: Callable[..., Any]) -> int:
+        """
+        Page through the guild's members once and record every username -> user ID.
+
+        `get` is the sender's rate-limited GET helper and `base` its API root.
+        Listing members needs the Server Members privileged intent; without it
+        this logs a warning and the sender falls back to a member search per
+        uncached username.
+
+        Returns:
+            Number of members seen
+        """
+        seen = 0
+        after = "0"
+        try:
+            while True:
+                page = get(
+                    f"{base}/guilds/{guild_id}/members",
+                    params={"limit": MEMBERS_PAGE_SIZE, "after": after},
+                )
+                for member in page:
+                    user = member.get("user") or {}
+                    if user.get("username") and user.get("id"):
+                        self.remember(user["username"], str(user["id"]))
+                seen += len(page)
+                if len(page) < MEMBERS_PAGE_SIZE:
+                    break
+                after = str(page[-1]["user"]["id"])
+        except Exception as e:
+            logger.warning(f"Discord member warm-up stopped after {seen} members: {e}")
+        print(f"Discord user cache: warmed up with {seen} guild members")
+        return seen
+
+    def user_id(self, username: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(self._key(username))
+            return entry.get("user_id") if entry else None
+
+    def channel_id(self, username: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(self._key(username))
+            return entry.get("channel_id") if entry else None
+
+    def remember(self, username: str, user_id: str, channel_id: Optional[str] = None) -> None:
+        """Record a mapping. A changed user ID discards the old DM channel."""
+        key = self._key(username)
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            entry = self._entries.get(key) or {}
+            unchanged = entry.get("user_id") == user_id and channel_id in (None, entry.get("channel_id"))
+            # Re-confirming a fresh, unchanged entry needn't cost a write.
+            if unchanged and (entry.get("updated_at") or "") >= (now - self.ttl / 2).isoformat():
+                return
+            if entry.get("user_id") != user_id:
+                entry = {"user_id": user_id, "channel_id": None}
+            if channel_id:
+                entry["channel_id"] = channel_id
+            entry["username"] = key
+            entry["updated_at"] = now.isoformat()
+            self._entries[key] = entry
+            self._dirty.add(key)
+
+    def forget_channel(self, username: str) -> None:
+        """Drop a DM channel that Discord no longer recognises."""
+        key = self._key(username)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry.get("channel_id"):
+                entry["channel_id"] = None
+                self._dirty.add(key)
+
+    def save(self) -> int:
+        """Write changed entries back to Firestore. Returns the number written."""
+        with self._lock:
+            changed = [(key, dict(self._entries[key])) for key in self._dirty]
+            self._dirty.clear()
+        if not changed:
+            return 0
+        try:
+            if self._db is None:
+                self._db = init_firestore()
+            collection = self._db.collection(CACHE_COLLECTION)
+            for start in range(0, len(changed), MAX_BATCH_WRITES):
+                batch = self._db.batch()
+                for key, entry in changed[start:start + MAX_BATCH_WRITES]:
+                    batch.set(collection.document(key), entry)
+                batch.commit()
+        except Exception as e:
+            logger.warning(f"Could not save Discord user cache: {e}")
+            return 0
+        print(f"Discord user cache: saved {len(changed)} entries")
+        return len(changed)
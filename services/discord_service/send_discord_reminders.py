@@ -1,5 +1,7 @@
-import os, requests, time, csv
+import os, requests, time, csv, threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import List, Optional
 
 # Add services directory to path to import shared
 import sys
@@ -8,7 +10,10 @@ if str(SERVICES_DIR) not in sys.path:
     sys.path.append(str(SERVICES_DIR))
 
 from shared import settings
-from shared.delivery_logger import log_discord_delivery
+from shared.delivery_logger import buffered_delivery_logs, log_discord_delivery
+from shared.rate_limit import TokenBucket, backoff_delay
+from shared.outbox import DiscordMessage
+from discord_user_cache import DiscordUserCache
 
 # Settings module loads .env.local
 TOKEN = settings.DISCORD_BOT_TOKEN
@@ -25,38 +30,157 @@ else:
     CSV_FOLDER = BASE_DIR / "message_requests"
 # CSV_FOLDER = Path(os.getenv("DISCORD_CSV_FOLDER", r"discord_service\message_requests"))
 
-def get(url, params=None):
-    r = requests.get(url, headers=HEADERS, params=params, timeout=30)
-    if r.status_code == 429:
-        time.sleep(float(r.json().get("retry_after", 1.0)))
-        return get(url, params)
-    r.raise_for_status()
-    return r.json()
-
-
-def post(url, json, retries=0):
-    MAX_RETRIES = 3
-    r = requests.post(url, headers=HEADERS, json=json, timeout=15)
-    
-    if r.status_code == 429:
-        if retries >= MAX_RETRIES:
-            print(f"❌ Hit max retries ({MAX_RETRIES}) for rate limiting. Giving up.")
-            r.raise_for_status()
+# Discord allows 50 requests/second per bot across all routes, on top of the
+# per-route buckets it reports in X-RateLimit-* headers.
+GLOBAL_REQUESTS_PER_SECOND = 50
+MAX_RETRIES = 3
+MAX_WORKERS = int(os.getenv("DISCORD_MAX_WORKERS", "8"))
+
+SESSION = requests.Session()
+SESSION.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=max(MAX_WORKERS, 10)))
+
+# Path segments whose ID is a "major parameter": Discord gives each channel,
+# guild and webhook its own bucket, while other IDs share the route's bucket.
+MAJOR_PARAMETERS = {"channels", "guilds", "webhooks"}
+
+
+def route_key(method: str, url: str) -> str:
+    """
+    Identify the rate-limit route of a request, e.g.
+    'POST /channels/123/messages' or 'GET /guilds/9/members/search'.
+    Non-major IDs are collapsed so requests that share a bucket share a key.
+    """
+    parts = url.replace(BASE, "").split("?")[0].strip("/").split("/")
+    for i, part in enumerate(parts):
+        if part.isdigit() and (i == 0 or parts[i - 1] not in MAJOR_PARAMETERS):
+            parts[i] = "{id}"
+    return f"{method} /{'/'.join(parts)}"
 
-        retry_after = float(r.json().get('retry_after', 1.0))
-        print(f"Rate limited. Sleeping for {retry_after}s... (Attempt {retries+1}/{MAX_RETRIES})")
-        time.sleep(retry_after)
-        return post(url, json, retries=retries + 1)
-    
-    if r.status_code >= 400:
+
+class DiscordRateLimiter:
+    """
+    Shared view of Discord's rate limits for every sender thread.
+
+    Each response's X-RateLimit-Bucket/Remaining/Reset-After headers are recorded
+    against its route, and a request waits only when its own bucket is exhausted
+    or a global 429 is in effect. A token bucket keeps the overall request rate
+    under the global ceiling.
+    """
+
+    def __init__(self, global_rate: float = GLOBAL_REQUESTS_PER_SECOND):
+        self._lock = threading.Lock()
+        self._route_buckets = {}   # route key -> bucket id
+        self._buckets = {}         # bucket id -> {"limit", "remaining", "reset_at"}
+        self._global_reset_at = 0.0
+        self._global = TokenBucket(global_rate)
+
+    def wait(self, route: str) -> None:
+        """Block until `route` may be called, and reserve one request on its bucket."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                delay = self._global_reset_at - now
+                bucket = self._buckets.get(self._route_buckets.get(route))
+                if bucket is not None:
+                    if now >= bucket["reset_at"]:
+                        bucket["remaining"] = bucket["limit"]
+                    if bucket["remaining"] <= 0:
+                        delay = max(delay, bucket["reset_at"] - now)
+                if delay <= 0:
+                    if bucket is not None:
+                        bucket["remaining"] -= 1
+                    break
+            time.sleep(delay)
+        self._global.acquire()
+
+    def update(self, route: str, response: requests.Response) -> None:
+        """Record the bucket state reported by a response."""
+        headers = response.headers
+        bucket_id = headers.get("X-RateLimit-Bucket")
+        if not bucket_id:
+            return
         try:
-            err = r.json()
-        except Exception:
-            err = {"raw": r.text}
-        # Print Discord's error code & message for quick diagnosis
-        print("HTTP", r.status_code, err)
-        r.raise_for_status()
-    return r.json()
+            limit = int(headers.get("X-RateLimit-Limit", 1))
+            remaining = int(headers.get("X-RateLimit-Remaining", 0))
+            reset_after = float(headers.get("X-RateLimit-Reset-After", 0))
+        except ValueError:
+            return
+        with self._lock:
+            self._route_buckets[route] = bucket_id
+            self._buckets[bucket_id] = {
+                "limit": limit,
+                "remaining": remaining,
+                "reset_at": time.monotonic() + reset_after,
+            }
+
+    def block(self, route: str, retry_after: float, is_global: bool) -> None:
+        """Hold back `route` (or every route, for a global limit) for `retry_after` seconds."""
+        with self._lock:
+            until = time.monotonic() + retry_after
+            if is_global:
+                self._global_reset_at = max(self._global_reset_at, until)
+                return
+            bucket_id = self._route_buckets.setdefault(route, route)
+            bucket = self._buckets.setdefault(bucket_id, {"limit": 1, "remaining": 0, "reset_at": until})
+            bucket["remaining"] = 0
+            bucket["reset_at"] = max(bucket["reset_at"], until)
+
+
+RATE_LIMITER = DiscordRateLimiter()
+
+
+class DeliveryUnknown(Exception):
+    """A DM that may or may not have been delivered; resending could send it twice."""
+
+
+def request(method, url, params=None, json=None, retry_server_errors=True):
+    """
+    Call the Discord API, honouring rate limits.
+    429s are retried up to MAX_RETRIES times with jittered backoff, as are 5xx
+    responses unless `retry_server_errors` is False (for calls that aren't safe
+    to repeat, like sending a message).
+    """
+    route = route_key(method, url)
+    for attempt in range(MAX_RETRIES + 1):
+        RATE_LIMITER.wait(route)
+        r = SESSION.request(method, url, headers=HEADERS, params=params, json=json, timeout=15)
+        RATE_LIMITER.update(route, r)
+
+        if r.status_code == 429:
+            try:
+                body = r.json()
+            except ValueError:
+                body = {}
+            retry_after = float(body.get("retry_after", r.headers.get("Retry-After", 1.0)))
+            is_global = bool(body.get("global")) or r.headers.get("X-RateLimit-Global") == "true"
+            if attempt >= MAX_RETRIES:
+                print(f"❌ Hit max retries ({MAX_RETRIES}) for rate limiting. Giving up.")
+                r.raise_for_status()
+            print(f"Rate limited on {route}. Retrying in {retry_after}s... (Attempt {attempt+1}/{MAX_RETRIES})")
+            RATE_LIMITER.block(route, retry_after + backoff_delay(attempt, base=0.25), is_global)
+            continue
+
+        if r.status_code >= 500 and retry_server_errors and attempt < MAX_RETRIES:
+            time.sleep(backoff_delay(attempt))
+            continue
+
+        if r.status_code >= 400:
+            try:
+                err = r.json()
+            except Exception:
+                err = {"raw": r.text}
+            # Print Discord's error code & message for quick diagnosis
+            print("HTTP", r.status_code, err)
+            r.raise_for_status()
+        return r.json()
+
+
+def get(url, params=None):
+    return request("GET", url, params=params)
+
+
+def post(url, json, retry_server_errors=True):
+    return request("POST", url, json=json, retry_server_errors=retry_server_errors)
 
 def find_member_by_username(guild_id: str, username: str):
     """
@@ -86,25 +210,54 @@ def open_dm(user_id: str) -> str:
 def send_dm(channel_id: str, content: str) -> str:
     """
     Send the DM and return the message ID.
+    A 5xx or transport error may come after Discord accepted the message, so it
+    raises DeliveryUnknown instead of being retried.
     """
-    response = post(f"{BASE}/channels/{channel_id}/messages", {
-        "content": content,
-        "allowed_mentions": {"parse": []}
-    })
+    try:
+        response = post(f"{BASE}/channels/{channel_id}/messages", {
+            "content": content,
+            "allowed_mentions": {"parse": []}
+        }, retry_server_errors=False)
+    except requests.HTTPError as e:
+        if e.response is not None and e.response.status_code >= 500:
+            raise DeliveryUnknown(str(e)) from e
+        raise
+    except requests.RequestException as e:
+        raise DeliveryUnknown(str(e)) from e
     return response.get("id")
 
-def dm_by_username(guild_id: str, username: str, message: str):
-    member = find_member_by_username(guild_id, username)
-    if not member:
-        log_discord_delivery(
-            recipient=username,
-            status="failed",
-            error_message=f"User '{username}' not found in guild {guild_id}"
-        )
-        raise ValueError(f"User '{username}' not found in guild {guild_id}.")
-    user_id = member["user"]["id"]
-    ch_id = open_dm(user_id)
-    message_id = send_dm(ch_id, message)
+def dm_by_username(guild_id: str, username: str, message: str, cache: DiscordUserCache = None):
+    """
+    DM a guild member by username. With a cache, a known user skips the member
+    search and the open-DM call, leaving one request per message.
+    """
+    user_id = cache.user_id(username) if cache else None
+    if user_id is None:
+        member = find_member_by_username(guild_id, username)
+        if not member:
+            log_discord_delivery(
+                recipient=username,
+                status="failed",
+                error_message=f"User '{username}' not found in guild {guild_id}"
+            )
+            raise ValueError(f"User '{username}' not found in guild {guild_id}.")
+        user_id = member["user"]["id"]
+
+    ch_id = cache.channel_id(username) if cache else None
+    if ch_id is None:
+        ch_id = open_dm(user_id)
+    try:
+        message_id = send_dm(ch_id, message)
+    except requests.HTTPError as e:
+        # A cached channel Discord no longer knows: reopen it once and retry.
+        if not cache or e.response is None or e.response.status_code != 404:
+            raise
+        cache.forget_channel(username)
+        ch_id = open_dm(user_id)
+        message_id = send_dm(ch_id, message)
+    if cache:
+        cache.remember(username, user_id, ch_id)
+
     print(f"DM sent to {username} (id={user_id}), message_id={message_id}")
     log_discord_delivery(
         recipient=username,
@@ -133,33 +286,79 @@ def parse_csv_to_dict(file_path):
             dict[discord_id] = message
     return dict
 
-def dm_to_all():
-    if not CSV_FOLDER.exists() or not CSV_FOLDER.is_dir():
-        raise FileNotFoundError(f"CSV folder not found or not a directory: {CSV_FOLDER}")
+def send_one(username: str, message: str, cache: DiscordUserCache = None) -> bool:
+    """DM one user, logging any failure. Returns True if the DM was sent."""
+    try:
+        dm_by_username(GUILD_ID, username, message, cache)
+        return True
+    except ValueError:
+        # User not found - already logged in dm_by_username
+        return False
+    except DeliveryUnknown as e:
+        print(f"⚠️ DM to '{username}' may or may not have been sent ({e}); not retrying, to avoid a duplicate")
+        log_discord_delivery(
+            recipient=username,
+            status="unknown",
+            error_message=str(e)
+        )
+        return False
+    except Exception as e:
+        # HTTP errors (blocked bot, etc.)
+        print(f"⚠️ Failed to send to '{username}'. Reason: {e}")
+        log_discord_delivery(
+            recipient=username,
+            status="failed",
+            error_message=str(e)
+        )
+        return False
+
 
-    # for each csv:
-    for csv_path in CSV_FOLDER.glob("*.csv"):
-        print(f"\n=== Processing {csv_path.name} ===")
-        dict_of_message = parse_csv_to_dict(csv_path)
+def dm_to_all(max_workers: int = MAX_WORKERS, db=None, messages: Optional[List[DiscordMessage]] = None):
+    """
+    DM every reminder. `messages` comes from db_fetch's outbox when the pipeline
+    runs in-process; otherwise the CSVs in CSV_FOLDER are read.
+    """
+    if messages is not None:
+        batches = [("outbox", {
+            m.discord_id.strip(): m.message.strip()
+            for m in messages
+            if m.discord_id.strip() and m.message.strip()
+        })]
+    else:
+        if not CSV_FOLDER.exists() or not CSV_FOLDER.is_dir():
+            raise FileNotFoundError(f"CSV folder not found or not a directory: {CSV_FOLDER}")
+        batches = ((csv_path.name, parse_csv_to_dict(csv_path)) for csv_path in CSV_FOLDER.glob("*.csv"))
 
-        for username, message in dict_of_message.items():
-            if not message:
-                continue
-            try:
-                dm_by_username(GUILD_ID, username, message)
-            except ValueError:
-                # User not found - already logged in dm_by_username
-                pass
-            except Exception as e:
-                # HTTP errors (blocked bot, etc.)
-                print(f"⚠️ Failed to send to '{username}'. Reason: {e}")
-                log_discord_delivery(
-                    recipient=username,
-                    status="failed",
-                    error_message=str(e)
-                )
-            time.sleep(0.5)
+    sent = failed = 0
+    started = time.monotonic()
+
+    # Resolve usernames from the persistent cache plus one pass over the member
+    # list, instead of a member search and an open-DM call per message.
+    cache = DiscordUserCache(db)
+    cache.load()
+    cache.warm_up(BASE, GUILD_ID, get)
+
+    # Delivery logs are committed in batches rather than one write per DM.
+    # DMs go out concurrently; RATE_LIMITER paces them against Discord's buckets.
+    with buffered_delivery_logs(), ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for source, dict_of_message in batches:
+            print(f"\n=== Processing {source} ===")
+
+            jobs = [
+                pool.submit(send_one, username, message, cache)
+                for username, message in dict_of_message.items()
+                if message
+            ]
+            for job in jobs:
+                if job.result():
+                    sent += 1
+                else:
+                    failed += 1
+
+    cache.save()
+    elapsed = time.monotonic() - started
+    print(f"\nDone. Sent: {sent}, Failed: {failed} in {elapsed:.1f}s")
 
 
 if __name__ == "__main__":
-    dm_to_all()
\ No newline at end of file
+    dm_to_all()
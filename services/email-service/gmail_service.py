@@ -5,6 +5,7 @@ import os
 import base64
 import json
 import logging
+import time
 from pathlib import Path
 from typing import Optional, List, Dict, Any
 from email.mime.text import MIMEText
@@ -319,6 +320,72 @@ def create_gmail_service(
     return service
 
 
+def resolve_sender_email(service, sender_email: Optional[str] = None) -> str:
+    """
+    Work out the address messages will be sent from.
+
+    Args:
+        service: Gmail API service instance
+        sender_email: Explicitly configured sender, if any
+
+    Returns:
+        The configured sender, else the authenticated user's address, else a
+        placeholder that Gmail replaces with the authenticated user's address
+    """
+    if sender_email:
+        return sender_email
+    try:
+        # Try to get profile to know the sender email (requires gmail.readonly scope)
+        # But if we don't have that scope, Gmail will still send from authenticated user
+        profile = service.users().getProfile(userId='me').execute()
+        actual_sender = profile.get('emailAddress')
+        logger.info(f"Using authenticated email: {actual_sender}")
+        return actual_sender
+    except Exception:
+        # If we can't get profile, that's okay - Gmail will use authenticated user's email
+        logger.info("Using authenticated user's email (profile access not available)")
+        # Use a placeholder - Gmail will replace it with the actual authenticated email
+        return "noreply@autoremind.com"
+
+
+class GmailSession:
+    """
+    An authenticated Gmail client and resolved sender address, shared by every
+    send in a run.
+
+    Authenticating reads the credentials file, builds the discovery client and,
+    for service accounts, makes a test getProfile call. Doing that once per run
+    instead of once per recipient is what makes large sends affordable.
+    """
+
+    def __init__(self, service, sender_email: str):
+        self.service = service
+        self.sender_email = sender_email
+
+    @classmethod
+    def create(
+        cls,
+        credentials_path: str = str(settings.OAUTH_CLIENT_SECRET_PATH),
+        sender_email: str = None,
+        token_path: str = str(settings.TOKEN_PATH),
+        use_service_account: bool = True
+    ) -> "GmailSession":
+        """
+        Authenticate once and return a session for the rest of the run.
+
+        Args:
+            credentials_path: Path to credentials JSON file (service account or OAuth client)
+            sender_email: Email address to send from (required for service account)
+            token_path: Path to store/load the OAuth token (only used for OAuth method)
+            use_service_account: If True, try service account first; if False, use OAuth
+
+        Returns:
+            GmailSession instance
+        """
+        service = create_gmail_service(credentials_path, sender_email, token_path, use_service_account)
+        return cls(service, resolve_sender_email(service, sender_email))
+
+
 def create_message(
     sender: str,
     to: str,
@@ -356,45 +423,47 @@ def create_message(
     return {'raw': raw_message}
 
 
-def send_gmail_reminder(
+def build_reminder_message(
+    sender: str,
     student_email: str,
     student_name: str,
     assignment_name: str,
     resources: Optional[List[Any]] = None,
     course_code: str = "",
-    credentials_path: str = str(settings.OAUTH_CLIENT_SECRET_PATH),
-    sender_email: str = None,
-    token_path: str = str(settings.TOKEN_PATH),
     message_body: Optional[str] = None,
-    message_kind: str = "due"
-) -> bool:
+    message_kind: str = "due",
+    message_html: Optional[str] = None
+) -> Dict[str, str]:
     """
-    Send a Gmail reminder to a student.
+    Build the Gmail message for one reminder.
 
     Args:
+        sender: Sender email address
         student_email: Student email address
         student_name: Student name or ID
         assignment_name: Name of the assignment (e.g., "Project 1: Name of Project")
-        resources: Optional list of resource objects or links. If None, will fetch from Supabase.
-        course_code: Optional course code for fetching resources from Supabase
-        credentials_path: Path to OAuth 2.0 client credentials JSON file
-        sender_email: Email address to send from (optional, uses authenticated user if not provided)
-        token_path: Path to store/load the OAuth token
-        message_body: Optional pre-composed email body. When provided, it is sent
-            verbatim (covering all of the student's assignments) and the
-            motivating template / resource fetch are skipped.
-        message_kind: "release" or "due". Only consulted when message_body is
-            provided; selects the subject line so it doesn't contradict a
-            release-only body. Defaults to "due" for any missing/unrecognized
-            value, preserving prior behavior.
+        resources: Optional list of resource objects or links. If None, will fetch from Firestore.
+        course_code: Optional course code for fetching resources from Firestore
+        message_body: Optional pre-composed email body, sent verbatim
+        message_kind: "release" or "due"; selects the subject for a pre-composed body
+        message_html: Optional HTML alternative to a pre-composed body, sent as
+            the HTML part alongside it
 
     Returns:
-        True if email was sent successfully, False otherwise
+        Dictionary with 'raw' key containing base64-encoded message
     """
-    try:
+    if message_body is not None:
+        # Use the pre-composed combined message verbatim.
+        email_body = message_body
+        if message_kind == "release":
+            subject = "New assignments released!"
+        else:
+            # Covers "due" and any missing/unrecognized value.
+            subject = "Reminder: You have assignments due soon!"
+    else:
         # Only fetch resources when we're going to build the body ourselves.
         # A caller-supplied message_body already contains any resource links.
-        if message_body is None and resources is None:
+        if resources is None:
             assignment_code = extract_assignment_code(assignment_name)
             if assignment_code:
                 logger.info(f"Fetching resources for assignment code: {assignment_code}")
@@ -403,69 +472,60 @@ def send_gmail_reminder(
                 logger.warning(f"Could not extract assignment code from: {assignment_name}")
                 resources = []
 
-        # Create Gmail service
-        # Try service account first (for automation), fall back to OAuth if needed
-        service = create_gmail_service(credentials_path, sender_email, token_path, use_service_account=True)
-        
-        # Get sender email - try to get from profile, but if that fails,
-        # Gmail will automatically use the authenticated user's email when sending
-        actual_sender = sender_email
-        if not actual_sender:
-            try:
-                # Try to get profile to know the sender email (requires gmail.readonly scope)
-                # But if we don't have that scope, Gmail will still send from authenticated user
-                profile = service.users().getProfile(userId='me').execute()
-                actual_sender = profile.get('emailAddress')
-                logger.info(f"Using authenticated email: {actual_sender}")
-            except Exception as e:
-                # If we can't get profile, that's okay - Gmail will use authenticated user's email
-                logger.info("Using authenticated user's email (profile access not available)")
-                # Use a placeholder - Gmail will replace it with the actual authenticated email
-                actual_sender = "noreply@autoremind.com"
-        
-        if message_body is not None:
-            # Use the pre-composed combined message verbatim.
-            email_body = message_body
-            if message_kind == "release":
-                subject = "New assignments released!"
-            else:
-                # Covers "due" and any missing/unrecognized value.
-                subject = "Reminder: You have assignments due soon!"
-        else:
-            # Format resources
-            resources_text = format_resources(resources)
-
-            # Create email body using a random motivating template
-            email_body = get_motivating_email_body(
-                student_name=student_name,
-                assignment_name=assignment_name,
-                resources_text=resources_text
-            )
+        # Format resources
+        resources_text = format_resources(resources)
 
-            # Create subject
-            subject = f"Reminder: {assignment_name} is due soon!"
-        
-        # Create and send message
-        # Note: When using userId='me', Gmail automatically sets From to authenticated user's email
-        message = create_message(
-            sender=actual_sender,
-            to=student_email,
-            subject=subject,
-            message_text=email_body
+        # Create email body using a random motivating template
+        email_body = get_motivating_email_body(
+            student_name=student_name,
+            assignment_name=assignment_name,
+            resources_text=resources_text
         )
-        
-        sent_message = service.users().messages().send(
-            userId='me',
-            body=message
-        ).execute()
 
-        message_id = sent_message.get('id')
+        # Create subject
+        subject = f"Reminder: {assignment_name} is due soon!"
+        # An HTML part only ever accompanies the pre-composed body it renders
+        message_html = None
+
+    # Note: When using userId='me', Gmail automatically sets From to authenticated user's email
+    return create_message(
+        sender=sender,
+        to=student_email,
+        subject=subject,
+        message_text=email_body,
+        message_html=message_html
+    )
+
+
+def _log_send_result(
+    student_email: str,
+    student_name: str,
+    assignment_name: str,
+    message_id: Optional[str] = None,
+    error: Optional[Exception] = None,
+    unknown: bool = False
+) -> None:
+    """
+    Write the outcome of one send to the application log and the delivery log.
+    `unknown` marks a send that may have gone through despite `error`.
+    """
+    if unknown:
+        logger.warning(
+            f"Email to {student_email} for {assignment_name} may or may not have been "
+            f"sent ({error}); not retrying, to avoid a duplicate"
+        )
+        log_email_delivery(
+            recipient=student_email,
+            status="unknown",
+            assignment_name=assignment_name,
+            recipient_name=student_name,
+            error_message=str(error)
+        )
+    elif error is None:
         logger.info(
             f"Email sent successfully to {student_email} for {assignment_name}. "
             f"Message ID: {message_id}"
         )
-
-        # Log successful delivery
         log_email_delivery(
             recipient=student_email,
             status="sent",
@@ -473,23 +533,209 @@ def send_gmail_reminder(
             assignment_name=assignment_name,
             recipient_name=student_name
         )
-
-        return True
-
-    except Exception as e:
+    else:
         logger.error(
             f"Failed to send email to {student_email} "
-            f"for {assignment_name}: {str(e)}"
+            f"for {assignment_name}: {str(error)}"
         )
-
-        # Log failed delivery
         log_email_delivery(
             recipient=student_email,
             status="failed",
             assignment_name=assignment_name,
             recipient_name=student_name,
-            error_message=str(e)
+            error_message=str(error)
+        )
+
+
+def send_gmail_reminder(
+    student_email: str,
+    student_name: str,
+    assignment_name: str,
+    resources: Optional[List[Any]] = None,
+    course_code: str = "",
+    credentials_path: str = str(settings.OAUTH_CLIENT_SECRET_PATH),
+    sender_email: str = None,
+    token_path: str = str(settings.TOKEN_PATH),
+    message_body: Optional[str] = None,
+    message_kind: str = "due",
+    session: Optional[GmailSession] = None,
+    message_html: Optional[str] = None
+) -> bool:
+    """
+    Send a Gmail reminder to a student.
+
+    Args:
+        student_email: Student email address
+        student_name: Student name or ID
+        assignment_name: Name of the assignment (e.g., "Project 1: Name of Project")
+        resources: Optional list of resource objects or links. If None, will fetch from Supabase.
+        course_code: Optional course code for fetching resources from Supabase
+        credentials_path: Path to OAuth 2.0 client credentials JSON file
+        sender_email: Email address to send from (optional, uses authenticated user if not provided)
+        token_path: Path to store/load the OAuth token
+        message_body: Optional pre-composed email body. When provided, it is sent
+            verbatim (covering all of the student's assignments) and the
+            motivating template / resource fetch are skipped.
+        message_kind: "release" or "due". Only consulted when message_body is
+            provided; selects the subject line so it doesn't contradict a
+            release-only body. Defaults to "due" for any missing/unrecognized
+            value, preserving prior behavior.
+        session: Authenticated session to send through. When omitted, a new
+            one is created for this message alone; callers sending more than
+            one email should create a session once and pass it in.
+        message_html: Optional HTML rendering of message_body. When given, the
+            email goes out as multipart/alternative with message_body as its
+            plain-text part.
+
+    Returns:
+        True if email was sent successfully, False otherwise
+    """
+    try:
+        # Authenticate only if the caller didn't hand us a session.
+        # Try service account first (for automation), fall back to OAuth if needed
+        if session is None:
+            session = GmailSession.create(credentials_path, sender_email, token_path, use_service_account=True)
+
+        message = build_reminder_message(
+            sender=session.sender_email,
+            student_email=student_email,
+            student_name=student_name,
+            assignment_name=assignment_name,
+            resources=resources,
+            course_code=course_code,
+            message_body=message_body,
+            message_kind=message_kind,
+            message_html=message_html
         )
 
+        sent_message = session.service.users().messages().send(
+            userId='me',
+            body=message
+        ).execute()
+
+        _log_send_result(student_email, student_name, assignment_name, message_id=sent_message.get('id'))
+        return True
+
+    except Exception as e:
+        _log_send_result(student_email, student_name, assignment_name, error=e)
         return False
 
+
+# Gmail accepts at most 100 calls per HTTP batch, and recommends no more than 50
+# because larger batches tend to trip the per-user sending rate limit.
+GMAIL_MAX_BATCH_SIZE = 100
+DEFAULT_GMAIL_BATCH_SIZE = 50
+# Items rate limited with this status were not sent and are retried in a later batch.
+RETRYABLE_HTTP_STATUSES = {429}
+# A server error doesn't say whether the message went out, so those items are
+# logged as unknown rather than resent.
+AMBIGUOUS_HTTP_STATUSES = {500, 502, 503, 504}
+MAX_BATCH_ATTEMPTS = 3
+
+
+def _http_status(error: Exception) -> Optional[int]:
+    status = getattr(getattr(error, "resp", None), "status", None)
+    try:
+        return int(status)
+    except (TypeError, ValueError):
+        return None
+
+
+def send_gmail_reminders_batch(
+    session: GmailSession,
+    email_requests: List[Dict[str, Any]],
+    batch_size: int = DEFAULT_GMAIL_BATCH_SIZE,
+    retry_delay_seconds: float = 2.0
+) -> List[bool]:
+    """
+    Send many reminders through Gmail's HTTP batch endpoint.
+
+    Each batch carries up to `batch_size` messages().send() calls in a single
+    HTTP request. Results come back per item, so one bad address fails only its
+    own send: it is logged to the delivery log and the rest of the batch goes
+    through. Items rejected for rate limiting are retried in a later batch, up
+    to MAX_BATCH_ATTEMPTS times. A send that may have gone out anyway (a
+    server error on the item, or no response because the batch request itself
+    failed) is logged with status "unknown" and never resent, so no student is
+    emailed twice.
+
+    Args:
+        session: Authenticated Gmail session
+        email_requests: One dict per email, holding the keyword arguments of
+            build_reminder_message other than `sender` (student_email,
+            student_name, assignment_name, and optionally resources,
+            course_code, message_body, message_kind, message_html)
+        batch_size: Calls per HTTP batch (capped at GMAIL_MAX_BATCH_SIZE)
+        retry_delay_seconds: Pause before a batch that retries earlier failures
+
+    Returns:
+        One bool per request, in order: True if that email was confirmed sent
+    """
+    batch_size = max(1, min(batch_size, GMAIL_MAX_BATCH_SIZE))
+    results = [False] * len(email_requests)
+    attempts = [0] * len(email_requests)
+    pending = list(range(len(email_requests)))
+
+    def describe(idx: int):
+        request = email_requests[idx]
+        return (
+            request["student_email"],
+            request.get("student_name", ""),
+            request.get("assignment_name", ""),
+        )
+
+    while pending:
+        chunk, pending = pending[:batch_size], pending[batch_size:]
+        retry: List[int] = []
+        completed: set = set()
+
+        def on_response(request_id, response, exception):
+            idx = int(request_id)
+            completed.add(idx)
+            if exception is None:
+                results[idx] = True
+                _log_send_result(*describe(idx), message_id=(response or {}).get('id'))
+            elif _http_status(exception) in RETRYABLE_HTTP_STATUSES and attempts[idx] < MAX_BATCH_ATTEMPTS:
+                logger.warning(f"Retrying email to {describe(idx)[0]} after: {exception}")
+                retry.append(idx)
+            elif _http_status(exception) in AMBIGUOUS_HTTP_STATUSES:
+                _log_send_result(*describe(idx), error=exception, unknown=True)
+            else:
+                _log_send_result(*describe(idx), error=exception)
+
+        batch = session.service.new_batch_http_request(callback=on_response)
+        queued: List[int] = []
+        for idx in chunk:
+            attempts[idx] += 1
+            try:
+                message = build_reminder_message(sender=session.sender_email, **email_requests[idx])
+            except Exception as e:
+                _log_send_result(*describe(idx), error=e)
+                continue
+            batch.add(
+                session.service.users().messages().send(userId='me', body=message),
+                request_id=str(idx)
+            )
+            queued.append(idx)
+
+        if not queued:
+            continue
+
+        try:
+            batch.execute()
+        except Exception as e:
+            # The batch request itself failed (e.g. a transport error). An item
+            # without a callback may still have been sent before the failure, and
+            # resending it could email the student twice.
+            logger.error(f"Gmail batch of {len(queued)} failed: {e}")
+            for idx in queued:
+                if idx not in completed:
+                    _log_send_result(*describe(idx), error=e, unknown=True)
+
+        if retry:
+            time.sleep(retry_delay_seconds)
+            pending = retry + pending
+
+    sent = sum(results)
+    logger.info(f"Gmail batch send complete: {sent} sent, {len(results) - sent} failed")
+    return results
@@ -10,8 +10,13 @@ import logging
 import subprocess
 import pandas as pd
 from pathlib import Path
-from typing import Dict, List, Optional
-from gmail_service import send_gmail_reminder
+from typing import Any, Dict, List, Optional
+from gmail_service import (
+    DEFAULT_GMAIL_BATCH_SIZE,
+    GmailSession,
+    send_gmail_reminder,
+    send_gmail_reminders_batch,
+)
 
 # Import shared settings
 import sys
@@ -23,6 +28,8 @@ if str(SERVICES_DIR) not in sys.path:
     sys.path.append(str(SERVICES_DIR))
 
 from shared import settings
+from shared.delivery_logger import buffered_delivery_logs
+from shared.outbox import EmailMessage, to_row
 
 # Configure logging
 logging.basicConfig(
@@ -72,11 +79,85 @@ def get_student_name(row: Dict) -> str:
     return "Student"
 
 
+def email_request_from_row(row: Dict) -> Optional[Dict[str, Any]]:
+    """
+    Turn one message request CSV row into send_gmail_reminder arguments.
+    
+    Args:
+        row: CSV row dictionary
+        
+    Returns:
+        Dictionary of send arguments, or None if the row has no email address
+    """
+    email = row.get('email')
+    if pd.isna(email) or not str(email).strip():
+        return None
+
+    # Prefer the pre-composed combined message (covers all of the student's
+    # due assignments). Falls back to the templated, per-assignment email when
+    # the column is absent/empty.
+    message_body = row.get('message_requests')
+    if pd.isna(message_body) or not str(message_body).strip():
+        message_body = None
+    else:
+        message_body = str(message_body)
+
+    # The column may be absent (CSV written before this change, or the
+    # templated fallback path); default to "due" either way.
+    message_kind = row.get('message_kind')
+    if pd.isna(message_kind) or not str(message_kind).strip():
+        message_kind = "due"
+    else:
+        message_kind = str(message_kind)
+
+    # HTML part of the same message; absent for CSVs written before it existed
+    message_html = row.get('message_html')
+    if message_body is None or pd.isna(message_html) or not str(message_html).strip():
+        message_html = None
+    else:
+        message_html = str(message_html)
+
+    return {
+        "student_email": str(email).strip(),
+        "student_name": get_student_name(row),
+        "assignment_name": row.get('assignment', 'Assignment'),
+        "message_body": message_body,
+        "message_kind": message_kind,
+        "message_html": message_html,
+    }
+
+
+def send_email_requests(
+    email_requests: List[Dict[str, Any]],
+    session: GmailSession,
+    resources: List[str] = None,
+    batch_size: int = 1
+) -> List[bool]:
+    """
+    Send a list of reminders, one at a time or in Gmail HTTP batches.
+    
+    Args:
+        email_requests: Send arguments as returned by email_request_from_row
+        session: Authenticated Gmail session
+        resources: Optional list of resource links for all students
+        batch_size: Emails per HTTP batch; 1 sends each email on its own
+        
+    Returns:
+        One bool per request, in order: True if that email was sent
+    """
+    email_requests = [{**request, "resources": resources} for request in email_requests]
+    if batch_size > 1:
+        return send_gmail_reminders_batch(session, email_requests, batch_size=batch_size)
+    return [send_gmail_reminder(**request, session=session) for request in email_requests]
+
+
 def process_message_request_file(
     file_path: Path,
     credentials_path: str = str(settings.OAUTH_CLIENT_SECRET_PATH),
     sender_email: str = "autoremind@yourdomain.com",
-    resources: List[str] = None
+    resources: List[str] = None,
+    session: Optional[GmailSession] = None,
+    batch_size: int = 1
 ) -> Dict[str, int]:
     """
     Process a single message request CSV file and send Gmail reminders.
@@ -86,6 +167,8 @@ def process_message_request_file(
         credentials_path: Path to Google service account credentials
         sender_email: Email address to send from
         resources: Optional list of resource links for all students
+        session: Authenticated Gmail session; created once here if not provided
+        batch_size: Emails per Gmail HTTP batch; 1 sends each email on its own
         
     Returns:
         Dictionary with counts: sent, skipped, errors
@@ -107,64 +190,31 @@ def process_message_request_file(
             return stats
         
         logger.info(f"Found {len(df)} students in {file_path.name}")
+
+        if session is None:
+            session = GmailSession.create(credentials_path, sender_email)
         
-        # Process each row
+        # Collect one send per row, then send them together
+        email_requests = []
         for index, row in df.iterrows():
             try:
-                # Extract required fields
-                email = row.get('email')
-                assignment = row.get('assignment', 'Assignment')
-
-                # Skip if no email
-                if pd.isna(email) or not str(email).strip():
+                request = email_request_from_row(row)
+                if request is None:
                     logger.warning(f"Row {index + 1}: No email address, skipping")
                     stats["skipped"] += 1
                     continue
-
-                email = str(email).strip()
-
-                # Get student name
-                student_name = get_student_name(row)
-
-                # Prefer the pre-composed combined message (covers all of the
-                # student's due assignments). Falls back to the templated,
-                # per-assignment email when the column is absent/empty.
-                message_body = row.get('message_requests')
-                if pd.isna(message_body) or not str(message_body).strip():
-                    message_body = None
-                else:
-                    message_body = str(message_body)
-
-                # The column may be absent (CSV written before this change, or
-                # the templated fallback path); default to "due" either way.
-                message_kind = row.get('message_kind')
-                if pd.isna(message_kind) or not str(message_kind).strip():
-                    message_kind = "due"
-                else:
-                    message_kind = str(message_kind)
-
-                # Send reminder
-                success = send_gmail_reminder(
-                    student_email=email,
-                    student_name=student_name,
-                    assignment_name=assignment,
-                    resources=resources,
-                    credentials_path=credentials_path,
-                    sender_email=sender_email,
-                    token_path="config/token.json",
-                    message_body=message_body,
-                    message_kind=message_kind
-                )
-                
-                if success:
-                    stats["sent"] += 1
-                    logger.info(f"✓ Sent reminder to {email} for {assignment}")
-                else:
-                    stats["errors"] += 1
-                    
+                email_requests.append(request)
             except Exception as e:
                 logger.error(f"Error processing row {index + 1} in {file_path.name}: {e}")
                 stats["errors"] += 1
+
+        results = send_email_requests(email_requests, session, resources, batch_size)
+        for request, success in zip(email_requests, results):
+            if success:
+                stats["sent"] += 1
+                logger.info(f"✓ Sent reminder to {request['student_email']} for {request['assignment_name']}")
+            else:
+                stats["errors"] += 1
         
         return stats
         
@@ -174,12 +224,64 @@ def process_message_request_file(
         return stats
 
 
+def process_email_messages(
+    messages: List[EmailMessage],
+    credentials_path: str = str(settings.OAUTH_CLIENT_SECRET_PATH),
+    sender_email: str = "autoremind@yourdomain.com",
+    resources: List[str] = None,
+    session: Optional[GmailSession] = None,
+    batch_size: int = 1
+) -> Dict[str, int]:
+    """
+    Send reminders handed over in-process by db_fetch's outbox, with no CSV
+    round trip. Deduplicates by email address like the CSV path.
+    
+    Args:
+        messages: EmailMessage entries from ReminderOutbox.email
+        credentials_path: Path to Google service account credentials
+        sender_email: Email address to send from
+        resources: Optional list of resource links
+        session: Authenticated Gmail session; created on first use if not provided
+        batch_size: Emails per Gmail HTTP batch; 1 sends each email on its own
+        
+    Returns:
+        Dictionary with total counts: sent, skipped, errors
+    """
+    stats = {"sent": 0, "skipped": 0, "errors": 0}
+    email_requests = []
+    queued_emails = set()
+    for message in messages:
+        request = email_request_from_row(to_row(message))
+        if request is None or request["student_email"] in queued_emails:
+            stats["skipped"] += 1
+            continue
+        queued_emails.add(request["student_email"])
+        email_requests.append(request)
+
+    if not email_requests:
+        logger.info("No email reminders in the outbox")
+        return stats
+
+    if session is None:
+        session = GmailSession.create(credentials_path, sender_email)
+    results = send_email_requests(email_requests, session, resources, batch_size)
+    for request, success in zip(email_requests, results):
+        if success:
+            stats["sent"] += 1
+            logger.info(f"✓ Sent reminder to {request['student_email']} for {request['assignment_name']}")
+        else:
+            stats["errors"] += 1
+    return stats
+
+
 def process_all_message_requests(
     message_requests_dir: str = None,
     credentials_path: str = str(settings.OAUTH_CLIENT_SECRET_PATH),
     sender_email: str = "autoremind@yourdomain.com",
     resources: List[str] = None,
-    specific_file: str = None
+    specific_file: str = None,
+    session: Optional[GmailSession] = None,
+    batch_size: int = 1
 ) -> Dict[str, int]:
     """
     Process message request CSV files. Can process a specific file or all files in a directory.
@@ -192,6 +294,9 @@ def process_all_message_requests(
         sender_email: Email address to send from
         resources: Optional list of resource links
         specific_file: If provided, process only this specific file path
+        session: Authenticated Gmail session shared by every send in the run;
+            created on first use if not provided
+        batch_size: Emails per Gmail HTTP batch; 1 sends each email on its own
         
     Returns:
         Dictionary with total counts: sent, skipped, errors
@@ -228,7 +333,9 @@ def process_all_message_requests(
             csv_file,
             credentials_path=credentials_path,
             sender_email=sender_email,
-            resources=resources
+            resources=resources,
+            session=session,
+            batch_size=batch_size
         )
         
         for key in total_stats:
@@ -290,74 +397,51 @@ def process_all_message_requests(
                 continue
             
             logger.info(f"Found {len(df)} students in {csv_file.name}")
+
+            # Authenticate once for the whole run, on the first file with rows.
+            if session is None:
+                session = GmailSession.create(credentials_path, sender_email)
             
             file_sent = 0
             file_skipped = 0
             file_errors = 0
             
-            # Process each row
+            # Collect one send per row, skipping anyone already emailed this run
+            email_requests = []
+            queued_emails = set()
             for index, row in df.iterrows():
                 try:
-                    # Extract required fields
-                    email = row.get('email')
-                    assignment = row.get('assignment', 'Assignment')
+                    request = email_request_from_row(row)
                     
                     # Skip if no email
-                    if pd.isna(email) or not str(email).strip():
+                    if request is None:
                         logger.warning(f"Row {index + 1}: No email address, skipping")
                         file_skipped += 1
                         continue
                     
-                    email = str(email).strip()
+                    email = request["student_email"]
                     
                     # Skip if we've already sent to this email in this run
-                    if email in sent_emails:
+                    if email in sent_emails or email in queued_emails:
                         logger.debug(f"Skipping {email} - already sent email in this run")
                         file_skipped += 1
                         continue
                     
-                    # Get student name
-                    student_name = get_student_name(row)
-
-                    # Prefer the pre-composed combined message (covers all of the
-                    # student's due assignments); fall back to the template.
-                    message_body = row.get('message_requests')
-                    if pd.isna(message_body) or not str(message_body).strip():
-                        message_body = None
-                    else:
-                        message_body = str(message_body)
-
-                    # The column may be absent (CSV written before this change,
-                    # or the templated fallback path); default to "due".
-                    message_kind = row.get('message_kind')
-                    if pd.isna(message_kind) or not str(message_kind).strip():
-                        message_kind = "due"
-                    else:
-                        message_kind = str(message_kind)
-
-                    # Send reminder
-                    success = send_gmail_reminder(
-                        student_email=email,
-                        student_name=student_name,
-                        assignment_name=assignment,
-                        resources=resources,
-                        credentials_path=credentials_path,
-                        sender_email=sender_email,
-                        token_path=str(settings.TOKEN_PATH),
-                        message_body=message_body,
-                        message_kind=message_kind
-                    )
-                    
-                    if success:
-                        sent_emails.add(email)  # Mark as sent
-                        file_sent += 1
-                        logger.info(f"✓ Sent reminder to {email} for {assignment}")
-                    else:
-                        file_errors += 1
+                    queued_emails.add(email)
+                    email_requests.append(request)
                         
                 except Exception as e:
                     logger.error(f"Error processing row {index + 1} in {csv_file.name}: {e}")
                     file_errors += 1
+
+            results = send_email_requests(email_requests, session, resources, batch_size)
+            for request, success in zip(email_requests, results):
+                if success:
+                    sent_emails.add(request["student_email"])  # Mark as sent
+                    file_sent += 1
+                    logger.info(f"✓ Sent reminder to {request['student_email']} for {request['assignment_name']}")
+                else:
+                    file_errors += 1
             
             # Aggregate stats
             total_stats["sent"] += file_sent
@@ -437,9 +521,12 @@ def run_db_fetch(generate_message_requests: bool = True) -> bool:
         return False
 
 
-def main():
+def main(argv: Optional[List[str]] = None, messages: Optional[List[EmailMessage]] = None):
     """
     Main entry point for the Gmail reminder service.
+
+    `messages` comes from db_fetch's outbox when the pipeline runs in-process;
+    they are sent directly and no message request CSVs are read or generated.
     """
     parser = argparse.ArgumentParser(
         description="Send Gmail reminders from message request CSV files"
@@ -468,6 +555,15 @@ def main():
         type=str,
         help="Email address to send from (defaults to autoremind@yourdomain.com)"
     )
+    parser.add_argument(
+        "--batch-size",
+        "-b",
+        type=int,
+        help=(
+            "Send emails in Gmail HTTP batches of this size (max 100). "
+            f"Defaults to GMAIL_BATCH_SIZE, or 1 (one request per email); {DEFAULT_GMAIL_BATCH_SIZE} is recommended"
+        )
+    )
     parser.add_argument(
         "--generate",
         "-g",
@@ -480,7 +576,7 @@ def main():
         help="Skip generating message requests, only process existing CSV files"
     )
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     logger.info("=" * 60)
     logger.info("Starting Gmail Reminder Service for AutoRemind")
@@ -490,7 +586,9 @@ def main():
     # Default behavior: generate if --generate is set, or if no specific file is provided
     # Can be overridden with --no-generate
     should_generate = False
-    if args.no_generate:
+    if messages is not None:
+        logger.info(f"Sending {len(messages)} reminder(s) handed over in-process")
+    elif args.no_generate:
         should_generate = False
         logger.info("Skipping message request generation (--no-generate flag set)")
     elif args.generate:
@@ -512,6 +610,7 @@ def main():
     sender_email = args.sender or os.getenv("GMAIL_SENDER_EMAIL", "autoremind@yourdomain.com")
     message_requests_dir = args.dir or os.getenv("MESSAGE_REQUESTS_DIR")
     specific_file = args.file
+    batch_size = args.batch_size or int(os.getenv("GMAIL_BATCH_SIZE", "1"))
     
     # Validate credentials file exists
     base_dir = Path(__file__).parent
@@ -527,17 +626,28 @@ def main():
     
     try:
         # Process message request files
-        if specific_file:
+        if messages is None and specific_file:
             logger.info(f"Processing specific file: {specific_file}")
-        else:
+        elif messages is None:
             logger.info("Processing all message request files...")
         
-        stats = process_all_message_requests(
-            message_requests_dir=message_requests_dir,
-            credentials_path=str(creds_path),
-            sender_email=sender_email,
-            specific_file=specific_file
-        )
+        # Delivery logs are committed in batches rather than one write per email
+        with buffered_delivery_logs():
+            if messages is not None:
+                stats = process_email_messages(
+                    messages,
+                    credentials_path=str(creds_path),
+                    sender_email=sender_email,
+                    batch_size=batch_size
+                )
+            else:
+                stats = process_all_message_requests(
+                    message_requests_dir=message_requests_dir,
+                    credentials_path=str(creds_path),
+                    sender_email=sender_email,
+                    specific_file=specific_file,
+                    batch_size=batch_size
+                )
         
         # Print summary
         logger.info("=" * 60)
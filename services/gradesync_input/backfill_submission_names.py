@@ -0,0 +1,91 @@
+"""Backfill: strip surrounding whitespace from stored submission assignment names.
+
+The daily pipeline reads assignment_submissions only for today's live assignments,
+with `in` queries on the exact (stripped) catalog name. A submission whose stored
+assignment_name carries extra whitespace is never read, so the student looks like
+they haven't submitted and gets reminded anyway. gradesync_to_db now writes
+stripped names; this fixes the docs written before it did. Document IDs are left
+as they are.
+
+Dry run by default — prints the planned writes and changes nothing. Pass --apply to
+commit them.
+
+    python3 services/gradesync_input/backfill_submission_names.py
+    python3 services/gradesync_input/backfill_submission_names.py --apply
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+SUBMISSIONS_COLLECTION = "assignment_submissions"
+# Firestore batches hold at most 500 writes
+BATCH_SIZE = 499
+
+
+def decide_assignment_name(submission: Dict[str, Any]) -> Optional[str]:
+    """Return the assignment_name to write, or None to leave the doc untouched."""
+    name = submission.get("assignment_name")
+    if not isinstance(name, str) or name == name.strip():
+        return None
+    return name.strip()
+
+
+def plan_updates(db) -> list:
+    """(doc_id, old_name, new_name) for every submission whose name needs stripping."""
+    planned = []
+    for doc in db.collection(SUBMISSIONS_COLLECTION).select(["assignment_name"]).stream():
+        submission = doc.to_dict() or {}
+        new_name = decide_assignment_name(submission)
+        if new_name is not None:
+            planned.append((doc.id, submission["assignment_name"], new_name))
+    return planned
+
+
+def apply_updates(db, planned: list) -> None:
+    for start in range(0, len(planned), BATCH_SIZE):
+        batch = db.batch()
+        for doc_id, _, new_name in planned[start:start + BATCH_SIZE]:
+            batch.update(db.collection(SUBMISSIONS_COLLECTION).document(doc_id), {"assignment_name": new_name})
+        batch.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--apply", action="store_true", help="Commit the writes (default: dry run)")
+    args = parser.parse_args()
+
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+    from shared import settings
+
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(
+            credentials.Certificate(str(settings.FIREBASE_SERVICE_ACCOUNT_PATH)),
+            {"projectId": settings.FIREBASE_PROJECT_ID},
+        )
+    db = firestore.client()
+
+    planned = plan_updates(db)
+    if not planned:
+        print("Nothing to backfill — every submission's assignment_name is already stripped.")
+        return
+
+    for doc_id, old_name, new_name in sorted(planned, key=lambda p: p[0]):
+        print(f"  {doc_id:60} {old_name!r} -> {new_name!r}")
+
+    print(f"\n{len(planned)} submission(s) would be updated.")
+
+    if not args.apply:
+        print("\nDRY RUN — nothing written. Re-run with --apply to commit.")
+        return
+
+    apply_updates(db, planned)
+    print(f"\n✅ Updated {len(planned)} submission doc(s).")
+
+
+if __name__ == "__main__":
+    main()
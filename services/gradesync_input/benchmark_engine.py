@@ -0,0 +1,209 @@
+"""
+Benchmark the reminder engine end to end on a synthetic term, against the
+tests' in-memory Firestore (fake_firestore.FakeFirestore).
+
+Generates students, deadlines, resources, submissions, Canvas deadlines and
+study participants across several courses, then times what a reminder run does
+short of printing and writing CSVs: load_run_context, per-student evaluation,
+merging, the study gate and building every channel's message. Reports
+students/sec and the run's peak Python heap, with the per-stage breakdown from
+RUN_METRICS.
+
+    python benchmark_engine.py --students 20000 --courses 4 --engine vectorized
+
+--min-students-per-sec and --max-peak-mb turn it into a check: the script exits
+non-zero when a run falls outside them. It also exits non-zero when date-window
+pruning didn't narrow the synthetic term, since the timings would then be of the
+unpruned engine.
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import db_fetch
+from fake_firestore import FakeFirestore
+
+
+def make_term(args: argparse.Namespace, today: datetime) -> Dict[str, Any]:
+    """A synthetic term: every collection load_run_context reads."""
+    rng = random.Random(args.seed)
+    deadlines, resources = [], []
+    courses = [f"CS{10 + n}" for n in range(args.courses)]
+    names_by_course: Dict[str, List[str]] = {}
+    for course in courses:
+        names = []
+        for n in range(args.assignments):
+            kind = ("Lab", "Homework", "Project", "Quiz")[n % 4]
+            code = f"{kind[:4].upper()}{n:02d}"
+            name = f"{kind} {n}"
+            due = today + timedelta(days=rng.randint(-14, 21), hours=rng.randint(0, 12))
+            release = due - timedelta(days=rng.choice([7, 10, 14]))
+            deadlines.append({
+                "course_code": course, "assignment_code": code, "assignment_name": name,
+                "due": due.replace(tzinfo=None).isoformat(), "release": release.replace(tzinfo=None).isoformat(),
+            })
+            for r in range(args.resources):
+                resources.append({
+                    "course_code": course, "assignment_code": code, "assignment_name": name,
+                    "resource_type": ("spec", "video", "slides")[r % 3],
+                    "resource_name": f"{name} resource {r}",
+                    "link": f"https://example.edu/{course}/{code}/{r}",
+                })
+            names.append(name)
+        names_by_course[course] = names
+
+    students, submissions, canvas, participants = [], [], [], []
+    for n in range(args.students):
+        course = courses[n % len(courses)]
+        email = f"student{n}@berkeley.edu"
+        student = {
+            "id": n, "email": email, "first_name": f"Student{n}", "last_name": "Synthetic",
+            "course_code": course, "days_before_deadline": rng.randint(0, 7),
+            "email_pref": True, "phone_pref": rng.random() < 0.3, "phone_number": f"+1510555{n:04d}",
+            "discord_pref": rng.random() < 0.2, "discord_id": str(10**17 + n),
+            "canvas_connected": rng.random() < args.canvas_rate,
+        }
+        if rng.random() < 0.1:
+            # A personal extension on one assignment
+            student[f"LAB{rng.randrange(0, args.assignments, 4):02d}"] = rng.randint(1, 3)
+        students.append(student)
+        for name in names_by_course[course]:
+            submitted = rng.random() < args.submit_rate
+            submissions.append({
+                "email": email, "assignment_name": name,
+                "status": "2026-01-01T00:00:00" if submitted else "Missing",
+            })
+        if student["canvas_connected"]:
+            for c in range(3):
+                canvas.append({
+                    "email": email, "course_code": "ENG1", "assignment_name": f"Essay {c}",
+                    "due": (today + timedelta(days=rng.randint(0, 7))).isoformat(),
+                    "html_url": f"https://bcourses.berkeley.edu/essay/{c}",
+                })
+        participants.append({"email": email, "group": 1 if rng.random() < 0.8 else 2})
+
+    return {
+        "deadlines": deadlines,
+        "assignment_resources": resources,
+        "students": students,
+        db_fetch.SUBMISSIONS_TABLE: submissions,
+        db_fetch.CANVAS_DEADLINES_TABLE: canvas,
+        db_fetch.STUDY_PARTICIPANTS_TABLE: participants,
+        db_fetch.STUDY_CONFIG_TABLE: {db_fetch.STUDY_CONFIG_DOC: {"access_open": False}},
+    }
+
+
+def run_args(engine: str) -> argparse.Namespace:
+    return argparse.Namespace(
+        debug=False, limit=None, engine=engine, snapshot=None,
+        deadlines_table=db_fetch.DEFAULT_DEADLINES_TABLE, resources_table=db_fetch.DEFAULT_RESOURCES_TABLE,
+    )
+
+
+def run_engine(db: FakeFirestore, engine: str) -> Dict[str, int]:
+    """One reminder run minus printing and CSVs. Returns what it produced."""
+    db_fetch.RUN_METRICS.reset()
+    args = run_args(engine)
+    # The engine's progress prints would dominate the timings
+    with contextlib.redirect_stdout(io.StringIO()):
+        context = db_fetch.load_run_context(db, args)
+        reminders = messages = 0
+        # iter_reminders gives each call its own renderer, so no fragments carry over between runs
+        for entry in db_fetch.gate_reminders(db_fetch.iter_reminders(db, args, context), context.study_access):
+            reminders += 1
+            for _, message_for in db_fetch.CHANNEL_MESSAGES:
+                if message_for(entry):
+                    messages += 1
+    counters = db_fetch.RUN_METRICS.counters
+    return {
+        "students": len(context.students), "reminders": reminders, "messages": messages,
+        "assignment_codes": counters["assignment_codes"], "live_codes": counters["assignment_codes.live"],
+    }
+
+
+def measure(db: FakeFirestore, engine: str, repeat: int) -> Dict[str, Any]:
+    """Best wall time of `repeat` runs, then one traced run for the peak heap."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        produced = run_engine(db, engine)
+        timings.append(time.perf_counter() - started)
+    stages = db_fetch.RUN_METRICS.summary()["stages"]
+
+    tracemalloc.start()
+    try:
+        run_engine(db, engine)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    seconds = min(timings)
+    return {
+        **produced,
+        "seconds": seconds,
+        "students_per_sec": produced["students"] / seconds if seconds else float("inf"),
+        "peak_mb": peak / 2**20,
+        "stages": stages,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the reminder engine on a synthetic term")
+    parser.add_argument("--students", type=int, default=20000, help="Synthetic students across all courses")
+    parser.add_argument("--courses", type=int, default=4)
+    parser.add_argument("--assignments", type=int, default=24, help="Assignments per course")
+    parser.add_argument("--resources", type=int, default=2, help="Resources per assignment")
+    parser.add_argument("--submit-rate", type=float, default=0.6, help="Share of assignments already submitted")
+    parser.add_argument("--canvas-rate", type=float, default=0.1, help="Share of students with Canvas connected")
+    parser.add_argument("--engine", choices=["python", "vectorized", "both"], default="both")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per engine (best is reported)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-students-per-sec", type=float, default=None,
+                        help="Exit non-zero if an engine is slower than this")
+    parser.add_argument("--max-peak-mb", type=float, default=None,
+                        help="Exit non-zero if an engine's peak heap exceeds this")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    today = datetime.now(db_fetch.PROJECT_TZ)
+    db = FakeFirestore(make_term(args, today))
+    engines = ["python", "vectorized"] if args.engine == "both" else [args.engine]
+
+    print(
+        f"🧪 Synthetic term: {args.students} students, {args.courses} courses × "
+        f"{args.assignments} assignments, {len(db.collections[db_fetch.SUBMISSIONS_TABLE])} submissions"
+    )
+    failed = False
+    for engine in engines:
+        result = measure(db, engine, args.repeat)
+        print(
+            f"  {engine:<10} {result['seconds']:.3f}s  {result['students_per_sec']:,.0f} students/s  "
+            f"peak {result['peak_mb']:.1f} MB  ({result['reminders']} reminders, {result['messages']} messages)"
+        )
+        print(f"    date-window pruning: {result['live_codes']} of {result['assignment_codes']} assignment codes live")
+        if result["live_codes"] >= result["assignment_codes"]:
+            # The synthetic term spreads deadlines over five weeks, so some always fall outside every window
+            print(f"❌ {engine}: date-window pruning did not engage; the timings are of the unpruned engine")
+            failed = True
+        slowest = sorted(result["stages"].items(), key=lambda item: item[1]["seconds"], reverse=True)[:5]
+        print("    " + ", ".join(f"{name} {stats['seconds']:.3f}s" for name, stats in slowest))
+        if args.min_students_per_sec is not None and result["students_per_sec"] < args.min_students_per_sec:
+            print(f"❌ {engine}: {result['students_per_sec']:,.0f} students/s is below {args.min_students_per_sec:,.0f}")
+            failed = True
+        if args.max_peak_mb is not None and result["peak_mb"] > args.max_peak_mb:
+            print(f"❌ {engine}: peak {result['peak_mb']:.1f} MB is above {args.max_peak_mb:.1f} MB")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Benchmark reminder message composition: the cached MessageRenderer behind
+compose_message against compose_message_uncached, the same renderer with its
+fragment cache off.
+
+Builds a synthetic roster where, as in a real course, many students share each
+assignment, composes every student's message both ways, checks they agree and
+prints the timings. No Firestore access.
+
+    python benchmark_reminders.py --students 20000 --assignments 12
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+import db_fetch
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark reminder message composition")
+    parser.add_argument("--students", type=int, default=20000, help="Synthetic students to compose for")
+    parser.add_argument("--assignments", type=int, default=12, help="Assignments in the synthetic course")
+    parser.add_argument("--per-student", type=int, default=3, help="Assignments due per student")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes per implementation (best is reported)")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def make_assignments(count: int, today: datetime) -> List[Dict[str, Any]]:
+    assignments = []
+    for n in range(count):
+        due = today + timedelta(days=n % 7, hours=23 - today.hour, minutes=59 - today.minute)
+        assignments.append({
+            "assignment_code": f"LAB{n:02d}",
+            "assignment_name": f"Lab {n}",
+            "personal_deadline": due,
+            "reason": "release" if n % 4 == 0 else "due",
+            "resources": [
+                {"resource_name": f"Lab {n} spec", "resource_type": "spec", "link": f"https://example.edu/lab{n}"},
+                {"resource_name": f"Lab {n} walkthrough", "link": f"https://example.edu/lab{n}/video"},
+            ],
+        })
+    return assignments
+
+
+def make_workload(args: argparse.Namespace, today: datetime) -> List[tuple]:
+    rng = random.Random(args.seed)
+    assignments = make_assignments(args.assignments, today)
+    workload = []
+    for n in range(args.students):
+        picked = [
+            dict(a, offset_days=offset, personal_deadline=a["personal_deadline"] + timedelta(days=offset))
+            for a, offset in ((a, rng.choice([0, 0, 0, 1])) for a in rng.sample(assignments, args.per_student))
+        ]
+        workload.append(({"first_name": f"Student{n}"}, picked))
+    return workload
+
+
+def best_of(repeat: int, run) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> None:
+    args = parse_args()
+    today = datetime.now(db_fetch.PROJECT_TZ)
+    today_local = today.date()
+    workload = make_workload(args, today)
+
+    def uncached():
+        return [db_fetch.compose_message_uncached(student, assignments, today) for student, assignments in workload]
+
+    def cached():
+        # A fresh renderer per pass, as each run gets one
+        renderer = db_fetch.MessageRenderer(today_local)
+        return [renderer.compose(student, assignments) for student, assignments in workload]
+
+    if uncached() != cached():
+        raise SystemExit("❌ Cached and uncached messages differ")
+
+    uncached_seconds = best_of(args.repeat, uncached)
+    cached_seconds = best_of(args.repeat, cached)
+    print(f"📝 Composed {len(workload)} messages ({args.per_student} of {args.assignments} assignments each)")
+    print(f"  uncached: {uncached_seconds:.3f}s")
+    print(f"  cached:   {cached_seconds:.3f}s ({uncached_seconds / cached_seconds:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,16 +3,24 @@
 from __future__ import annotations
 
 import argparse
+import cProfile
 import csv
+import html
 import os
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
 from datetime import datetime, timedelta, date as date_type
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Tuple
 from unicodedata import lookup
 from zoneinfo import ZoneInfo
 
 import firebase_admin
+import numpy as np
 from firebase_admin import credentials, firestore
 
 # Import shared settings
@@ -23,6 +31,32 @@ if str(SERVICES_DIR) not in sys.path:
     sys.path.append(str(SERVICES_DIR))
 
 from shared import settings
+from shared.outbox import (
+    DiscordMessage,
+    EmailMessage,
+    ReminderOutbox,
+    SmsMessage,
+    csv_fieldnames,
+    to_row,
+)
+from message_variants import (
+    DISCORD_MESSAGE_LIMIT,
+    SMS_CONCAT_SEGMENT_CHARS,
+    SMS_SEGMENT_CHARS,
+    MessageVariants,
+    discord_link,
+    escape_markdown,
+    fit_items,
+    gsm7_length,
+    html_document,
+    html_text,
+    sms_overflow,
+    to_gsm7,
+)
+from reminder_model import AssignmentPayload, Channel, Reminder, Student, as_reminder
+from run_metrics import RunMetrics
+from tracing import TRACE_LEVELS, Tracer
+from snapshot_store import SnapshotStore, download_snapshot, upload_snapshot
 
 
 # Berkeley-local time. Naive datetimes (manually-uploaded CSV deadlines) are
@@ -58,7 +92,7 @@ def mask_secret(secret: str) -> str:
     return f"{secret[:4]}...{secret[-4:]}"
 
 
-def parse_args() -> argparse.Namespace:
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description=(
             "Fetch student data, compute personalized deadlines, and draft reminder "
@@ -100,6 +134,25 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Print verbose diagnostics about fetched data and filtering decisions",
     )
+    parser.add_argument(
+        "--engine",
+        choices=["python", "vectorized"],
+        default="python",
+        help=(
+            "How to evaluate which assignments are due for each student. python: one "
+            "build_assignment_payload call per (student, assignment) (default). "
+            "vectorized: NumPy over a students × assignments matrix, same results."
+        ),
+    )
+    parser.add_argument(
+        "--snapshot",
+        default=None,
+        help=(
+            "Path to a local SQLite snapshot of the collections the reminder run "
+            "reads. Only documents whose Firestore update_time changed since the "
+            "last run are re-read; the rest are served from the snapshot."
+        ),
+    )
     parser.add_argument(
         "--discord-csv",
         action="store_true",
@@ -132,7 +185,34 @@ def parse_args() -> argparse.Namespace:
         help=(
             "If set, also write a Gmail reminder CSV (message_requests.csv) with one "
             "row per student in the message_requests directory with columns: "
-            "name, sid, email, assignment, message_requests, message_kind"
+            "name, sid, email, assignment, message_requests, message_kind, message_html"
+        ),
+    )
+    parser.add_argument(
+        "--trace-email",
+        action="append",
+        default=None,
+        help=(
+            "Trace this student's reminder decisions (repeatable). Adds to the "
+            "comma-separated REMINDER_TRACE_EMAILS."
+        ),
+    )
+    parser.add_argument(
+        "--trace-level",
+        choices=TRACE_LEVELS,
+        default=os.getenv("REMINDER_TRACE_LEVEL", "detail"),
+        help=(
+            "summary: one line per traced student outcome. detail: also print every "
+            "assignment evaluation for traced students, as --debug does (default)."
+        ),
+    )
+    parser.add_argument(
+        "--profile",
+        default=None,
+        help=(
+            "Write a cProfile dump of the run to this path (open it with pstats or "
+            "snakeviz). Only the main thread is profiled; the concurrent Firestore "
+            "reads show up as time waiting on their results."
         ),
     )
     parser.add_argument(
@@ -140,7 +220,14 @@ def parse_args() -> argparse.Namespace:
     default=DEFAULT_DEADLINES_TABLE,
     help="Firestore collection name containing deadlines (default: deadlines)",
     )
-    return parser.parse_args()
+    args = parser.parse_args(argv)
+    # argparse only checks choices for values given on the command line, not
+    # for a default taken from the environment.
+    if args.trace_level not in TRACE_LEVELS:
+        parser.error(
+            f"REMINDER_TRACE_LEVEL must be one of {', '.join(TRACE_LEVELS)} (got {args.trace_level!r})"
+        )
+    return args
 
 
 def init_firestore() -> firestore.Client:
@@ -158,23 +245,83 @@ def debug_print(enabled: bool, message: str) -> None:
     if enabled:
         print(f"[debug] {message}")
 
+# Per-run tally of Firestore round trips. Every query issued by this module goes
+# through `record_firestore_read`, so the summary at the end of a run shows whether
+# a change added a per-student query back into the hot path.
+FIRESTORE_READS: Dict[str, int] = {"queries": 0, "documents": 0}
+# Collections are loaded from several threads at once.
+_FIRESTORE_READS_LOCK = threading.Lock()
+
+
+def record_firestore_read(documents: int) -> None:
+    with _FIRESTORE_READS_LOCK:
+        FIRESTORE_READS["queries"] += 1
+        FIRESTORE_READS["documents"] += documents
+
+
+def reset_firestore_reads() -> None:
+    FIRESTORE_READS["queries"] = 0
+    FIRESTORE_READS["documents"] = 0
+
+
+# Stage timings and counters for the current run; summarized as one JSON line
+# at the end of run_reminder_mode.
+RUN_METRICS = RunMetrics()
+
+
+def _timed(stage: str, fn, *args: Any, **kwargs: Any) -> Any:
+    with RUN_METRICS.stage(stage):
+        return fn(*args, **kwargs)
+
+
 def fetch_collection_docs(
     db: firestore.Client,
     collection_name: str,
     limit: Optional[int] = None,
     *,
     debug: bool = False,
+    snapshot: Optional[SnapshotStore] = None,
+    fields: Optional[Sequence[str]] = None,
 ) -> List[Dict[str, Any]]:
+    """
+    Read a collection as a list of dicts. `fields` projects each document
+    server-side to just those fields; documents lacking one simply omit it.
+    """
+    # A limited fetch is a sample, not the collection; it bypasses the snapshot.
+    if snapshot is not None and not limit:
+        delta = snapshot.fetch(db, collection_name, fields=fields)
+        record_firestore_read(delta.listed + delta.changed)
+        debug_print(
+            debug,
+            f"Snapshot '{collection_name}': {len(delta.rows)} docs, "
+            f"{delta.changed} re-read, {delta.deleted} deleted",
+        )
+        return delta.rows
+
     query = db.collection(collection_name)
+    if fields is not None:
+        query = query.select(list(fields))
     if limit:
         query = query.limit(limit)
 
     docs = query.stream()
     rows = [doc.to_dict() for doc in docs]
+    record_firestore_read(len(rows))
     debug_print(debug, f"Fetched {len(rows)} docs from '{collection_name}'")
     return rows
 
 
+# The fields each collection's reader uses, for projected reads. Students are
+# read whole: per-assignment offsets are stored under the assignment code.
+DEADLINE_FIELDS = ("course_code", "assignment_code", "assignment_name", "assignment", "due", "release")
+RESOURCE_FIELDS = ("course_code", "assignment_code", "assignment_name", "resource_type", "resource_name", "link")
+SUBMISSION_FIELDS = ("email", "assignment_name", "status")
+
+SUBMISSIONS_TABLE = "assignment_submissions"
+# Firestore caps the value list of an `in` filter at 30 entries.
+FIRESTORE_IN_QUERY_LIMIT = 30
+
+
 STUDY_PARTICIPANTS_TABLE = "study_participants"
 STUDY_CONFIG_TABLE = "study_config"
 STUDY_CONFIG_DOC = "state"
@@ -194,9 +341,13 @@ def load_study_access(db: firestore.Client, *, debug: bool = False) -> set:
         config_snap = db.collection(STUDY_CONFIG_TABLE).document(STUDY_CONFIG_DOC).get()
         access_open = bool(config_snap.to_dict().get("access_open")) if config_snap.exists else False
 
+        record_firestore_read(1 if config_snap.exists else 0)
+
         access_emails = set()
         total = group1 = group2 = unassigned = 0
-        for doc in db.collection(STUDY_PARTICIPANTS_TABLE).stream():
+        participant_docs = list(db.collection(STUDY_PARTICIPANTS_TABLE).stream())
+        record_firestore_read(len(participant_docs))
+        for doc in participant_docs:
             data = doc.to_dict() or {}
             email = str(data.get("email") or doc.id).strip().lower()
             if not email:
@@ -239,9 +390,14 @@ def parse_deadline(value: str) -> Optional[datetime]:
 # `release` is None when the assignment has no release date of its own (e.g. project
 # checkpoints, which ship with the parent project's handout).
 DeadlineRecord = Dict[str, Optional[datetime]]
-DeadlineMap = Dict[str, Dict[str, Dict[str, DeadlineRecord]]]
+# Per course: "code" and "name" map to records; "project" maps a project number
+# (as written, e.g. "1") to the first name containing "Project {n}".
+DeadlineMap = Dict[str, Dict[str, Dict[str, Any]]]
 
+PROJECT_PHRASE = re.compile(r"Project (\d+)")
 
+
+@lru_cache(maxsize=None)
 def base_assignment_code(code: Optional[str]) -> Optional[str]:
     if not code:
         return None
@@ -314,9 +470,31 @@ def load_deadlines_from_rows(
             ),
         )
 
+    for course_deadlines in deadlines.values():
+        course_deadlines["project"] = build_project_index(course_deadlines["name"])
+
     return deadlines
 
 
+def build_project_index(by_name: Dict[str, DeadlineRecord]) -> Dict[str, str]:
+    """
+    Precompute the "Project {n}" fallback of find_deadline_for_entry.
+
+    That fallback takes the first name (in load order) containing the phrase
+    "Project {n}" anywhere, so "Project 1" also matches "Project 12 Checkpoint".
+    Every digit prefix of each "Project <digits>" in a name is therefore a key,
+    and the first name to claim a key keeps it.
+    """
+    index: Dict[str, str] = {}
+    for name in by_name:
+        for match in PROJECT_PHRASE.finditer(name):
+            digits = match.group(1)
+            for end in range(1, len(digits) + 1):
+                index.setdefault(digits[:end], name)
+    return index
+
+
+@lru_cache(maxsize=None)
 def assignment_number_from_code(code: str) -> Optional[int]:
     match = re.search(r"\d+", code or "")
     if not match:
@@ -343,6 +521,18 @@ def _iter_deadline_maps(
     return order
 
 
+def _match_project_phrase(mapping: Dict[str, Dict[str, Any]], number: int) -> Optional[DeadlineRecord]:
+    """The record of the first name containing "Project {number}", if any."""
+    by_name = mapping.get("name", {})
+    project_index = mapping.get("project")
+    if project_index is None:
+        # Maps not built by load_deadlines_from_rows have no index; scan them.
+        target_phrase = f"Project {number}"
+        return next((record for name, record in by_name.items() if target_phrase in name), None)
+    name = project_index.get(str(number))
+    return by_name.get(name) if name is not None else None
+
+
 def find_deadline_for_entry(
     course_code: str,
     assignment_name: Optional[str],
@@ -391,17 +581,16 @@ def find_deadline_for_entry(
 
     target_phrase = f"Project {number}"
     for scope, mapping in candidates:
-        by_name = mapping.get("name", {})
-        for name, record in by_name.items():
-            if target_phrase in name:
-                debug_print(
-                    debug,
-                    (
-                        f"Matched deadline for code {assignment_code} using phrase "
-                        f"'{target_phrase}' in scope '{scope or 'default'}'"
-                    ),
-                )
-                return record
+        record = _match_project_phrase(mapping, number)
+        if record is not None:
+            debug_print(
+                debug,
+                (
+                    f"Matched deadline for code {assignment_code} using phrase "
+                    f"'{target_phrase}' in scope '{scope or 'default'}'"
+                ),
+            )
+            return record
 
     return None
 
@@ -530,14 +719,14 @@ def get_notification_frequency(student: Dict[str, Any], assignment_code: str) ->
     return max(freq_values[position], 0)
 
 
-def determine_channels(student: Dict[str, Any]) -> List[Dict[str, str]]:
-    channels: List[Dict[str, str]] = []
+def determine_channels(student: Dict[str, Any]) -> List[Channel]:
+    channels: List[Channel] = []
     if student.get("phone_pref") and student.get("phone_number"):
-        channels.append({"type": "sms", "target": str(student["phone_number"])})
+        channels.append(Channel(type="sms", target=str(student["phone_number"])))
     if student.get("email_pref") and student.get("email"):
-        channels.append({"type": "email", "target": str(student["email"])})
+        channels.append(Channel(type="email", target=str(student["email"])))
     if student.get("discord_pref") and student.get("discord_id"):
-        channels.append({"type": "discord", "target": str(student["discord_id"])})
+        channels.append(Channel(type="discord", target=str(student["discord_id"])))
     return channels
 
 
@@ -545,10 +734,29 @@ def determine_channels(student: Dict[str, Any]) -> List[Dict[str, str]]:
 #     return [key for key in student.keys() if key.upper().startswith("PROJ")]
 
 def collect_assignment_codes(student: Dict[str, Any], assignment_lookup: Dict) -> List[str]:
-    all_codes = []
-    for course_code in assignment_lookup:
-        all_codes.extend(assignment_lookup[course_code].keys())
-    return list(set(all_codes))
+    """
+    Codes to evaluate for a student: their own course's catalog only.
+
+    The course bucket already holds the base-code aliases build_assignment_lookup
+    adds, so nothing is lost by skipping the other courses, and the work per
+    student no longer grows with the number of catalogs loaded.
+    """
+    course_code = (student.get("course_code") or "").strip()
+    course_lookup = assignment_lookup.get(course_code) if course_code else None
+    if course_lookup is None:
+        if assignment_lookup:
+            _warn_unroutable_student(student.get("email", "unknown"), course_code)
+        return []
+    return list(course_lookup)
+
+
+def student_offset_days(student: Dict[str, Any], code: str) -> int:
+    """The student's personal extension for `code`, stored as `student[code]`."""
+    offset_raw = student.get(code, 0) or 0
+    try:
+        return int(offset_raw)
+    except (TypeError, ValueError):
+        return 0
 
 
 def compute_personal_deadline(
@@ -559,6 +767,118 @@ def compute_personal_deadline(
     return base_deadline + timedelta(days=offset_days)
 
 
+# ---------------------------------------------------------------------------
+# Date-window index
+#
+# On any given day most assignments are long past due or not yet close, and can't
+# match anyone. An assignment can only fire on a day inside its trigger window:
+# its local due date shifted by the largest personal offset, back by the largest
+# notification window, the project early-reminder day and a day of DST slack,
+# or on its release day. A run evaluates only the codes whose window contains
+# today.
+# ---------------------------------------------------------------------------
+
+
+def roster_window_bounds(
+    students: List[Dict[str, Any]],
+    lookup: Dict[str, Dict[str, Dict[str, Any]]],
+) -> Optional[tuple]:
+    """
+    The widest notification window and the per-code offset range over the roster,
+    as (max_window_days, {code: (min_offset, max_offset)}). Only fields naming an
+    assignment code in the student's own course count as offsets, as in
+    collect_assignment_codes. None if some student's window or offsets can't be
+    bounded, or are beyond MAX_VECTORIZED_OFFSET_DAYS, in which case nothing
+    should be pruned and each student is evaluated (and reported) on its own.
+    """
+    max_window = 0
+    offset_ranges: Dict[str, tuple] = {}
+    try:
+        for student in students:
+            if student.get(DEFAULT_FREQ_FIELD) is not None:
+                max_window = max(max_window, get_notification_frequency(student, ""))
+            else:
+                legacy = [int(v or 0) for k, v in student.items() if k.startswith("notif_freq_")]
+                max_window = max(max_window, *legacy, 0)
+            if max_window > MAX_VECTORIZED_OFFSET_DAYS:
+                return None
+            # sid, phone_number, discord_id and the like parse as huge offsets,
+            # so only the codes the student is actually evaluated on are read.
+            course_code = (student.get("course_code") or "").strip()
+            course_lookup = lookup.get(course_code) if course_code else None
+            if course_lookup is None:
+                continue
+            for code in student.keys() & course_lookup.keys():
+                offset = student_offset_days(student, code)
+                if abs(offset) > MAX_VECTORIZED_OFFSET_DAYS:
+                    return None
+                if offset:
+                    low, high = offset_ranges.get(code, (0, 0))
+                    offset_ranges[code] = (min(low, offset), max(high, offset))
+    except Exception:
+        return None
+    return max_window, offset_ranges
+
+
+def live_codes_on(
+    lookup: Dict[str, Dict[str, Dict[str, Any]]],
+    max_window_days: int,
+    offset_ranges: Dict[str, tuple],
+    day: date_type,
+) -> Dict[str, set]:
+    """{course: codes whose trigger window contains `day`}."""
+    live: Dict[str, set] = {}
+    for course_code, course_lookup in lookup.items():
+        for code, entry in course_lookup.items():
+            deadline = entry.get("deadline")
+            # Without a deadline an assignment can't fire at all, release day included.
+            if not deadline:
+                continue
+            low, high = offset_ranges.get(code, (0, 0))
+            due_local = local_date(deadline)
+            first = due_local + timedelta(days=low - max_window_days - 2)
+            last = due_local + timedelta(days=high + 1)
+            on_release = bool(entry.get("release")) and local_date(entry["release"]) == day
+            if first <= day <= last or on_release:
+                live.setdefault(course_code, set()).add(code)
+    return live
+
+
+def live_assignment_lookup(
+    lookup: Dict[str, Dict[str, Dict[str, Any]]],
+    students: List[Dict[str, Any]],
+    today_local: date_type,
+    *,
+    debug: bool = False,
+) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """
+    `lookup` narrowed to the codes that can fire today for this roster. Every
+    course keeps its bucket (possibly empty), so routing is unchanged.
+    """
+    bounds = roster_window_bounds(students, lookup)
+    if bounds is None:
+        debug_print(debug, "Date-window index: roster has unbounded fields, evaluating every assignment")
+        return lookup
+    try:
+        live = live_codes_on(lookup, *bounds, today_local)
+    except OverflowError:
+        # A deadline near date.min/max; not worth failing the run over
+        debug_print(debug, "Date-window index: window out of date range, evaluating every assignment")
+        return lookup
+    narrowed = {
+        course_code: {code: entry for code, entry in course_lookup.items() if code in live.get(course_code, ())}
+        for course_code, course_lookup in lookup.items()
+    }
+    total = sum(len(course_lookup) for course_lookup in lookup.values())
+    kept = sum(len(course_lookup) for course_lookup in narrowed.values())
+    debug_print(
+        debug,
+        f"Date-window index: {kept} of {total} assignment codes live on {today_local} "
+        f"({total - kept} pruned, max window {bounds[0]}d)",
+    )
+    return narrowed
+
+
 def format_due_datetime(dt_value: datetime) -> str:
     return dt_value.strftime("%Y-%m-%d %H:%M")
 
@@ -587,14 +907,11 @@ def build_assignment_payload(
     today: datetime,
     *,
     debug: bool = False,
-) -> Optional[Dict[str, Any]]:
+) -> Optional[AssignmentPayload]:
     student_email = student.get("email", "unknown")
     student_id = student.get("id", "unknown")
-    
-    # Enhanced debugging for specific email
-    is_target_student = "autoremindberkeley" in str(student_email).lower()
-    
-    if is_target_student or debug:
+
+    if debug:
         print(f"\n{'='*80}")
         print(f"🔍 DEBUG: Evaluating assignment {code} for student:")
         print(f"   Email: {student_email}")
@@ -611,7 +928,7 @@ def build_assignment_payload(
     if course_lookup is None:
         _warn_unroutable_student(student_email, course_code)
 
-    if is_target_student or debug:
+    if debug:
         print(f"   Course code: '{course_code}' (empty='{not course_code}')")
         print(f"   Course lookup found: {course_lookup is not None}")
         if course_lookup:
@@ -620,19 +937,19 @@ def build_assignment_payload(
     entry = course_lookup.get(code) if course_lookup else None
     if not entry and course_lookup:
         alias_code = base_assignment_code(code)
-        if is_target_student or debug:
+        if debug:
             print(f"   Direct lookup for '{code}' failed, trying alias: '{alias_code}'")
         if alias_code:
             entry = course_lookup.get(alias_code)
 
     if not entry:
         msg = f"No assignment data found for {code} in course '{course_code or 'default'}'"
-        if is_target_student or debug:
+        if debug:
             print(f"   ❌ {msg}")
         debug_print(debug, msg)
         return None
 
-    if is_target_student or debug:
+    if debug:
         print(f"   ✅ Found assignment entry: {entry.get('assignment_name', code)}")
         print(f"   Base deadline from entry: {entry.get('deadline')}")
 
@@ -643,24 +960,20 @@ def build_assignment_payload(
         category = derive_assignment_category(entry.get("assignment_name"), code)
         if not category_prefs.get(category.lower(), True):
             msg = f"Skipping {code}: category '{category}' disabled in student prefs"
-            if is_target_student or debug:
+            if debug:
                 print(f"   ❌ {msg}")
             debug_print(debug, msg)
             return None
 
-    offset_raw = student.get(code, 0) or 0
-    try:
-        offset = int(offset_raw)
-    except (TypeError, ValueError):
-        offset = 0
+    offset = student_offset_days(student, code)
     
-    if is_target_student or debug:
+    if debug:
         print(f"   Student offset for {code}: {offset} days")
 
     base_deadline = entry.get("deadline")
     personal_deadline = compute_personal_deadline(base_deadline, offset)
     
-    if is_target_student or debug:
+    if debug:
         print(f"   Base deadline: {base_deadline}")
         print(f"   Personal deadline (base + {offset}): {personal_deadline}")
     
@@ -678,7 +991,7 @@ def build_assignment_payload(
     
     if not personal_deadline:
         msg = f"Skipping {code}: no deadline available"
-        if is_target_student or debug:
+        if debug:
             print(f"   ❌ {msg}")
         debug_print(debug, msg)
         return None
@@ -697,7 +1010,7 @@ def build_assignment_payload(
         is_checkpoint = "checkpoint" in label
         if category == "Project" and not is_checkpoint:
             effective_deadline = personal_deadline - timedelta(days=1)
-            if is_target_student or debug:
+            if debug:
                 print(f"   📌 Project early-reminder ON for {code}: effective deadline shifted back 1 day")
 
     freq_days = get_notification_frequency(student, code)
@@ -705,7 +1018,7 @@ def build_assignment_payload(
     today_local = today.date() if today.tzinfo is None else today.astimezone(PROJECT_TZ).date()
     delta_days = (deadline_local - today_local).days
 
-    if is_target_student or debug:
+    if debug:
         print(f"   Notification frequency (days_before_deadline): {freq_days} days")
         print(f"   Days until deadline (delta_days): {delta_days} days")
         print(f"   Personal deadline date (local): {deadline_local}")
@@ -736,7 +1049,7 @@ def build_assignment_payload(
             msg = f"Skipping {code}: past due (delta_days={delta_days})"
         else:
             msg = f"Skipping {code}: delta {delta_days} != freq {freq_days} and not release day"
-        if is_target_student or debug:
+        if debug:
             print(f"   ❌ {msg}")
         debug_print(debug, msg)
         return None
@@ -746,19 +1059,199 @@ def build_assignment_payload(
     # it wins and the assignment is listed once.
     reason = "due" if due_match else "release"
 
-    if is_target_student or debug:
+    if debug:
         print(f"   ✅ MATCH ({reason})! Will send reminder for {code}")
 
-    return {
-        "assignment_code": code,
-        "assignment_name": entry.get("assignment_name", code),
-        "base_deadline": entry.get("deadline"),
-        "personal_deadline": personal_deadline,
-        "offset_days": offset,
-        "notification_window_days": freq_days,
-        "resources": entry.get("resources", []),
-        "reason": reason,
-    }
+    return AssignmentPayload(
+        assignment_code=code,
+        assignment_name=entry.get("assignment_name", code),
+        base_deadline=entry.get("deadline"),
+        personal_deadline=personal_deadline,
+        offset_days=offset,
+        notification_window_days=freq_days,
+        resources=entry.get("resources", []),
+        reason=reason,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Vectorized evaluation engine (--engine vectorized)
+#
+# Same rules as build_assignment_payload, evaluated for a whole course's students
+# at once: the per-assignment facts (entry, deadline, release day, category) are
+# resolved once per course, the per-student facts (offsets, frequency, prefs) are
+# laid out as a students × codes matrix, and due/release matches come out of a
+# handful of NumPy operations instead of one Python call per pair.
+# ---------------------------------------------------------------------------
+
+ASSIGNMENT_CATEGORIES = ("Lab", "Homework", "Midterm", "Quiz", "Project")
+# Students with larger offsets (or any field the engine can't parse) take the
+# reference path, which reports the problem the same way it always has.
+MAX_VECTORIZED_OFFSET_DAYS = 36500
+
+
+def _resolve_lookup_entry(course_lookup: Dict[str, Dict[str, Any]], code: str) -> Optional[Dict[str, Any]]:
+    """The lookup entry for `code`, falling back to its base-code alias."""
+    entry = course_lookup.get(code)
+    if not entry:
+        alias_code = base_assignment_code(code)
+        if alias_code:
+            entry = course_lookup.get(alias_code)
+    return entry or None
+
+
+def _evaluate_course_vectorized(
+    students: List[Dict[str, Any]],
+    codes: List[str],
+    course_lookup: Dict[str, Dict[str, Any]],
+    today_local: date_type,
+) -> List[Optional[List[AssignmentPayload]]]:
+    """
+    Payloads for each of `students` (all in the course of `course_lookup`), or
+    None for a student the reference path must evaluate instead.
+    """
+    n_students, n_codes = len(students), len(codes)
+
+    # Per-assignment facts, resolved once for the course.
+    entries = [_resolve_lookup_entry(course_lookup, code) for code in codes]
+    bases = [entry.get("deadline") if entry else None for entry in entries]
+    has_deadline = np.array([entry is not None and base is not None for entry, base in zip(entries, bases)], dtype=bool)
+    release_today = np.array(
+        [bool(entry and entry.get("release") and local_date(entry["release"]) == today_local) for entry in entries],
+        dtype=bool,
+    )
+    categories = [
+        derive_assignment_category(entry.get("assignment_name"), code) if entry else "Project"
+        for entry, code in zip(entries, codes)
+    ]
+    category_idx = np.array([ASSIGNMENT_CATEGORIES.index(c) for c in categories], dtype=np.intp)
+    # Day-early shift applies to projects but not their checkpoints.
+    early_eligible = np.array(
+        [
+            bool(entry)
+            and category == "Project"
+            and "checkpoint" not in f"{entry.get('assignment_name') or ''} {code or ''}".lower()
+            for entry, category, code in zip(entries, categories, codes)
+        ],
+        dtype=bool,
+    )
+
+    # Per-student facts as students × codes matrices.
+    code_pos = {code: j for j, code in enumerate(codes)}
+    offsets = np.zeros((n_students, n_codes), dtype=np.int64)
+    freq = np.zeros((n_students, n_codes), dtype=np.int64)
+    disabled_categories = np.zeros((n_students, len(ASSIGNMENT_CATEGORIES)), dtype=bool)
+    early = np.zeros(n_students, dtype=bool)
+    release_opt_in = np.zeros(n_students, dtype=bool)
+    fallback = np.zeros(n_students, dtype=bool)
+    for i, student in enumerate(students):
+        try:
+            # Offsets are sparse: only codes the student has a key for are non-zero.
+            for code in student.keys() & code_pos.keys():
+                offset = student_offset_days(student, code)
+                if abs(offset) > MAX_VECTORIZED_OFFSET_DAYS:
+                    raise OverflowError(offset)
+                offsets[i, code_pos[code]] = offset
+            if student.get(DEFAULT_FREQ_FIELD) is not None:
+                freq[i, :] = get_notification_frequency(student, "")
+            else:
+                freq[i, :] = [get_notification_frequency(student, code) for code in codes]
+            prefs = student.get("category_prefs")
+            if isinstance(prefs, dict):
+                disabled_categories[i] = [not prefs.get(c.lower(), True) for c in ASSIGNMENT_CATEGORIES]
+            early[i] = bool(student.get("project_early_reminder"))
+            release_opt_in[i] = student.get("release_reminder") is not False
+        except Exception:
+            offsets[i, :] = 0
+            fallback[i] = True
+
+    # Local deadline dates for every shift in use. Shifting an aware deadline
+    # by whole days can cross a DST change, so each (shift, code) date comes
+    # from the same datetime arithmetic the reference path does.
+    shifts = offsets - (early[:, None] & early_eligible[None, :])
+    unique_shifts = np.unique(shifts)
+    deadline_ordinals = np.zeros((len(unique_shifts), n_codes), dtype=np.int64)
+    for k, shift in enumerate(unique_shifts):
+        for j, base in enumerate(bases):
+            if has_deadline[j]:
+                deadline_ordinals[k, j] = local_date(base + timedelta(days=int(shift))).toordinal()
+    shift_row = np.searchsorted(unique_shifts, shifts)
+    delta_days = deadline_ordinals[shift_row, np.arange(n_codes)[None, :]] - today_local.toordinal()
+
+    due_match = (delta_days >= 0) & (delta_days == freq)
+    release_match = release_opt_in[:, None] & release_today[None, :]
+    enabled = ~disabled_categories[:, category_idx]
+    matched = has_deadline[None, :] & enabled & (due_match | release_match)
+
+    results: List[Optional[List[AssignmentPayload]]] = []
+    for i in range(n_students):
+        if fallback[i]:
+            results.append(None)
+            continue
+        payloads = []
+        for j in np.flatnonzero(matched[i]):
+            entry, code, offset = entries[j], codes[j], int(offsets[i, j])
+            payloads.append(AssignmentPayload(
+                assignment_code=code,
+                assignment_name=entry.get("assignment_name", code),
+                base_deadline=entry.get("deadline"),
+                personal_deadline=compute_personal_deadline(bases[j], offset),
+                offset_days=offset,
+                notification_window_days=int(freq[i, j]),
+                resources=entry.get("resources", []),
+                reason="due" if due_match[i, j] else "release",
+            ))
+        results.append(payloads)
+    return results
+
+
+def evaluate_payloads_vectorized(
+    students: List[Dict[str, Any]],
+    lookup: Dict[str, Dict[str, Dict[str, Any]]],
+    today: datetime,
+    *,
+    exclude: frozenset = frozenset(),
+) -> Dict[int, List[AssignmentPayload]]:
+    """
+    Evaluate every (student, assignment) pair at once.
+
+    Returns the matching payloads keyed by index into `students`, in the order
+    `build_assignment_payload` would produce them. Indices in `exclude`, and
+    students whose records the engine can't lay out as a matrix (unparseable
+    fields, huge offsets), are left out; callers evaluate those with the
+    reference path.
+    """
+    today_local = today.date() if today.tzinfo is None else today.astimezone(PROJECT_TZ).date()
+
+    by_course: Dict[str, List[int]] = {}
+    for idx, student in enumerate(students):
+        if idx in exclude:
+            continue
+        try:
+            course_code = (student.get("course_code") or "").strip()
+        except Exception:
+            continue
+        by_course.setdefault(course_code, []).append(idx)
+
+    results: Dict[int, List[AssignmentPayload]] = {}
+    for course_code, indices in by_course.items():
+        group = [students[idx] for idx in indices]
+        course_lookup = lookup.get(course_code) if course_code else None
+        if course_lookup is None:
+            for student in group:
+                collect_assignment_codes(student, lookup)  # warns about the unroutable student
+            results.update((idx, []) for idx in indices)
+            continue
+        codes = collect_assignment_codes(group[0], lookup)
+        try:
+            course_results = _evaluate_course_vectorized(group, codes, course_lookup, today_local)
+        except Exception as exc:
+            print(f"⚠️  Vectorized engine fell back for course '{course_code}': {exc!r}")
+            continue
+        results.update(
+            (idx, payloads) for idx, payloads in zip(indices, course_results) if payloads is not None
+        )
+    return results
 
 
 def _render_resources(lines: List[str], assignment: Dict[str, Any]) -> None:
@@ -776,143 +1269,358 @@ def _render_resources(lines: List[str], assignment: Dict[str, Any]) -> None:
         lines.append(resource_line)
 
 
-def _render_assignment_bullet(lines: List[str], assignment: Dict[str, Any], bullet: str, label: str) -> None:
-    """Append one assignment's bullet line plus its offset-day note and resources.
+CLOSING_LINE = "Feel free to reach out to course staff if you need any support!"
+# SMS section headings, keyed by "is a release section"
+SMS_HEADINGS = {True: "Just released:", False: "Due soon:"}
+# Segment budget for SMS bodies; assignments past it are summarized
+SMS_MAX_SEGMENTS = int(os.getenv("SMS_MAX_SEGMENTS", "2"))
+
+
+class _Block(NamedTuple):
+    """One assignment's bullet text after the marker, per channel."""
+
+    text: str
+    discord: str
+    html: str
+    sms: str
 
-    `label` is the section-specific text after the "→" (a countdown for due
-    reminders, a bare due date for release reminders); everything else about
-    an assignment's rendering is identical between the two sections.
+
+class MessageRenderer:
     """
-    lines.append(
-        f"{bullet} {assignment['assignment_name']} ({assignment['assignment_code']}) → {label}"
-    )
-    if assignment.get("offset_days"):
-        lines.append(
-            f"  (Class deadline +{assignment['offset_days']} day offset for you.)"
+    Renders reminders for one run day. Every student who shares an assignment
+    (same code, name, reason, deadline and offset) gets the identical bullet
+    text, so each assignment block is rendered once, for every channel, and
+    messages are assembled by joining cached fragments.
+    """
+
+    def __init__(self, today_local: date_type, sms_segments: int = SMS_MAX_SEGMENTS, cache: bool = True):
+        self.today_local = today_local
+        self.sms_segments = sms_segments
+        # Off, every block is rendered from scratch (compose_message_uncached)
+        self.cache = cache
+        # key -> (resources list kept alive so its id() stays unique, block)
+        self._blocks: Dict[tuple, Tuple[Any, _Block]] = {}
+
+    def _days_label(self, due_dt: datetime) -> str:
+        days_until = (local_date(due_dt) - self.today_local).days
+        if days_until == 0:
+            return "due today"
+        if days_until == 1:
+            return "due in 1 day"
+        return f"due in {days_until} days"
+
+    def _label(self, assignment: Dict[str, Any], released: bool) -> str:
+        due_dt = assignment["personal_deadline"]
+        due_date_str = f"{due_dt.strftime('%B')} {due_dt.day}"
+        if released:
+            return f"due on {due_date_str}"
+        return f"{self._days_label(due_dt)}, on {due_date_str}"
+
+    def _sms_label(self, assignment: Dict[str, Any], released: bool) -> str:
+        due_dt = assignment["personal_deadline"]
+        due_date_str = f"{due_dt.strftime('%b')} {due_dt.day}"
+        if released:
+            return f"due {due_date_str}"
+        return f"{self._days_label(due_dt)}, {due_date_str}"
+
+    def block(self, assignment: Dict[str, Any], released: bool) -> _Block:
+        resources = assignment.get("resources") or None
+        key = (
+            assignment["assignment_code"],
+            assignment["assignment_name"],
+            released,
+            assignment["personal_deadline"],
+            assignment.get("offset_days"),
+            id(resources) if resources is not None else None,
+        )
+        cached = self._blocks.get(key)
+        if cached is not None:
+            return cached[1]
+
+        name = assignment["assignment_name"]
+        code = assignment["assignment_code"]
+        label = self._label(assignment, released)
+        offset = assignment.get("offset_days")
+        listed = [res for res in (resources or []) if res.get("resource_name")]
+
+        text = [f"{name} ({code}) → {label}"]
+        discord = [f"**{escape_markdown(name)}** ({escape_markdown(code)}) → {label}"]
+        html_lines = [f"<strong>{html_text(name)}</strong> ({html_text(code)}) &rarr; {html_text(label)}"]
+        if offset:
+            note = f"(Class deadline +{offset} day offset for you.)"
+            text.append(f"  {note}")
+            discord.append(f"  *{note}*")
+            html_lines.append(f"<em>{note}</em>")
+        _render_resources(text, assignment)
+        if listed:
+            discord.append("  Helpful resources:")
+            html_items = []
+            for res in listed:
+                kind = f" [{res['resource_type']}]" if res.get("resource_type") else ""
+                line = f"    • {escape_markdown(res['resource_name'])}{escape_markdown(kind)}"
+                item = f"{html_text(res['resource_name'])}{html_text(kind)}"
+                if res.get("link"):
+                    line += f": {discord_link(res['link'])}"
+                    item = f'<a href="{html.escape(res["link"])}">{item}</a>'
+                discord.append(line)
+                html_items.append(f"<li>{item}</li>")
+            html_lines.append("Helpful resources:<ul>" + "".join(html_items) + "</ul>")
+
+        rendered = _Block(
+            text="\n".join(text),
+            discord="\n".join(discord),
+            html="<br>".join(html_lines),
+            # Resources and offset notes don't fit an SMS budget; the
+            # deadline shown is already the student's own.
+            sms=to_gsm7(f"{name} ({code}) {self._sms_label(assignment, released)}"),
+        )
+        if self.cache:
+            self._blocks[key] = (resources, rendered)
+        return rendered
+
+    @staticmethod
+    def _sections(assignments: List[Dict[str, Any]]) -> List[Tuple[str, List[Dict[str, Any]], bool]]:
+        renderable = [a for a in assignments if a.get("personal_deadline")]
+        # A payload with no reason is a due reminder — Canvas-sourced payloads never set one.
+        released = [a for a in renderable if a.get("reason") == "release"]
+        due_soon = [a for a in renderable if a.get("reason", "due") != "release"]
+        return [
+            (heading, section, is_release)
+            for heading, section, is_release in (
+                ("Just released:", released, True),
+                ("Heads-up: you have upcoming assignments due soon:", due_soon, False),
+            )
+            if section
+        ]
+
+    @staticmethod
+    def _preferred_name(student: Dict[str, Any]) -> str:
+        return (
+            student.get("preferred_first_name")
+            or student.get("first_name")
+            or "there"
+        )
+
+    def compose(self, student: Dict[str, Any], assignments: List[Dict[str, Any]]) -> str:
+        """The plain-text message alone."""
+        return self.render(student, assignments).text
+
+    def render(self, student: Dict[str, Any], assignments: List[Dict[str, Any]]) -> MessageVariants:
+        """Every channel's message, in one pass over the assignments."""
+        sections = self._sections(assignments)
+        number_assignments = sum(len(section) for _, section, _ in sections) > 1
+        name = self._preferred_name(student)
+
+        text = [f"Hey {name},", ""]
+        discord_items: List[str] = []
+        sms_items: List[str] = []
+        # Per SMS item: is it a release notice, for the overflow line
+        sms_releases: List[bool] = []
+        html_paragraphs = [f"Hey {html_text(name)},"]
+        bullet_index = 0
+        for heading, section, is_release in sections:
+            if bullet_index:
+                text.append("")
+            text.append(heading)
+            html_bullets = []
+            for position, assignment in enumerate(section):
+                bullet_index += 1
+                bullet = f"{bullet_index}." if number_assignments else "-"
+                block = self.block(assignment, is_release)
+                text.append(f"{bullet} {block.text}")
+                # Headings ride on their section's first item, so trimming
+                # never leaves one dangling.
+                discord_head = f"\n**{heading}**\n" if position == 0 else ""
+                discord_items.append(f"{discord_head}{bullet} {block.discord}")
+                sms_head = f"{SMS_HEADINGS[is_release]}\n" if position == 0 else ""
+                sms_items.append(f"{sms_head}{bullet} {block.sms}")
+                sms_releases.append(is_release)
+                html_bullets.append(f"<li>{block.html}</li>")
+            tag = "ol" if number_assignments else "ul"
+            start = f' start="{bullet_index - len(section) + 1}"' if number_assignments else ""
+            html_paragraphs.append(
+                f"<strong>{html_text(heading)}</strong><{tag}{start}>{''.join(html_bullets)}</{tag}>"
+            )
+        text += ["", CLOSING_LINE]
+        html_paragraphs.append(html_text(CLOSING_LINE))
+
+        sms_budget = (
+            SMS_SEGMENT_CHARS if self.sms_segments <= 1 else SMS_CONCAT_SEGMENT_CHARS * self.sms_segments
+        )
+        return MessageVariants(
+            text="\n".join(text),
+            discord=fit_items(
+                [f"Hey {escape_markdown(name)},"], discord_items, ["", CLOSING_LINE],
+                fits=lambda body: len(body) <= DISCORD_MESSAGE_LIMIT,
+                overflow=lambda n: f"…and {n} more — check your email for the full list.",
+            ),
+            sms=fit_items(
+                [to_gsm7(f"Hey {name}, AutoRemind here.")], sms_items, [],
+                fits=lambda body: gsm7_length(body) <= sms_budget,
+                overflow=lambda n: sms_overflow(sms_releases[-n:]),
+            ),
+            html=html_document(html_paragraphs),
         )
-    _render_resources(lines, assignment)
 
 
-def compose_message(student: Dict[str, Any], assignments: List[Dict[str, Any]], today: Optional[datetime] = None) -> str:
+def renderer_for(today: Optional[datetime], cache: bool = True) -> MessageRenderer:
+    """A fresh renderer for `today`'s date in PROJECT_TZ (now when None)."""
     if today is None:
         today = datetime.now(PROJECT_TZ)
     today_local = today.date() if today.tzinfo is None else today.astimezone(PROJECT_TZ).date()
-    preferred_name = (
-        student.get("preferred_first_name")
-        or student.get("first_name")
-        or "there"
+    return MessageRenderer(today_local, cache=cache)
+
+
+def compose_message(
+    student: Dict[str, Any],
+    assignments: List[Dict[str, Any]],
+    today: Optional[datetime] = None,
+    *,
+    renderer: Optional[MessageRenderer] = None,
+) -> str:
+    """
+    The plain-text message. A run passes its `renderer` so fragments are shared
+    across students; without one, the message is rendered on its own.
+    """
+    return (renderer or renderer_for(today)).compose(student, assignments)
+
+
+def compose_variants(
+    student: Dict[str, Any],
+    assignments: List[Dict[str, Any]],
+    today: Optional[datetime] = None,
+    *,
+    renderer: Optional[MessageRenderer] = None,
+) -> MessageVariants:
+    """The message for every channel; `.text` is compose_message's result."""
+    return (renderer or renderer_for(today)).render(student, assignments)
+
+
+def compose_message_uncached(
+    student: Dict[str, Any], assignments: List[Dict[str, Any]], today: Optional[datetime] = None
+) -> str:
+    """
+    compose_message without the fragment cache, rendering every block from
+    scratch. Kept for tests and benchmark_reminders.py.
+    """
+    return renderer_for(today, cache=False).compose(student, assignments)
+
+
+def _channel_target(entry: Dict[str, Any], channel_type: str) -> str:
+    """The entry's target for a channel type, or "" if it has none."""
+    channel = next(
+        (ch for ch in entry.get("channels", []) if ch.get("type") == channel_type),
+        None,
     )
+    if not channel:
+        return ""
+    return str(channel.get("target", "")).strip()
 
-    renderable = [a for a in assignments if a.get("personal_deadline")]
-    # A payload with no reason is a due reminder — Canvas-sourced payloads never set one.
-    released = [a for a in renderable if a.get("reason") == "release"]
-    due_soon = [a for a in renderable if a.get("reason", "due") != "release"]
 
-    number_assignments = len(renderable) > 1
-    bullet_index = 0
+class MessageCsv:
+    """
+    A channel's CSV export, written one message at a time so a run never
+    holds the whole file's rows. Rows go to a side file that replaces the CSV
+    only when closed after a complete run, so the senders never read a partial
+    export; a successful run always overwrites the file, even with no rows.
+    """
 
-    def next_bullet() -> str:
-        nonlocal bullet_index
-        bullet_index += 1
-        return f"{bullet_index}." if number_assignments else "-"
+    def __init__(self, output_path: Path, message_type: type, written: str, empty: str):
+        self.output_path = output_path
+        self.count = 0
+        # Summary lines, formatted with count/path on close
+        self._written = written
+        self._empty = empty
+        # Not *.csv, so the senders' globs skip it
+        self._partial_path = output_path.with_name(output_path.name + ".partial")
+        self._file = self._partial_path.open("w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=csv_fieldnames(message_type))
+        self._writer.writeheader()
+
+    def write(self, message: Any) -> None:
+        self._writer.writerow(to_row(message))
+        self.count += 1
+
+    def close(self, complete: bool = True) -> None:
+        """Publish the export, or with `complete` False discard it and keep the old file."""
+        self._file.close()
+        if not complete:
+            self._partial_path.unlink(missing_ok=True)
+            print(f"⚠️  Run did not finish; left {self.output_path} unchanged")
+            return
+        os.replace(self._partial_path, self.output_path)
+        if self.count:
+            print(self._written.format(count=self.count, path=self.output_path))
+        else:
+            print(self._empty.format(path=self.output_path))
 
-    lines = [f"Hey {preferred_name},", ""]
+    def __enter__(self) -> "MessageCsv":
+        return self
 
-    if released:
-        lines.append("Just released:")
-        for assignment in released:
-            due_dt = assignment["personal_deadline"]
-            due_date_str = f"{due_dt.strftime('%B')} {due_dt.day}"
-            _render_assignment_bullet(lines, assignment, next_bullet(), f"due on {due_date_str}")
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        self.close(complete=exc_type is None)
 
-    if due_soon:
-        if released:
-            lines.append("")
-        lines.append("Heads-up: you have upcoming assignments due soon:")
-        for assignment in due_soon:
-            due_dt = assignment["personal_deadline"]
-            deadline_local = local_date(due_dt)
-            days_until = (deadline_local - today_local).days
-            due_date_str = f"{due_dt.strftime('%B')} {due_dt.day}"
-            if days_until == 0:
-                days_label = "due today"
-            elif days_until == 1:
-                days_label = "due in 1 day"
-            else:
-                days_label = f"due in {days_until} days"
-            _render_assignment_bullet(lines, assignment, next_bullet(), f"{days_label}, on {due_date_str}")
 
-    lines.append("")
-    lines.append("Feel free to reach out to course staff if you need any support!")
-    return "\n".join(lines)
+def discord_csv(output_path: Path) -> MessageCsv:
+    """CSV with columns discord_id,message."""
+    return MessageCsv(
+        output_path, DiscordMessage,
+        "✅ Wrote {count} Discord messages to {path}",
+        "✅ No students with Discord reminders. Wrote empty CSV to {path}",
+    )
 
 
-def write_discord_csv(reminders: List[Dict[str, Any]], output_path: Path) -> None:
-    """Write a CSV with columns discord_id,message for entries with Discord channel."""
-    rows: List[Dict[str, str]] = []
+def sms_csv(output_path: Path) -> MessageCsv:
+    """CSV with columns phone_number,text_message."""
+    return MessageCsv(
+        output_path, SmsMessage,
+        "✅ Wrote {count} SMS messages to {path}",
+        "✅ No students with SMS reminders. Wrote empty CSV to {path}",
+    )
 
-    for entry in reminders:
-        # Find the Discord channel for this student, if any
-        discord_channel = next(
-            (ch for ch in entry.get("channels", []) if ch.get("type") == "discord"),
-            None,
-        )
-        if not discord_channel:
-            continue
 
-        discord_id = str(discord_channel.get("target", "")).strip()
-        if not discord_id:
-            continue
+def discord_message_for(entry: Dict[str, Any]) -> Optional[DiscordMessage]:
+    """The entry's DiscordMessage, or None without a Discord channel."""
+    discord_id = _channel_target(entry, "discord")
+    if not discord_id:
+        return None
+    variants = entry.get("variants")
+    message = variants.discord if variants else entry.get("message", "")
+    return DiscordMessage(discord_id=discord_id, message=message)
 
-        rows.append(
-            {
-                "discord_id": discord_id,
-                "message": entry.get("message", ""),
-            }
-        )
 
-    # Always overwrite the file, even if there are no rows
-    with output_path.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=["discord_id", "message"])
-        writer.writeheader()
-        writer.writerows(rows)
+def build_discord_messages(reminders: Iterable[Dict[str, Any]]) -> List[DiscordMessage]:
+    """One DiscordMessage per entry with a Discord channel."""
+    return [m for m in map(discord_message_for, reminders) if m]
 
-    if rows:
-        print(f"✅ Wrote {len(rows)} Discord messages to {output_path}")
-    else:
-        print(f"✅ No students with Discord reminders. Wrote empty CSV to {output_path}")
 
+def write_discord_csv(reminders: Iterable[Dict[str, Any]], output_path: Path) -> None:
+    """Write a CSV with columns discord_id,message for entries with Discord channel."""
+    with discord_csv(output_path) as export:
+        for message in build_discord_messages(reminders):
+            export.write(message)
 
-def write_sms_csv(reminders: List[Dict[str, Any]], output_path: Path) -> None:
-    """Write a CSV with columns phone_number,text_message for entries with SMS channel."""
-    rows: List[Dict[str, str]] = []
 
-    for entry in reminders:
-        sms_channel = next(
-            (ch for ch in entry.get("channels", []) if ch.get("type") == "sms"),
-            None,
-        )
-        if not sms_channel:
-            continue
+def sms_message_for(entry: Dict[str, Any]) -> Optional[SmsMessage]:
+    """The entry's SmsMessage, or None without an SMS channel."""
+    phone_number = _channel_target(entry, "sms")
+    if not phone_number:
+        return None
+    variants = entry.get("variants")
+    message = variants.sms if variants else entry.get("message", "")
+    return SmsMessage(phone_number=phone_number, text_message=message)
 
-        phone_number = str(sms_channel.get("target", "")).strip()
-        if not phone_number:
-            continue
 
-        rows.append({
-            "phone_number": phone_number,
-            "text_message": entry.get("message", ""),
-        })
+def build_sms_messages(reminders: Iterable[Dict[str, Any]]) -> List[SmsMessage]:
+    """One SmsMessage per entry with an SMS channel."""
+    return [m for m in map(sms_message_for, reminders) if m]
 
-    with output_path.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=["phone_number", "text_message"])
-        writer.writeheader()
-        writer.writerows(rows)
 
-    if rows:
-        print(f"✅ Wrote {len(rows)} SMS messages to {output_path}")
-    else:
-        print(f"✅ No students with SMS reminders. Wrote empty CSV to {output_path}")
+def write_sms_csv(reminders: Iterable[Dict[str, Any]], output_path: Path) -> None:
+    """Write a CSV with columns phone_number,text_message for entries with SMS channel."""
+    with sms_csv(output_path) as export:
+        for message in build_sms_messages(reminders):
+            export.write(message)
 
 
 def append_manage_prefs_footer(message: str) -> str:
@@ -935,6 +1643,19 @@ def append_manage_prefs_footer(message: str) -> str:
     )
 
 
+def append_manage_prefs_footer_html(message_html: str) -> str:
+    """`append_manage_prefs_footer` for the HTML part of the email."""
+    site = html.escape(settings.AUTOREMIND_SITE_URL)
+    return (
+        f"{message_html}\n"
+        '<hr style="border: none; border-top: 1px solid #ddd;">\n'
+        '<p style="font-family: Arial, sans-serif; font-size: 12px; color: #666;">'
+        f'Manage your reminders at <a href="{site}">{site}</a><br>\n'
+        "Sign in with your Berkeley email to change how far ahead you're notified, "
+        "pick which assignment types you hear about, or add text and Discord reminders.</p>"
+    )
+
+
 def _safe_filename_basic(name: str) -> str:
     """
     Return a filename safe across Windows/POSIX by replacing reserved characters
@@ -945,14 +1666,76 @@ def _safe_filename_basic(name: str) -> str:
     return cleaned
 
 
-def write_gmail_csv(reminders: List[Dict[str, Any]], output_dir: Path) -> None:
+def email_message_for(entry: Dict[str, Any]) -> Optional[EmailMessage]:
     """
-    Write a single Gmail-compatible CSV with one row per student.
+    The entry's EmailMessage, or None without an email channel or assignments.
 
     Every assignment due for a student is compacted into one combined message
     (the same message used for Discord/SMS), so a student with multiple
     deadlines receives a single email rather than one email per assignment.
-    CSV format: name,sid,email,assignment,message_requests,message_kind
+    """
+    email = _channel_target(entry, "email")
+    if not email:
+        return None
+
+    assignments = entry.get("assignments", [])
+    if not assignments:
+        return None
+
+    student_data = entry.get("student", {})
+    student_name = student_data.get("name", "").strip()
+    student_id = student_data.get("id")
+
+    # Get SID from student data
+    sid = student_data.get("sid", "")
+    if not sid and student_id:
+        sid = str(student_id)
+
+    # Summarize assignment names for the 'assignment' column. This drives the
+    # subject line / logging only; the body comes from message_requests.
+    assignment_names = [
+        a.get("assignment_name") or a.get("assignment_code", "")
+        for a in assignments
+        if a.get("assignment_name") or a.get("assignment_code")
+    ]
+    assignment_summary = ", ".join(assignment_names) if assignment_names else "your assignments"
+
+    # "release" only when every assignment in this entry is release-reason;
+    # a payload with no "reason" key means "due" (Canvas payloads never set
+    # one), and any mix with a due assignment keeps the more urgent "due"
+    # framing for the subject line.
+    message_kind = (
+        "release"
+        if all(a.get("reason", "due") == "release" for a in assignments)
+        else "due"
+    )
+    variants = entry.get("variants")
+
+    return EmailMessage(
+        name=student_name,
+        sid=sid,
+        email=email,
+        assignment=assignment_summary,
+        # Combined, already-composed message covering all due assignments. The
+        # footer is added here rather than in the email service so the CSV and
+        # the delivery log hold exactly what was sent.
+        message_requests=append_manage_prefs_footer(entry.get("message", "")),
+        # Drives the email subject line in the (separate) email service.
+        message_kind=message_kind,
+        message_html=append_manage_prefs_footer_html(variants.html) if variants else "",
+    )
+
+
+def build_email_messages(reminders: Iterable[Dict[str, Any]]) -> List[EmailMessage]:
+    """One EmailMessage per student with an email channel."""
+    return [m for m in map(email_message_for, reminders) if m]
+
+
+def gmail_csv(output_dir: Path) -> MessageCsv:
+    """
+    A single Gmail-compatible CSV with one row per student.
+
+    CSV format: name,sid,email,assignment,message_requests,message_kind,message_html
     """
     output_dir.mkdir(parents=True, exist_ok=True)
 
@@ -964,78 +1747,37 @@ def write_gmail_csv(reminders: List[Dict[str, Any]], output_dir: Path) -> None:
         except OSError:
             pass
 
-    rows: List[Dict[str, str]] = []
-
-    for entry in reminders:
-        # Find the email channel for this student, if any
-        email_channel = next(
-            (ch for ch in entry.get("channels", []) if ch.get("type") == "email"),
-            None,
-        )
-        if not email_channel:
-            continue
+    return MessageCsv(
+        output_dir / "message_requests.csv", EmailMessage,
+        "✅ Wrote {count} Gmail reminders (one per student) to {path}",
+        "✅ No students with email reminders. Wrote empty CSV to {path}",
+    )
 
-        email = str(email_channel.get("target", "")).strip()
-        if not email:
-            continue
 
-        assignments = entry.get("assignments", [])
-        if not assignments:
-            continue
+def write_gmail_csv(reminders: Iterable[Dict[str, Any]], output_dir: Path) -> None:
+    """Write the Gmail CSV (see gmail_csv) for these reminders."""
+    with gmail_csv(output_dir) as export:
+        for message in build_email_messages(reminders):
+            export.write(message)
 
-        student_data = entry.get("student", {})
-        student_name = student_data.get("name", "").strip()
-        student_id = student_data.get("id")
-
-        # Get SID from student data
-        sid = student_data.get("sid", "")
-        if not sid and student_id:
-            sid = str(student_id)
-
-        # Summarize assignment names for the 'assignment' column. This drives the
-        # subject line / logging only; the body comes from message_requests.
-        assignment_names = [
-            a.get("assignment_name") or a.get("assignment_code", "")
-            for a in assignments
-            if a.get("assignment_name") or a.get("assignment_code")
-        ]
-        assignment_summary = ", ".join(assignment_names) if assignment_names else "your assignments"
-
-        # "release" only when every assignment in this entry is release-reason;
-        # a payload with no "reason" key means "due" (Canvas payloads never set
-        # one), and any mix with a due assignment keeps the more urgent "due"
-        # framing for the subject line.
-        message_kind = (
-            "release"
-            if all(a.get("reason", "due") == "release" for a in assignments)
-            else "due"
-        )
 
-        rows.append({
-            "name": student_name,
-            "sid": sid,
-            "email": email,
-            "assignment": assignment_summary,
-            # Combined, already-composed message covering all due assignments. The
-            # footer is added here rather than in the email service so the CSV and
-            # the delivery log hold exactly what was sent.
-            "message_requests": append_manage_prefs_footer(entry.get("message", "")),
-            # Drives the email subject line in the (separate) email service.
-            "message_kind": message_kind,
-        })
+def build_outbox(reminders: Iterable[Dict[str, Any]]) -> ReminderOutbox:
+    """Per-channel messages for the senders to consume in-process."""
+    outbox = ReminderOutbox()
+    for entry in reminders:
+        for channel, message_for in CHANNEL_MESSAGES:
+            message = message_for(entry)
+            if message:
+                getattr(outbox, channel).append(message)
+    return outbox
 
-    output_path = output_dir / "message_requests.csv"
-    with output_path.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(
-            f, fieldnames=["name", "sid", "email", "assignment", "message_requests", "message_kind"]
-        )
-        writer.writeheader()
-        writer.writerows(rows)
 
-    if rows:
-        print(f"✅ Wrote {len(rows)} Gmail reminders (one per student) to {output_path}")
-    else:
-        print(f"✅ No students with email reminders. Wrote empty CSV to {output_path}")
+# Outbox attribute and message builder for each delivery channel
+CHANNEL_MESSAGES = (
+    ("discord", discord_message_for),
+    ("sms", sms_message_for),
+    ("email", email_message_for),
+)
 
 
 def build_submission_lookup(submission_rows: List[Dict[str, Any]]) -> Dict[str, str]:
@@ -1050,6 +1792,50 @@ def build_submission_lookup(submission_rows: List[Dict[str, Any]]) -> Dict[str,
     return lookup
 
 
+def live_assignment_names(lookup: Dict[str, Dict[str, Dict[str, Any]]]) -> List[str]:
+    """
+    Every assignment name a reminder built from `lookup` can check submissions
+    for, i.e. the payload names is_missing_submission will be asked about.
+    """
+    names = set()
+    for course_lookup in lookup.values():
+        for code, entry in course_lookup.items():
+            name = entry.get("assignment_name", code)
+            if name:
+                names.add(name)
+                names.add(name.strip())
+    return sorted(names)
+
+
+def fetch_submissions_for_assignments(
+    db: firestore.Client,
+    assignment_names: List[str],
+    *,
+    debug: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Load the assignment_submissions rows of just these assignments, with
+    chunked `in` queries, instead of the whole term's history.
+    """
+    rows: List[Dict[str, Any]] = []
+    for start in range(0, len(assignment_names), FIRESTORE_IN_QUERY_LIMIT):
+        chunk = assignment_names[start:start + FIRESTORE_IN_QUERY_LIMIT]
+        query = (
+            db.collection(SUBMISSIONS_TABLE)
+            .where("assignment_name", "in", chunk)
+            .select(list(SUBMISSION_FIELDS))
+        )
+        docs = list(query.stream())
+        record_firestore_read(len(docs))
+        rows.extend(doc.to_dict() or {} for doc in docs)
+
+    debug_print(
+        debug,
+        f"Fetched {len(rows)} submissions for {len(assignment_names)} live assignment names",
+    )
+    return rows
+
+
 def is_missing_submission(
     student_email: str,
     assignment_name: str,
@@ -1068,78 +1854,274 @@ def is_missing_submission(
     return status.strip().lower() == "missing"
 
 
-def gather_reminders(
+@dataclass(frozen=True)
+class RunContext:
+    """
+    Everything one reminder run reads from Firestore, loaded once up front.
+    Its mappings are read-only views and its sequences tuples, so nothing
+    downstream can add or drop entries; the Firestore row dicts themselves are
+    shared with the run, not copied.
+    """
+
+    today: datetime
+    # Resources with deadlines attached, narrowed to the codes live today
+    assignment_lookup: Mapping[str, Mapping[str, Dict[str, Any]]]
+    submission_lookup: Mapping[Any, str]
+    students: Tuple[Dict[str, Any], ...]
+    # Canvas deadlines of every Canvas-connected student, keyed by email
+    canvas_index: Mapping[str, Tuple[Dict[str, Any], ...]]
+    # Lowercased emails with research-study access
+    study_access: frozenset
+
+
+def load_run_context(
     db: firestore.Client,
     args: argparse.Namespace,
-) -> List[Dict[str, Any]]:
-    deadline_rows = fetch_collection_docs(db, args.deadlines_table, debug=args.debug)
-    deadlines = load_deadlines_from_rows(deadline_rows, debug=args.debug)
-    resource_rows = fetch_collection_docs(
-        db,
-        args.resources_table,
-        debug=args.debug,
-    )
-    assignment_lookup = build_assignment_lookup(
-        resource_rows,
-        deadlines,
-        debug=args.debug,
-    )
+    snapshot: Optional[SnapshotStore] = None,
+) -> RunContext:
+    """
+    Load every collection the run needs, issuing independent reads side by
+    side on the shared client. Reads that depend on the roster or on today's
+    live assignments (submissions, Canvas deadlines) form a second round.
+    """
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        deadline_rows = pool.submit(
+            _timed, "fetch.deadlines", fetch_collection_docs,
+            db, args.deadlines_table, debug=args.debug, snapshot=snapshot, fields=DEADLINE_FIELDS,
+        )
+        resource_rows = pool.submit(
+            _timed, "fetch.resources", fetch_collection_docs,
+            db, args.resources_table, debug=args.debug, snapshot=snapshot, fields=RESOURCE_FIELDS,
+        )
+        # Read once for both the GradeSync and the Canvas reminders
+        students = pool.submit(
+            _timed, "fetch.students", fetch_collection_docs,
+            db, DEFAULT_STUDENTS_TABLE, limit=args.limit, debug=args.debug, snapshot=snapshot,
+        )
+        study_access = pool.submit(_timed, "fetch.study_access", load_study_access, db, debug=args.debug)
+
+        deadline_rows = deadline_rows.result()
+        with RUN_METRICS.stage("build.deadlines"):
+            deadlines = load_deadlines_from_rows(deadline_rows, debug=args.debug)
+        resource_rows = resource_rows.result()
+        with RUN_METRICS.stage("build.assignment_lookup"):
+            assignment_lookup = build_assignment_lookup(
+                resource_rows,
+                deadlines,
+                debug=args.debug,
+            )
+        students = students.result()
+        RUN_METRICS.count("students", len(students))
 
-    submission_rows = fetch_collection_docs(db, "assignment_submissions", debug=args.debug)
-    submission_lookup = build_submission_lookup(submission_rows)
+        today = datetime.now(PROJECT_TZ)
+        # Only assignments whose trigger window contains today need evaluating.
+        RUN_METRICS.count("assignment_codes", sum(map(len, assignment_lookup.values())))
+        with RUN_METRICS.stage("build.live_lookup"):
+            assignment_lookup = live_assignment_lookup(
+                assignment_lookup, students, today.date(), debug=args.debug
+            )
+        RUN_METRICS.count("assignment_codes.live", sum(map(len, assignment_lookup.values())))
+        # Submissions only matter for those assignments, so only theirs are read.
+        submission_rows = pool.submit(
+            _timed, "fetch.submissions", fetch_submissions_for_assignments,
+            db, live_assignment_names(assignment_lookup), debug=args.debug,
+        )
+        canvas_index = pool.submit(
+            _timed, "fetch.canvas_deadlines", prefetch_canvas_deadlines,
+            db, canvas_connected_emails(students), debug=args.debug,
+        )
 
-    students = fetch_collection_docs(
-        db,
-        DEFAULT_STUDENTS_TABLE,
-        limit=args.limit,
-        debug=args.debug,
+        submission_rows = submission_rows.result()
+        with RUN_METRICS.stage("build.submission_lookup"):
+            submission_lookup = build_submission_lookup(submission_rows)
+
+        return RunContext(
+            today=today,
+            assignment_lookup=MappingProxyType({
+                course: MappingProxyType(entries) for course, entries in assignment_lookup.items()
+            }),
+            submission_lookup=MappingProxyType(submission_lookup),
+            students=tuple(students),
+            canvas_index=MappingProxyType({
+                email: tuple(rows) for email, rows in canvas_index.result().items()
+            }),
+            study_access=frozenset(study_access.result()),
+        )
+
+
+def tracer_for(args: argparse.Namespace) -> Tracer:
+    """The run's tracer: REMINDER_TRACE_EMAILS plus any --trace-email."""
+    return Tracer.from_config(
+        settings.REMINDER_TRACE_EMAILS,
+        getattr(args, "trace_email", None),
+        getattr(args, "trace_level", "detail"),
     )
-    today = datetime.now(PROJECT_TZ)
-
-    # Debug: Check if target student is in the list
-    target_email = "autoremindberkeley@gmail.com"
-    target_found = False
-    for student in students:
-        if target_email.lower() in str(student.get("email", "")).lower():
-            target_found = True
-            print(f"\n{'='*80}")
-            print(f"🎯 FOUND TARGET STUDENT: {student.get('email')}")
-            print(f"   Student ID: {student.get('id')}")
-            print(f"   Name: {student.get('first_name')} {student.get('last_name')}")
-            print(f"   email_pref: {student.get('email_pref')}")
-            print(f"   days_before_deadline: {student.get('days_before_deadline')}")
-            print(f"   course_code: {student.get('course_code')}")
-            print(f"   Assignment codes in student record: {[k for k in student.keys() if k.upper().startswith('PROJ')]}")
-            print(f"   Note: All students in table are considered opted-in")
-            print(f"{'='*80}\n")
-            break
-    
-    if not target_found:
-        print(f"\n⚠️  WARNING: Target student '{target_email}' NOT FOUND in {DEFAULT_STUDENTS_TABLE} table!")
-        print(f"   Total students loaded: {len(students)}")
-        if students:
-            print(f"   Sample emails: {[s.get('email') for s in students[:5]]}")
-
-    reminders: List[Dict[str, Any]] = []
-    for student in students:
-        try:
-            reminder = _build_reminder_for_student(
-                student, assignment_lookup, submission_lookup, today, target_email, args
+
+
+def _start_gradesync_pass(
+    args: argparse.Namespace,
+    context: RunContext,
+) -> Tuple[Dict[int, Tracer], Dict[int, List[AssignmentPayload]]]:
+    """
+    Resolve the traced students and, with --engine vectorized, evaluate the
+    roster up front. Returns the tracer of each traced student, by roster
+    position, and the precomputed payloads.
+    """
+    students = context.students
+    tracer = tracer_for(args)
+    traced: Dict[int, Tracer] = {}
+    if tracer.enabled:
+        traced = dict.fromkeys(tracer.traced_indices(students), tracer)
+        for idx in sorted(traced):
+            student = students[idx]
+            tracer.emit(
+                student.get("email"), "student.loaded",
+                id=student.get("id"),
+                name=f"{student.get('first_name', '')} {student.get('last_name', '')}".strip(),
+                course_code=student.get("course_code"),
+                email_pref=student.get("email_pref"),
+                days_before_deadline=student.get("days_before_deadline"),
             )
-        except Exception as exc:
-            print(f"⚠️  Skipping student {student.get('email', student.get('id', 'unknown'))}: {exc!r}")
-            continue
+        found = {_student_key(students[idx]) for idx in traced}
+        for email in sorted(tracer.emails - found):
+            tracer.emit(email, "student.missing", table=DEFAULT_STUDENTS_TABLE, students_loaded=len(students))
+
+    # The vectorized engine skips students whose diagnostics were asked for;
+    # they (and anyone it can't lay out) go through build_assignment_payload.
+    vectorized: Dict[int, List[AssignmentPayload]] = {}
+    if getattr(args, "engine", "python") == "vectorized" and not args.debug:
+        exclude = set(traced) if tracer.detail else set()
+        with RUN_METRICS.stage("evaluate.vectorized"):
+            vectorized = evaluate_payloads_vectorized(
+                list(students), context.assignment_lookup, context.today, exclude=exclude
+            )
+        print(f"⚡ Vectorized engine evaluated {len(vectorized)}/{len(students)} students")
+
+    return traced, vectorized
+
+
+def _gradesync_reminder(
+    idx: int,
+    context: RunContext,
+    traced: Dict[int, Tracer],
+    args: argparse.Namespace,
+    vectorized: Dict[int, List[AssignmentPayload]],
+    renderer: MessageRenderer,
+) -> Optional[Reminder]:
+    student = context.students[idx]
+    try:
+        return _build_reminder_for_student(
+            student, context.assignment_lookup, context.submission_lookup, context.today,
+            args, payloads=vectorized.get(idx), tracer=traced.get(idx), renderer=renderer,
+        )
+    except Exception as exc:
+        print(f"⚠️  Skipping student {student.get('email', student.get('id', 'unknown'))}: {exc!r}")
+        return None
+
+
+def gather_reminders(
+    db: firestore.Client,
+    args: argparse.Namespace,
+    context: Optional[RunContext] = None,
+) -> List[Reminder]:
+    if context is None:
+        context = load_run_context(db, args)
+    traced, vectorized = _start_gradesync_pass(args, context)
+    renderer = renderer_for(context.today)
+
+    reminders: List[Reminder] = []
+    for idx in range(len(context.students)):
+        reminder = _gradesync_reminder(idx, context, traced, args, vectorized, renderer)
         if reminder:
             reminders.append(reminder)
 
     return reminders
 
 
+def _student_key(student: Dict[str, Any]) -> str:
+    return str(student.get("email") or "").strip().lower()
+
+
+def iter_reminders(
+    db: firestore.Client,
+    args: argparse.Namespace,
+    context: RunContext,
+    renderer: Optional[MessageRenderer] = None,
+) -> Iterator[Reminder]:
+    """
+    Yield each student's merged GradeSync + Canvas reminder, one student at a
+    time. Students are grouped by email first (the roster is already loaded),
+    so merging needs only the current student's entries and nothing composed
+    is kept once it has been yielded. Every message is composed with
+    `renderer`, the run's fragment cache (a fresh one when not given).
+    """
+    traced, vectorized = _start_gradesync_pass(args, context)
+    today_local = context.today.date()
+    if renderer is None:
+        renderer = renderer_for(context.today)
+
+    groups: Dict[str, List[int]] = {}
+    for idx, student in enumerate(context.students):
+        # Students without an email are never merged with one another.
+        groups.setdefault(_student_key(student) or f"__noemail__{idx}", []).append(idx)
+
+    canvas_count = 0
+    for indices in groups.values():
+        entries: List[Reminder] = []
+        canvas_entries: List[Reminder] = []
+        for idx in indices:
+            with RUN_METRICS.stage("evaluate.gradesync"):
+                reminder = _gradesync_reminder(idx, context, traced, args, vectorized, renderer)
+            if reminder:
+                entries.append(reminder)
+        for idx in indices:
+            student = context.students[idx]
+            if not student.get("canvas_connected"):
+                continue
+            with RUN_METRICS.stage("evaluate.canvas"):
+                reminder = _canvas_reminder(
+                    db, student, context.today, today_local, args, context.canvas_index, renderer
+                )
+            if reminder:
+                canvas_entries.append(reminder)
+        canvas_count += len(canvas_entries)
+        if entries or canvas_entries:
+            # GradeSync entries first, as when the two sources were concatenated
+            with RUN_METRICS.stage("merge"):
+                merged = merge_reminders_by_student(entries + canvas_entries, renderer=renderer)
+            yield from merged
+
+    if canvas_count:
+        print(f"Canvas: {canvas_count} students ready for reminders.")
+    else:
+        print("Canvas: No students currently fall within their notification windows.")
+
+
+def _has_study_access(entry: Any, access_emails: frozenset) -> bool:
+    return str((entry.get("student") or {}).get("email") or "").strip().lower() in access_emails
+
+
+def gate_reminders(reminders: Iterable[Any], access_emails: frozenset) -> Iterator[Any]:
+    """apply_study_gate as a stream: yields only reminders with study access."""
+    gated_out = 0
+    for entry in reminders:
+        with RUN_METRICS.stage("gate"):
+            allowed = _has_study_access(entry, access_emails)
+        if allowed:
+            yield entry
+        else:
+            gated_out += 1
+    RUN_METRICS.count("gated_out", gated_out)
+    if gated_out:
+        print(f"🔒 Study gate: removed {gated_out} reminder(s) for students without study access.")
+
+
 def apply_study_gate(
     db: firestore.Client,
     reminders: List[Dict[str, Any]],
     *,
     debug: bool = False,
+    access_emails: Optional[frozenset] = None,
 ) -> List[Dict[str, Any]]:
     """Drop any reminder for a student without research-study access.
 
@@ -1148,18 +2130,9 @@ def apply_study_gate(
     THIS IS THE CRITICAL INVARIANT: only Group 1 (or everyone once access is opened)
     may receive notifications.
     """
-    access_emails = load_study_access(db, debug=debug)
-    allowed: List[Dict[str, Any]] = []
-    gated_out = 0
-    for entry in reminders:
-        email = str((entry.get("student") or {}).get("email") or "").strip().lower()
-        if email in access_emails:
-            allowed.append(entry)
-        else:
-            gated_out += 1
-    if gated_out:
-        print(f"🔒 Study gate: removed {gated_out} reminder(s) for students without study access.")
-    return allowed
+    if access_emails is None:
+        access_emails = load_study_access(db, debug=debug)
+    return list(gate_reminders(reminders, access_emails))
 
 
 def _build_reminder_for_student(
@@ -1167,102 +2140,173 @@ def _build_reminder_for_student(
     assignment_lookup: Dict[str, Dict[str, Dict[str, Any]]],
     submission_lookup: Dict[Any, str],
     today: datetime,
-    target_email: str,
     args: argparse.Namespace,
-) -> Optional[Dict[str, Any]]:
+    *,
+    payloads: Optional[List[AssignmentPayload]] = None,
+    tracer: Optional[Tracer] = None,
+    renderer: Optional[MessageRenderer] = None,
+) -> Optional[Reminder]:
+    """
+    Build one student's reminder. `payloads` are the student's matching
+    assignments when the vectorized engine already evaluated them; otherwise
+    each assignment code is evaluated here. `tracer` is set only for a traced
+    student; `renderer` is the run's message renderer.
+    """
     student_email = student.get("email", "")
-    is_target = target_email.lower() in str(student_email).lower()
+    verbose = args.debug or (tracer is not None and tracer.detail)
 
-    if is_target or args.debug:
+    if verbose:
         print(f"\n{'='*80}")
         print(f"📋 Processing student: {student_email}")
         print(f"   email_pref: {student.get('email_pref')}")
         print(f"   days_before_deadline: {student.get('days_before_deadline')}")
         print(f"   Note: All students in table are considered opted-in")
 
-    assignments_to_notify: List[Dict[str, Any]] = []
-    assignment_codes = collect_assignment_codes(student, assignment_lookup)
+    assignments_to_notify: List[AssignmentPayload] = []
+    if payloads is None:
+        assignment_codes = collect_assignment_codes(student, assignment_lookup)
 
-    if is_target or args.debug:
-        print(f"   Assignment codes found: {assignment_codes}")
+        if verbose:
+            print(f"   Assignment codes found: {assignment_codes}")
 
-    for code in assignment_codes:
-        payload = build_assignment_payload(
-            student,
-            code,
-            assignment_lookup,
-            today,
-            debug=args.debug or is_target,
+        payloads = (
+            build_assignment_payload(
+                student,
+                code,
+                assignment_lookup,
+                today,
+                debug=verbose,
+            )
+            for code in assignment_codes
         )
+
+    for payload in payloads:
         if payload:
+            code = payload["assignment_code"]
             assignment_name = payload["assignment_name"]
             if not is_missing_submission(student_email, assignment_name, submission_lookup):
-                if is_target or args.debug:
+                if verbose:
                     print(f"   ⏭️  Skipping {code}: already submitted")
                 continue
             assignments_to_notify.append(payload)
-            if is_target or args.debug:
+            if verbose:
                 print(f"   ✅ Added assignment to notify: {code}")
 
     if not assignments_to_notify:
-        if is_target or args.debug:
+        if verbose:
             print(f"   ❌ No assignments matched notification window criteria")
+        if tracer is not None:
+            tracer.emit(student_email, "reminder.none")
         return None
 
     channels = determine_channels(student)
-    if is_target or args.debug:
+    if verbose:
         print(f"   Channels determined: {channels}")
 
     if not channels:
-        channels = [{"type": "none", "target": "(no opted-in channels)"}]
-        if is_target or args.debug:
+        channels = [Channel(type="none", target="(no opted-in channels)")]
+        if verbose:
             print(f"   ⚠️  WARNING: No channels found! Student won't receive reminders.")
 
-    message = compose_message(student, assignments_to_notify, today=today)
+    message = compose_message(student, assignments_to_notify, today=today, renderer=renderer)
 
-    if is_target:
-        print(f"   ✅ REMINDER CREATED for {student_email}")
-        print(f"   Assignments: {[a['assignment_name'] for a in assignments_to_notify]}")
-        print(f"   Channels: {[c['type'] for c in channels]}")
+    if tracer is not None:
+        tracer.emit(
+            student_email, "reminder.built",
+            assignments=[a["assignment_name"] for a in assignments_to_notify],
+            channels=[c["type"] for c in channels],
+        )
+
+    return Reminder(
+        student=Student(
+            id=student.get("id"),
+            name=f"{student.get('first_name', '')} {student.get('last_name', '')}".strip(),
+            preferred_first_name=student.get("preferred_first_name"),
+            email=student.get("email"),
+            sid=student.get("sid"),
+        ),
+        channels=tuple(channels),
+        assignments=tuple(assignments_to_notify),
+        message=message,
+    )
 
-    return {
-        "student": {
-            "id": student.get("id"),
-            "name": f"{student.get('first_name', '')} {student.get('last_name', '')}".strip(),
-            "preferred_first_name": student.get("preferred_first_name"),
-            "email": student.get("email"),
-            "sid": student.get("sid"),
-        },
-        "channels": channels,
-        "assignments": assignments_to_notify,
-        "message": message,
-    }
+
+CANVAS_DEADLINES_TABLE = "canvas_deadlines"
+
+
+def canvas_connected_emails(students: Sequence[Dict[str, Any]]) -> List[str]:
+    return [
+        email
+        for email in ((s.get("email") or "").strip().lower() for s in students if s.get("canvas_connected"))
+        if email
+    ]
+
+
+def prefetch_canvas_deadlines(
+    db: firestore.Client,
+    emails: List[str],
+    *,
+    debug: bool = False,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Load the Canvas deadlines of every given student into an email-keyed index.
+
+    Replaces the per-student `where("email", "==", ...)` query with chunked `in`
+    queries, so the Canvas step costs one round trip per 30 connected students
+    instead of one per student. Emails with no deadlines map to an empty list.
+    """
+    index: Dict[str, List[Dict[str, Any]]] = {email: [] for email in emails}
+    unique_emails = list(index)
+
+    for start in range(0, len(unique_emails), FIRESTORE_IN_QUERY_LIMIT):
+        chunk = unique_emails[start:start + FIRESTORE_IN_QUERY_LIMIT]
+        docs = list(db.collection(CANVAS_DEADLINES_TABLE).where("email", "in", chunk).stream())
+        record_firestore_read(len(docs))
+        for doc in docs:
+            row = doc.to_dict() or {}
+            index.setdefault(row.get("email"), []).append(row)
+
+    debug_print(
+        debug,
+        f"Prefetched Canvas deadlines for {len(unique_emails)} students "
+        f"({sum(len(rows) for rows in index.values())} docs)",
+    )
+    return index
 
 
 def gather_canvas_reminders(
     db: firestore.Client,
     args: argparse.Namespace,
-) -> List[Dict[str, Any]]:
-    """Gather reminders from Canvas-sourced deadlines for connected students."""
+    context: Optional[RunContext] = None,
+) -> List[Reminder]:
+    """
+    Gather reminders from Canvas-sourced deadlines for connected students.
+    Uses the run's students and Canvas deadlines when given a `context`, and
+    reads them itself otherwise.
+    """
+    if context is not None:
+        students = context.students
+    else:
+        students = fetch_collection_docs(db, DEFAULT_STUDENTS_TABLE, limit=args.limit, debug=args.debug)
 
     # Get all students with Canvas connected
-    students = fetch_collection_docs(db, DEFAULT_STUDENTS_TABLE, limit=args.limit, debug=args.debug)
     canvas_students = [s for s in students if s.get("canvas_connected")]
 
     if not canvas_students:
         debug_print(args.debug, "No Canvas-connected students found.")
         return []
 
-    today = datetime.now(PROJECT_TZ)
+    today = context.today if context is not None else datetime.now(PROJECT_TZ)
     today_local = today.date()
-    reminders: List[Dict[str, Any]] = []
+    renderer = renderer_for(today)
+    reminders: List[Reminder] = []
+
+    if context is not None:
+        canvas_index = context.canvas_index
+    else:
+        canvas_index = prefetch_canvas_deadlines(db, canvas_connected_emails(canvas_students), debug=args.debug)
 
     for student in canvas_students:
-        try:
-            reminder = _build_canvas_reminder_for_student(db, student, today, today_local, args)
-        except Exception as exc:
-            print(f"⚠️  Canvas: skipping student {student.get('email', student.get('id', 'unknown'))}: {exc!r}")
-            continue
+        reminder = _canvas_reminder(db, student, today, today_local, args, canvas_index, renderer)
         if reminder:
             reminders.append(reminder)
 
@@ -1274,21 +2318,46 @@ def gather_canvas_reminders(
     return reminders
 
 
+def _canvas_reminder(
+    db: firestore.Client,
+    student: Dict[str, Any],
+    today: datetime,
+    today_local: date_type,
+    args: argparse.Namespace,
+    canvas_index: Dict[str, List[Dict[str, Any]]],
+    renderer: Optional[MessageRenderer] = None,
+) -> Optional[Reminder]:
+    try:
+        return _build_canvas_reminder_for_student(
+            db, student, today, today_local, args, canvas_index=canvas_index, renderer=renderer
+        )
+    except Exception as exc:
+        print(f"⚠️  Canvas: skipping student {student.get('email', student.get('id', 'unknown'))}: {exc!r}")
+        return None
+
+
 def _build_canvas_reminder_for_student(
     db: firestore.Client,
     student: Dict[str, Any],
     today: datetime,
     today_local: date_type,
     args: argparse.Namespace,
-) -> Optional[Dict[str, Any]]:
+    *,
+    canvas_index: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+    renderer: Optional[MessageRenderer] = None,
+) -> Optional[Reminder]:
     student_email = (student.get("email") or "").strip().lower()
     if not student_email:
         return None
 
-    canvas_docs = db.collection("canvas_deadlines").where(
-        "email", "==", student_email
-    ).stream()
-    canvas_deadlines = [doc.to_dict() for doc in canvas_docs]
+    if canvas_index is not None:
+        canvas_deadlines = canvas_index.get(student_email, [])
+    else:
+        canvas_docs = db.collection(CANVAS_DEADLINES_TABLE).where(
+            "email", "==", student_email
+        ).stream()
+        canvas_deadlines = [doc.to_dict() for doc in canvas_docs]
+        record_firestore_read(len(canvas_deadlines))
 
     if not canvas_deadlines:
         debug_print(args.debug, f"No Canvas deadlines for {student_email}")
@@ -1302,7 +2371,7 @@ def _build_canvas_reminder_for_student(
         except (TypeError, ValueError):
             freq_days = 0
 
-    assignments_to_notify: List[Dict[str, Any]] = []
+    assignments_to_notify: List[AssignmentPayload] = []
 
     for dl in canvas_deadlines:
         submission_state = dl.get("submission_state", "unsubmitted")
@@ -1329,17 +2398,17 @@ def _build_canvas_reminder_for_student(
             )
             continue
 
-        assignments_to_notify.append({
-            "assignment_code": dl.get("course_code", ""),
-            "assignment_name": dl.get("assignment_name", ""),
-            "base_deadline": due_date,
-            "personal_deadline": due_date,
-            "offset_days": 0,
-            "notification_window_days": freq_days,
-            "resources": [],
-            "html_url": dl.get("html_url", ""),
-            "source": "canvas",
-        })
+        assignments_to_notify.append(AssignmentPayload(
+            assignment_code=dl.get("course_code", ""),
+            assignment_name=dl.get("assignment_name", ""),
+            base_deadline=due_date,
+            personal_deadline=due_date,
+            offset_days=0,
+            notification_window_days=freq_days,
+            resources=[],
+            html_url=dl.get("html_url", ""),
+            source="canvas",
+        ))
 
     if not assignments_to_notify:
         return None
@@ -1348,20 +2417,20 @@ def _build_canvas_reminder_for_student(
     if not channels:
         return None
 
-    message = compose_message(student, assignments_to_notify, today=today)
+    message = compose_message(student, assignments_to_notify, today=today, renderer=renderer)
 
-    return {
-        "student": {
-            "id": student.get("id"),
-            "name": f"{student.get('first_name', '')} {student.get('last_name', '')}".strip(),
-            "preferred_first_name": student.get("preferred_first_name"),
-            "email": student_email,
-            "sid": student.get("sid"),
-        },
-        "channels": channels,
-        "assignments": assignments_to_notify,
-        "message": message,
-    }
+    return Reminder(
+        student=Student(
+            id=student.get("id"),
+            name=f"{student.get('first_name', '')} {student.get('last_name', '')}".strip(),
+            preferred_first_name=student.get("preferred_first_name"),
+            email=student_email,
+            sid=student.get("sid"),
+        ),
+        channels=tuple(channels),
+        assignments=tuple(assignments_to_notify),
+        message=message,
+    )
 
 
 def run_raw_mode(db: firestore.Client, args: argparse.Namespace) -> None:
@@ -1387,7 +2456,11 @@ def _assignment_signature(assignment: Dict[str, Any]) -> tuple:
     )
 
 
-def merge_reminders_by_student(reminders: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def merge_reminders_by_student(
+    reminders: List[Any],
+    *,
+    renderer: Optional[MessageRenderer] = None,
+) -> List[Reminder]:
     """Collapse multiple reminder entries for the same student into one.
 
     Reminders can originate from more than one source (gradesync deadlines and
@@ -1395,32 +2468,31 @@ def merge_reminders_by_student(reminders: List[Dict[str, Any]]) -> List[Dict[str
     sources receives two separate messages on every channel. This unions their
     assignments and channels (deduping each) and recomposes a single message
     covering all of the student's due assignments.
+
+    Entries may be Reminders or dict-shaped. A student with a single entry
+    keeps its channel and assignment tuples as they are; only students with
+    entries from several sources get new ones.
     """
-    merged: Dict[str, Dict[str, Any]] = {}
-    order: List[str] = []
+    merged: Dict[str, Reminder] = {}
 
     for entry in reminders:
-        email = str((entry.get("student") or {}).get("email") or "").strip().lower()
+        reminder = as_reminder(entry)
+        email = str((reminder.student or {}).get("email") or "").strip().lower()
         # Keep students without an email as distinct entries rather than
         # collapsing them together.
-        key = email or f"__noemail__{len(order)}"
+        key = email or f"__noemail__{len(merged)}"
 
-        if key not in merged:
-            merged[key] = {
-                "student": dict(entry.get("student", {})),
-                "channels": list(entry.get("channels", [])),
-                "assignments": list(entry.get("assignments", [])),
-            }
-            order.append(key)
+        existing = merged.get(key)
+        if existing is None:
+            merged[key] = reminder
             continue
 
-        existing = merged[key]
-
-        seen_channels = {(c.get("type"), c.get("target")) for c in existing["channels"]}
-        for channel in entry.get("channels", []):
+        channels = list(existing.channels)
+        seen_channels = {(c.get("type"), c.get("target")) for c in channels}
+        for channel in reminder.channels:
             sig = (channel.get("type"), channel.get("target"))
             if sig not in seen_channels:
-                existing["channels"].append(channel)
+                channels.append(channel)
                 seen_channels.add(sig)
 
         # Signature deliberately carries no reason, so a release and a due payload for
@@ -1428,113 +2500,209 @@ def merge_reminders_by_student(reminders: List[Dict[str, Any]]) -> List[Dict[str
         # more actionable and already implies the assignment is out. A payload with no
         # reason (Canvas) counts as due. Any other collision (due-due or release-release)
         # is first-wins, matching the pre-existing dedupe behavior.
+        assignments = list(existing.assignments)
         seen_assignments = {
-            _assignment_signature(a): idx for idx, a in enumerate(existing["assignments"])
+            _assignment_signature(a): idx for idx, a in enumerate(assignments)
         }
-        for assignment in entry.get("assignments", []):
+        for assignment in reminder.assignments:
             sig = _assignment_signature(assignment)
             if sig not in seen_assignments:
-                seen_assignments[sig] = len(existing["assignments"])
-                existing["assignments"].append(assignment)
-            elif (existing["assignments"][seen_assignments[sig]].get("reason") == "release"
+                seen_assignments[sig] = len(assignments)
+                assignments.append(assignment)
+            elif (assignments[seen_assignments[sig]].get("reason") == "release"
                   and assignment.get("reason", "due") != "release"):
-                existing["assignments"][seen_assignments[sig]] = assignment
+                assignments[seen_assignments[sig]] = assignment
+
+        merged[key] = replace(existing, channels=tuple(channels), assignments=tuple(assignments))
 
-    result: List[Dict[str, Any]] = []
-    for key in order:
-        entry = merged[key]
-        student = entry["student"]
+    result: List[Reminder] = []
+    for entry in merged.values():
+        student = entry.student
         # compose_message reads preferred_first_name/first_name; the trimmed
-        # student dict on an entry only carries preferred_first_name and a full
+        # student on an entry only carries preferred_first_name and a full
         # name, so reconstruct a first_name from the latter.
         compose_student = {
             "preferred_first_name": student.get("preferred_first_name"),
             "first_name": (student.get("name") or "").split(" ")[0],
         }
-        entry["message"] = compose_message(compose_student, entry["assignments"])
-        result.append(entry)
+        variants = compose_variants(compose_student, list(entry.assignments), renderer=renderer)
+        result.append(replace(entry, message=variants.text, variants=variants))
 
     return result
 
 
-def run_reminder_mode(db: firestore.Client, args: argparse.Namespace) -> None:
-    reminders = gather_reminders(db, args)
+def open_snapshot(path: str) -> SnapshotStore:
+    """Open the --snapshot file, first pulling it from GCS if a bucket is configured."""
+    bucket = settings.REMINDER_SNAPSHOT_BUCKET
+    if bucket:
+        try:
+            if download_snapshot(bucket, settings.REMINDER_SNAPSHOT_BLOB, Path(path)):
+                print(f"📥 Snapshot downloaded from gs://{bucket}/{settings.REMINDER_SNAPSHOT_BLOB}")
+        except Exception as exc:
+            # A missing snapshot only costs a full read; never fail the run over it.
+            print(f"⚠️  Could not download snapshot from gs://{bucket}: {exc!r}")
+    return SnapshotStore(Path(path))
 
-    # Merge Canvas reminders
-    canvas_reminders = gather_canvas_reminders(db, args)
-    reminders.extend(canvas_reminders)
 
-    # Collapse multiple entries for the same student (e.g. gradesync + Canvas)
-    # into a single reminder so every channel sends one combined message.
-    reminders = merge_reminders_by_student(reminders)
+def close_snapshot(snapshot: SnapshotStore) -> None:
+    """Close the snapshot and push it back to GCS if a bucket is configured."""
+    snapshot.close()
+    bucket = settings.REMINDER_SNAPSHOT_BUCKET
+    if bucket:
+        try:
+            upload_snapshot(bucket, settings.REMINDER_SNAPSHOT_BLOB, snapshot.path)
+        except Exception as exc:
+            print(f"⚠️  Could not upload snapshot to gs://{bucket}: {exc!r}")
+
+
+def _print_reminder(entry: Reminder) -> None:
+    student_name = entry["student"]["name"] or f"Student #{entry['student']['id']}"
+    print("\n" + "=" * 60)
+    print(f"Reminder for: {student_name}")
+    print("Channels:")
+    for channel in entry["channels"]:
+        print(f"  - {channel['type']}: {channel['target']}")
+    print("Assignments:")
+    for assignment in entry["assignments"]:
+        due_text = format_due_datetime(assignment["personal_deadline"])
+        offset_note = (
+            f" (offset +{assignment['offset_days']}d)" if assignment["offset_days"] else ""
+        )
+        print(
+            f"  • {assignment['assignment_name']} [{assignment['assignment_code']}] → {due_text}{offset_note}"
+        )
+    print("\nDraft message:\n")
+    print(entry["message"])
 
-    # Research-study gate — apply AFTER merging all sources, BEFORE any CSV/output.
-    reminders = apply_study_gate(db, reminders, debug=args.debug)
 
-    if not reminders:
-        print("✅ No students currently fall within their notification windows.")
-    else: 
-        for entry in reminders:
-            student_name = entry["student"]["name"] or f"Student #{entry['student']['id']}"
-            print("\n" + "=" * 60)
-            print(f"Reminder for: {student_name}")
-            print("Channels:")
-            for channel in entry["channels"]:
-                print(f"  - {channel['type']}: {channel['target']}")
-            print("Assignments:")
-            for assignment in entry["assignments"]:
-                due_text = format_due_datetime(assignment["personal_deadline"])
-                offset_note = (
-                    f" (offset +{assignment['offset_days']}d)" if assignment["offset_days"] else ""
-                )
-                print(
-                    f"  • {assignment['assignment_name']} [{assignment['assignment_code']}] → {due_text}{offset_note}"
-                )
-            print("\nDraft message:\n")
-            print(entry["message"])
-        print(f"\nSummary: {len(reminders)} students ready for reminders.")
+def open_csv_exports(args: argparse.Namespace) -> Dict[str, MessageCsv]:
+    """The CSV exports the --*-csv flags ask for, keyed by channel."""
+    script_dir = Path(__file__).resolve().parent
+    project_root = script_dir.parent
+    exports: Dict[str, MessageCsv] = {}
 
     # Write Discord CSV into discord_service/message_requests if requested
     if args.discord_csv:
-        script_dir = Path(__file__).resolve().parent
-        project_root = script_dir.parent
         base_dir = project_root / "discord_service" / "message_requests"
         base_dir.mkdir(parents=True, exist_ok=True)
-
-        output_path = base_dir / args.discord_output
-        write_discord_csv(reminders, output_path)
+        exports["discord"] = discord_csv(base_dir / args.discord_output)
 
     # Write SMS CSV into text-service/message_requests if requested
     if args.sms_csv:
-        script_dir = Path(__file__).resolve().parent
-        project_root = script_dir.parent
         base_dir = project_root / "text-service" / "message_requests"
         base_dir.mkdir(parents=True, exist_ok=True)
-
-        output_path = base_dir / args.sms_output
-        write_sms_csv(reminders, output_path)
+        exports["sms"] = sms_csv(base_dir / args.sms_output)
 
     # Write Gmail CSV into gradesync_input/message_requests if requested
     if args.gmail_csv:
-        script_dir = Path(__file__).resolve().parent
-        output_dir = script_dir / "message_requests"
-        write_gmail_csv(reminders, output_dir)
+        exports["email"] = gmail_csv(script_dir / "message_requests")
+
+    return exports
+
+
+def run_reminder_mode(
+    db: firestore.Client,
+    args: argparse.Namespace,
+    *,
+    collect_outbox: bool = True,
+) -> Optional[ReminderOutbox]:
+    """
+    Build every reminder due today. Returns them as a ReminderOutbox; the
+    --*-csv flags additionally export each channel's messages to CSV for the
+    standalone senders.
+
+    Reminders stream through: each student's merged, gated reminder is handed
+    to the channel sinks and dropped, so memory holds the roster and the
+    per-channel messages, not every reminder with its payloads. Without
+    `collect_outbox` (a standalone run exporting CSVs) the messages go
+    straight to disk and None is returned.
+    """
+    reset_firestore_reads()
+    RUN_METRICS.reset()
+    snapshot = open_snapshot(args.snapshot) if getattr(args, "snapshot", None) else None
+    try:
+        with RUN_METRICS.stage("load_context"):
+            context = load_run_context(db, args, snapshot=snapshot)
+    finally:
+        if snapshot is not None:
+            close_snapshot(snapshot)
+
+    outbox = ReminderOutbox() if collect_outbox else None
+    exports = open_csv_exports(args)
+    count = 0
+    complete = False
+    try:
+        # GradeSync + Canvas reminders, merged per student, then the research-
+        # study gate — before anything reaches a channel.
+        # One renderer per run: its fragment cache lives and dies with the run.
+        renderer = renderer_for(context.today)
+        reminders = gate_reminders(iter_reminders(db, args, context, renderer), context.study_access)
+        for entry in reminders:
+            count += 1
+            with RUN_METRICS.stage("print"):
+                _print_reminder(entry)
+            for channel, message_for in CHANNEL_MESSAGES:
+                with RUN_METRICS.stage(f"messages.{channel}"):
+                    message = message_for(entry)
+                if not message:
+                    continue
+                RUN_METRICS.count(f"messages.{channel}")
+                if outbox is not None:
+                    getattr(outbox, channel).append(message)
+                if channel in exports:
+                    with RUN_METRICS.stage(f"csv_write.{channel}"):
+                        exports[channel].write(message)
+        complete = True
+    finally:
+        # A run that fails partway leaves the previous exports in place
+        with RUN_METRICS.stage("csv_close"):
+            for export in exports.values():
+                export.close(complete=complete)
+    RUN_METRICS.count("reminders", count)
+
+    if not count:
+        print("✅ No students currently fall within their notification windows.")
+    else:
+        print(f"\nSummary: {count} students ready for reminders.")
 
+    print(
+        f"📊 Firestore reads this run: {FIRESTORE_READS['queries']} queries, "
+        f"{FIRESTORE_READS['documents']} documents"
+    )
+    print(RUN_METRICS.summary_line(firestore_reads=dict(FIRESTORE_READS)))
+    return outbox
 
-def main() -> None:
-    args = parse_args()
 
-    print("Connecting to Firestore...")
-    print(f"Firebase Project ID: {settings.FIREBASE_PROJECT_ID}")
-    print(f"Service account: {settings.FIREBASE_SERVICE_ACCOUNT_PATH}")
+def main(
+    argv: Optional[List[str]] = None,
+    db: Optional[firestore.Client] = None,
+    *,
+    collect_outbox: bool = True,
+) -> Optional[ReminderOutbox]:
+    args = parse_args(argv)
 
-    db = init_firestore()
+    if db is None:
+        print("Connecting to Firestore...")
+        print(f"Firebase Project ID: {settings.FIREBASE_PROJECT_ID}")
+        print(f"Service account: {settings.FIREBASE_SERVICE_ACCOUNT_PATH}")
+        db = init_firestore()
 
     if args.mode == "raw":
         run_raw_mode(db, args)
-    else:
-        run_reminder_mode(db, args)
+        return None
+    if not args.profile:
+        return run_reminder_mode(db, args, collect_outbox=collect_outbox)
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return run_reminder_mode(db, args, collect_outbox=collect_outbox)
+    finally:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+        print(f"🔬 Profile written to {args.profile}")
 
 
 if __name__ == "__main__":
-    main()
+    # Nothing consumes the outbox of a standalone run; the CSVs are its output.
+    main(collect_outbox=False)
@@ -0,0 +1,163 @@
+"""
+In-memory stand-in for the slice of the Firestore client db_fetch uses.
+
+Shared by the tests and benchmark_engine.py. Collections hold plain dicts keyed by
+document ID; queries support `where` with "==" and "in", `select`, `limit`,
+`document(...).get()`, `stream()` and `get_all`, writes go through `batch()`,
+and the client counts what it was asked for so tests can assert on round trips.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+# Firestore rejects `in` filters with more values than this
+IN_FILTER_LIMIT = 30
+
+# update_time of documents nobody has written since the fake was built
+INITIAL_UPDATE_TIME = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+Rows = Union[Sequence[Dict[str, Any]], Mapping[str, Dict[str, Any]]]
+
+
+class FakeDocument:
+    def __init__(self, doc_id: str, data: Optional[Dict[str, Any]], update_time: Any = None):
+        self.id = doc_id
+        self._data = data
+        self.exists = data is not None
+        self.update_time = update_time
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return dict(self._data) if self._data is not None else None
+
+
+class FakeDocumentRef:
+    def __init__(self, db: "FakeFirestore", collection: str, doc_id: str):
+        self._db = db
+        self.collection = collection
+        self.id = doc_id
+
+    def get(self) -> FakeDocument:
+        return self._db.read(self.collection, self.id)
+
+
+class FakeBatch:
+    """Buffered set/update writes, applied on commit."""
+
+    def __init__(self, db: "FakeFirestore"):
+        self._db = db
+        self._writes: List[Tuple[FakeDocumentRef, Dict[str, Any], bool]] = []
+
+    def set(self, ref: FakeDocumentRef, data: Dict[str, Any], merge: bool = False) -> None:
+        self._writes.append((ref, data, merge))
+
+    def update(self, ref: FakeDocumentRef, data: Dict[str, Any]) -> None:
+        self._writes.append((ref, data, True))
+
+    def commit(self) -> None:
+        for ref, data, merge in self._writes:
+            existing = self._db.collections.get(ref.collection, {}).get(ref.id) if merge else None
+            self._db.set(ref.collection, ref.id, {**(existing or {}), **data}, datetime.now(timezone.utc))
+        self._db.commits += 1
+        self._writes = []
+
+
+class FakeQuery:
+    def __init__(
+        self,
+        db: "FakeFirestore",
+        name: str,
+        doc_ids: List[str],
+        fields: Optional[List[str]] = None,
+    ):
+        self._db = db
+        self._name = name
+        self._doc_ids = doc_ids
+        self._fields = fields
+
+    def _narrowed(self, doc_ids: List[str]) -> "FakeQuery":
+        return FakeQuery(self._db, self._name, doc_ids, self._fields)
+
+    def where(self, field: str, op: str, value: Any) -> "FakeQuery":
+        docs = self._db.collections[self._name]
+        if op == "==":
+            return self._narrowed([i for i in self._doc_ids if docs[i].get(field) == value])
+        if op == "in":
+            if len(value) > IN_FILTER_LIMIT:
+                raise ValueError(f"'in' filter supports at most {IN_FILTER_LIMIT} values, got {len(value)}")
+            wanted = set(value)
+            return self._narrowed([i for i in self._doc_ids if docs[i].get(field) in wanted])
+        raise ValueError(f"FakeFirestore does not support the {op!r} operator")
+
+    def select(self, field_paths: Iterable[str]) -> "FakeQuery":
+        return FakeQuery(self._db, self._name, self._doc_ids, list(field_paths))
+
+    def limit(self, n: int) -> "FakeQuery":
+        return self._narrowed(self._doc_ids[:n])
+
+    def document(self, doc_id: str) -> FakeDocumentRef:
+        return FakeDocumentRef(self._db, self._name, doc_id)
+
+    def stream(self) -> Iterator[FakeDocument]:
+        self._db.queries += 1
+        self._db.streams[self._name] += 1
+        return iter([self._db.read(self._name, i, self._fields) for i in list(self._doc_ids)])
+
+
+class FakeFirestore:
+    """
+    `collections` maps a name to its documents, either {doc_id: data} or a list
+    of dicts (given IDs "doc000000", "doc000001", ... in list order). Names in
+    `unreadable` raise on access, like a collection the service account can't read.
+    """
+
+    def __init__(self, collections: Mapping[str, Rows], *, unreadable: Iterable[str] = ()):
+        self.collections: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.update_times: Dict[Tuple[str, str], Any] = {}
+        for name, rows in collections.items():
+            if isinstance(rows, Mapping):
+                self.collections[name] = dict(rows)
+            else:
+                self.collections[name] = {f"doc{n:06d}": row for n, row in enumerate(rows)}
+        self.unreadable = frozenset(unreadable)
+        # Round trips: stream() calls overall and per collection, and every
+        # document ID get_all was asked for
+        self.queries = 0
+        self.streams: Counter = Counter()
+        self.reads: List[str] = []
+        self.commits = 0
+
+    def rows(self, name: str) -> List[Dict[str, Any]]:
+        """The live data dicts of a collection, in document order."""
+        return list(self.collections.get(name, {}).values())
+
+    def set(self, name: str, doc_id: str, data: Dict[str, Any], update_time: Any) -> None:
+        self.collections.setdefault(name, {})[doc_id] = data
+        self.update_times[(name, doc_id)] = update_time
+
+    def delete(self, name: str, doc_id: str) -> None:
+        self.collections.get(name, {}).pop(doc_id, None)
+        self.update_times.pop((name, doc_id), None)
+
+    def read(self, name: str, doc_id: str, fields: Optional[Sequence[str]] = None) -> FakeDocument:
+        data = self.collections.get(name, {}).get(doc_id)
+        if data is None:
+            return FakeDocument(doc_id, None)
+        if fields is not None:
+            data = {k: v for k, v in data.items() if k in fields}
+        return FakeDocument(doc_id, data, self.update_times.get((name, doc_id), INITIAL_UPDATE_TIME))
+
+    def collection(self, name: str) -> FakeQuery:
+        if name in self.unreadable:
+            raise RuntimeError(f"permission denied reading {name!r}")
+        return FakeQuery(self, name, list(self.collections.get(name, {})))
+
+    def batch(self) -> FakeBatch:
+        return FakeBatch(self)
+
+    def get_all(self, refs: Iterable[FakeDocumentRef], field_paths: Optional[List[str]] = None) -> Iterator[FakeDocument]:
+        for ref in refs:
+            self.reads.append(ref.id)
+            yield self.read(ref.collection, ref.id, field_paths)
@@ -44,10 +44,6 @@ google_sheet_id = '1HPaMeAudhiOXNZ-JfGr5Viw9qpoaZWRn-kAuOX6gGx8'
 # credentials_path = os.path.join(config_folder, google_sheet_credentials)
 credentials_path = str(settings.SERVICE_ACCOUNT_PATH)
 
-if not os.path.exists(credentials_path):
-    logging.error(f"Credentials file not found: {credentials_path}")
-    sys.exit(1)
-
 # Firestore configuration
 DEFAULT_FIRESTORE_COLLECTION = "assignment_submissions"
 ROSTER_COLLECTION = "class_roster"
@@ -258,9 +254,13 @@ def upsert_submissions_to_firestore(
             status_value = str(status_value).strip()
 
         raw_name = str(row.get('assignment', ''))
-        assignment_name = re.sub(r'(x[0-9a-f]{2})+', lambda m: bytes.fromhex(m.group().replace('x', '')).decode('utf-8', errors='replace'), raw_name)
-        # Composite key: assignment_name + name (underscore-joined, url-safe)
-        doc_id = f"{assignment_name}__{name_value}".replace('/', '_').replace(' ', '_')
+        decoded_name = re.sub(r'(x[0-9a-f]{2})+', lambda m: bytes.fromhex(m.group().replace('x', '')).decode('utf-8', errors='replace'), raw_name)
+        # db_fetch looks submissions up by exact assignment_name (an `in` query),
+        # so the stored name must match the catalog's stripped name.
+        assignment_name = decoded_name.strip()
+        # Composite key: assignment_name + name (underscore-joined, url-safe).
+        # Built from the unstripped name so existing docs keep their IDs.
+        doc_id = f"{decoded_name}__{name_value}".replace('/', '_').replace(' ', '_')
 
         category_value = row.get('category', '')
         if pd.isna(category_value) or (isinstance(category_value, str) and category_value.strip() == ''):
@@ -374,7 +374,15 @@ def sync_roster_to_firestore(
     print(f"✅ Roster synced: {total_written} enrolled, {pruned} pruned (course={course_code})")
 
 
-if __name__ == "__main__":
+def main(argv: Optional[List[str]] = None, db_client: Optional[firestore.Client] = None) -> None:
+    """
+    Sync every sheet tab to Firestore. `db_client` lets an in-process caller
+    share its Firestore client instead of initializing one here.
+    """
+    if not os.path.exists(credentials_path):
+        logging.error(f"Credentials file not found: {credentials_path}")
+        sys.exit(1)
+
     # Parse command-line arguments
     parser = argparse.ArgumentParser(
         description="Fetch assignment data from Google Sheets and upload to Firestore"
@@ -406,15 +414,16 @@ if __name__ == "__main__":
         action="store_true",
         help="Test mode: process only the first valid assignment tab"
     )
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     # Initialize Google Sheets credentials
     creds = get_credentials()
     tab_names = get_all_tab_names(google_sheet_id, creds)
 
     # Initialize Firestore client if enabled
-    db_client = None
-    if args.firestore:
+    if not args.firestore:
+        db_client = None
+    elif db_client is None:
         try:
             db_client = init_firestore()
             print("✅ Connected to Firestore")
@@ -507,3 +516,7 @@ if __name__ == "__main__":
             logging.error(f"Error processing tab {tab}: {e}")
             print(f"❌ Failed to process {tab}. Continuing with next tab...")
             continue
+
+
+if __name__ == "__main__":
+    main()
@@ -2,16 +2,90 @@
 Main orchestration script.
 1. Syncs Canvas assignments (optional).
 2. Syncs Google Sheet submission statuses → Firestore.
-3. Runs db_fetch.py to generate reminder CSVs.
-4. Sends Discord reminders.
-5. Sends Gmail reminders.
+3. Runs db_fetch.py to build the reminders.
+4. Sends Discord, SMS and Gmail reminders in parallel.
+
+Every step runs in this process: each script is imported and its entry point
+called directly, so firebase_admin, pandas and the Google client libraries are
+imported once and all steps share one Firestore client. Reminders reach the
+senders as an in-memory ReminderOutbox rather than through CSV files. The
+scripts are still runnable on their own, reading the CSVs as before.
 """
 
+import argparse
+import importlib.util
 import sys
-import subprocess
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from types import ModuleType
+from typing import Callable, Dict, List, Optional
+
+
+def load_script(name: str, path: Path) -> ModuleType:
+    """
+    Import a pipeline script by path. Scripts live in hyphenated directories
+    and two of them are called main.py, so each gets a unique module name.
+    Its directory is added to sys.path for its sibling imports.
+    """
+    module_name = f"autoremind_{name}"
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    script_dir = str(path.parent)
+    if script_dir not in sys.path:
+        sys.path.append(script_dir)
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[module_name]
+        raise
+    return module
+
+
+def run_step(label: str, title: str, step: Callable[[], None], timings: Dict[str, float]) -> bool:
+    """
+    Run one step, recording its wall-clock time. Returns False if it raised or
+    called sys.exit with a non-zero code.
+    """
+    print("\n--------------------------------------------------")
+    print(f"STEP {label}: {title}")
+    print("--------------------------------------------------")
+    started = time.perf_counter()
+    try:
+        step()
+        ok = True
+    except SystemExit as e:
+        ok = e.code in (None, 0)
+    except Exception:
+        traceback.print_exc()
+        ok = False
+    # Senders run in parallel; each writes only its own key.
+    timings[f"{label} {title}"] = time.perf_counter() - started
+    return ok
+
+
+def print_timings(timings: Dict[str, float], total: float) -> None:
+    print("\n⏱️  Step timings:")
+    for step, seconds in timings.items():
+        print(f"  {step}: {seconds:.1f}s")
+    # Not the sum above: the channel senders overlap.
+    print(f"  Total: {total:.1f}s")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the daily pipeline. Returns 0 if every step succeeded, 1 otherwise."""
+    parser = argparse.ArgumentParser(description="Run the daily AutoRemind pipeline")
+    parser.add_argument(
+        "--export-csv",
+        action="store_true",
+        help="Also write the per-channel reminder CSVs the standalone senders read",
+    )
+    args = parser.parse_args(argv)
 
-def main():
     # 1. Setup Paths
     current_dir = Path(__file__).resolve().parent
     project_root = current_dir.parent
@@ -27,103 +101,114 @@ def main():
     # 2. Verify scripts exist
     if not script_fetch.exists():
         print(f"❌ Error: Could not find {script_fetch}")
-        return
+        return 1
     if not script_discord.exists():
         print(f"❌ Error: Could not find {script_discord}")
-        return
+        return 1
     if not script_send_email.exists():
         print(f"❌ Error: Could not find {script_send_email}")
-        return
+        return 1
+
+    timings: Dict[str, float] = {}
+    started = time.perf_counter()
+    try:
+        return _run_pipeline(script_gradesync, script_canvas_sync, script_fetch, script_discord,
+                             script_sms, script_send_email, timings, args.export_csv)
+    finally:
+        print_timings(timings, time.perf_counter() - started)
+
+
+def _run_pipeline(script_gradesync, script_canvas_sync, script_fetch, script_discord,
+                  script_sms, script_send_email, timings: Dict[str, float],
+                  export_csv: bool = False) -> int:
+    # One Firestore client for every step
+    started = time.perf_counter()
+    try:
+        db_fetch = load_script("db_fetch", script_fetch)
+        print("Connecting to Firestore...")
+        db = db_fetch.init_firestore()
+    except BaseException as e:
+        print(f"\n❌ Could not connect to Firestore. Aborting. ({e!r})")
+        return 1
+    timings["setup"] = time.perf_counter() - started
 
     # 2.5 Run Step 0: GradeSync → Firestore (class_roster + assignment_submissions)
     if script_gradesync.exists():
-        print("--------------------------------------------------")
-        print("STEP 0a: Syncing GradeSync Roster & Submissions")
-        print("--------------------------------------------------")
-        gradesync_cmd = [sys.executable, str(script_gradesync)]
-        try:
-            subprocess.run(gradesync_cmd, check=True)
-        except subprocess.CalledProcessError as e:
-            print(f"\n⚠️  Step 0a Warning: GradeSync sync failed (Exit code: {e.returncode}). Continuing...")
+        ok = run_step(
+            "0a", "Syncing GradeSync Roster & Submissions",
+            lambda: load_script("gradesync_to_db", script_gradesync).main([], db_client=db),
+            timings,
+        )
+        if not ok:
+            print("\n⚠️  Step 0a Warning: GradeSync sync failed. Continuing...")
     else:
         print("ℹ️  gradesync_to_db.py not found, skipping GradeSync sync.")
 
     # Run Step 0b: Canvas Sync (optional — skip if script not found)
     if script_canvas_sync.exists():
-        print("--------------------------------------------------")
-        print("STEP 0: Syncing Canvas Assignments")
-        print("--------------------------------------------------")
-
-        canvas_cmd = [sys.executable, str(script_canvas_sync)]
-        try:
-            subprocess.run(canvas_cmd, check=True)
-        except subprocess.CalledProcessError as e:
-            print(f"\n⚠️  Step 0b Warning: Canvas sync failed (Exit code: {e.returncode}). Continuing...")
+        ok = run_step(
+            "0b", "Syncing Canvas Assignments",
+            lambda: load_script("canvas_sync", script_canvas_sync).sync_all_users(db),
+            timings,
+        )
+        if not ok:
+            print("\n⚠️  Step 0b Warning: Canvas sync failed. Continuing...")
     else:
         print("ℹ️  Canvas sync script not found, skipping Canvas sync.")
 
-
     # 3. Run Step 1: db_fetch.py
-    print("--------------------------------------------------")
-    print("STEP 1: Fetching Data & Generating Reminders CSV")
-    print("--------------------------------------------------")
-    
-    # We must pass --discord-csv and --gmail-csv so db_fetch generates the files 
-    # required by the sender scripts.
-    fetch_cmd = [sys.executable, str(script_fetch), "--discord-csv", "--gmail-csv", "--sms-csv"]
-    
-    try:
-        # check=True raises an exception if the script fails (returns non-zero)
-        subprocess.run(fetch_cmd, check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"\n❌ Step 1 Failed. Aborting. (Exit code: {e.returncode})")
-        return
-
-    # 4. Run Step 2: send_discord_reminders.py
-    print("\n--------------------------------------------------")
-    print("STEP 2: Sending Discord Messages")
-    print("--------------------------------------------------")
-
-    send_cmd = [sys.executable, str(script_discord)]
-
-    try:
-        subprocess.run(send_cmd, check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"\n❌ Step 2 Failed. (Exit code: {e.returncode})")
-        return
-
-    # Step 3: SMS (Twilio)
-    print("\n--------------------------------------------------")
-    print("STEP 3: Sending SMS Reminders (Twilio)")
-    print("--------------------------------------------------")
-
+    # The reminders reach the senders in memory as a ReminderOutbox; the CSVs
+    # are only written when asked for (e.g. to inspect or re-send a run).
+    fetch_argv = ["--discord-csv", "--gmail-csv", "--sms-csv"] if export_csv else []
+    fetched = {}
+    ok = run_step(
+        "1", "Fetching Data & Generating Reminders",
+        lambda: fetched.update(outbox=db_fetch.main(fetch_argv, db=db)),
+        timings,
+    )
+    if not ok:
+        print("\n❌ Step 1 Failed. Aborting.")
+        return 1
+    outbox = fetched["outbox"]
+    print(f"📬 Outbox: {len(outbox.discord)} Discord, {len(outbox.sms)} SMS, {len(outbox.email)} email")
+
+    # 4. Steps 2-4: the channel senders talk to disjoint providers, so they run
+    # side by side and the delivery phase takes as long as the slowest one. A
+    # failing channel doesn't stop the others.
+    senders = {
+        "2": ("Sending Discord Messages",
+              lambda: load_script("send_discord_reminders", script_discord).dm_to_all(
+                  db=db, messages=outbox.discord)),
+        "4": ("Sending Gmail Reminders",
+              lambda: load_script("email_service", script_send_email).main(
+                  ["--no-generate"], messages=outbox.email)),
+    }
     if script_sms.exists():
-        try:
-            subprocess.run([sys.executable, str(script_sms)], check=True)
-        except subprocess.CalledProcessError as e:
-            print(f"\n⚠️  Step 3 Warning: SMS sending failed (Exit code: {e.returncode}). Continuing...")
+        senders["3"] = ("Sending SMS Reminders (Twilio)",
+                        lambda: load_script("send_text_reminders", script_sms).send_text_messages(
+                            messages=outbox.sms))
     else:
         print(f"⚠️  SMS script not found, skipping: {script_sms}")
 
-    print("\n--------------------------------------------------")
-    print("✅ AUTOMATION COMPLETE")
-    print("--------------------------------------------------")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(senders)) as pool:
+        results = {
+            label: pool.submit(run_step, label, title, step, timings)
+            for label, (title, step) in sorted(senders.items())
+        }
+    timings["delivery (parallel)"] = time.perf_counter() - started
+
+    failed = [label for label, result in results.items() if not result.result()]
+    for label in failed:
+        print(f"\n❌ Step {label} Failed. ({senders[label][0]})")
+    if failed:
+        return 1
 
-    # 5. Run Step 4: email-service/main.py
     print("\n--------------------------------------------------")
-    print("STEP 4: Sending Gmail Reminders")
+    print("✅ AUTOMATION COMPLETE")
     print("--------------------------------------------------")
+    return 0
 
-    # If you want to explicitly point it at email-service/message_requests:
-    # email_cmd = [sys.executable, str(script_send_email), "--dir", "message_requests"]
-    # Otherwise, rely on whatever default you coded in email-service/main.py:
-    email_cmd = [sys.executable, str(script_send_email)]
-
-    try:
-        subprocess.run(email_cmd, check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"\n❌ Step 4 Failed. (Exit code: {e.returncode})")
-        return
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
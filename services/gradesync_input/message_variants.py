@@ -0,0 +1,145 @@
+"""
+Channel-specific formatting for reminder messages.
+
+db_fetch's MessageRenderer renders each reminder once into a MessageVariants:
+the plain-text body (the email's text part), an SMS body kept within GSM-7 and a
+segment budget, Discord markdown, and the email's HTML part. This module holds
+the per-channel rules; the renderer decides what goes in each message.
+"""
+
+from __future__ import annotations
+
+import html
+import math
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Callable, List, Sequence
+
+
+@dataclass(frozen=True, slots=True)
+class MessageVariants:
+    # Plain text; the email's text part and what the logs show
+    text: str
+    sms: str
+    discord: str
+    # Email HTML body, manage-preferences footer not included
+    html: str
+
+
+# ---------------------------------------------------------------------------
+# SMS: any character outside the GSM-7 alphabet switches the whole message to
+# UCS-2, which cuts a segment from 160 to 70 characters. Twilio bills per
+# segment, so SMS bodies are normalized to GSM-7 and trimmed to a budget.
+# ---------------------------------------------------------------------------
+
+GSM7_BASIC = frozenset(
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+# Sent as an escape plus the character, so each counts twice
+GSM7_EXTENDED = frozenset("^{}\\[~]|€\f")
+
+_GSM7_REPLACEMENTS = {
+    "→": "->", "•": "-", "—": "-", "–": "-", "…": "...",
+    "‘": "'", "’": "'", "“": '"', "”": '"', " ": " ", "\t": " ",
+}
+
+SMS_SEGMENT_CHARS = 160
+# Concatenated messages spend 7 characters of each segment on the header
+SMS_CONCAT_SEGMENT_CHARS = 153
+
+
+def to_gsm7(text: str) -> str:
+    """`text` with every character mapped into the GSM-7 alphabet."""
+    out = []
+    for char in text:
+        if char in GSM7_BASIC or char in GSM7_EXTENDED:
+            out.append(char)
+        elif char in _GSM7_REPLACEMENTS:
+            out.append(_GSM7_REPLACEMENTS[char])
+        else:
+            # Accented letters outside GSM-7 lose their accent ("ō" -> "o")
+            base = "".join(c for c in unicodedata.normalize("NFKD", char) if c in GSM7_BASIC)
+            out.append(base or "?")
+    return "".join(out)
+
+
+def gsm7_length(text: str) -> int:
+    return sum(2 if char in GSM7_EXTENDED else 1 for char in text)
+
+
+def sms_segments(text: str) -> int:
+    """Segments a GSM-7 message is billed as."""
+    length = gsm7_length(text)
+    if length <= SMS_SEGMENT_CHARS:
+        return 1
+    return math.ceil(length / SMS_CONCAT_SEGMENT_CHARS)
+
+
+def sms_overflow(dropped_releases: Sequence[bool]) -> str:
+    """The line summarizing SMS items cut for length, one flag per item: is it a release notice."""
+    n = len(dropped_releases)
+    if not any(dropped_releases):
+        return f"+{n} more due soon."
+    if all(dropped_releases):
+        return f"+{n} more just released."
+    return f"+{n} more reminders."
+
+
+# ---------------------------------------------------------------------------
+# Discord
+# ---------------------------------------------------------------------------
+
+DISCORD_MESSAGE_LIMIT = 2000
+
+_MARKDOWN_SPECIAL = re.compile(r"([\\*_`~|>\[\]])")
+
+
+def escape_markdown(text: str) -> str:
+    return _MARKDOWN_SPECIAL.sub(r"\\\1", text)
+
+
+def discord_link(url: str) -> str:
+    # Angle brackets stop Discord from unfurling every link into an embed
+    return f"<{url}>"
+
+
+# ---------------------------------------------------------------------------
+# Email HTML
+# ---------------------------------------------------------------------------
+
+_URL = re.compile(r"https?://[^\s<>\"]+")
+
+
+def html_text(text: str) -> str:
+    """Escaped `text` with its URLs turned into links."""
+    escaped = html.escape(text, quote=False)
+    return _URL.sub(lambda m: f'<a href="{m.group(0)}">{m.group(0)}</a>', escaped)
+
+
+def html_document(paragraphs: List[str]) -> str:
+    # <div> rather than <p>: paragraphs may hold lists, which <p> can't contain
+    body = "\n".join(f'<div style="margin: 0 0 1em;">{paragraph}</div>' for paragraph in paragraphs if paragraph)
+    return f'<div style="font-family: Arial, sans-serif; line-height: 1.5;">\n{body}\n</div>'
+
+
+# ---------------------------------------------------------------------------
+
+
+def fit_items(head: List[str], items: List[str], tail: List[str], fits: Callable[[str], bool],
+              overflow: Callable[[int], str]) -> str:
+    """
+    Join head + items + tail with newlines, dropping trailing items (and
+    noting how many with `overflow(n)`) until `fits` accepts the result.
+    """
+    def build(kept: int) -> str:
+        dropped = len(items) - kept
+        lines = head + items[:kept] + ([overflow(dropped)] if dropped else []) + tail
+        return "\n".join(lines)
+
+    for kept in range(len(items), -1, -1):
+        candidate = build(kept)
+        if fits(candidate):
+            return candidate
+    return build(0)
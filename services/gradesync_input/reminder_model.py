@@ -0,0 +1,115 @@
+"""
+Slotted records for the reminders db_fetch builds.
+
+A run builds one Reminder per student with a few AssignmentPayloads each, so at
+tens of thousands of students per-object dicts dominate memory. These are frozen
+`__slots__` dataclasses instead. They still answer `entry["student"]` and
+`entry.get("message")`, so the CSV writers, the outbox builders and the study
+gate read them exactly like the dict-shaped reminders tests and older callers
+pass in; `to_dict()` gives a plain-dict copy where one is needed.
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
+
+from message_variants import MessageVariants
+
+
+class _FieldAccess:
+    """Read-only dict-style access to a dataclass's fields."""
+
+    __slots__ = ()
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__dataclass_fields__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key not in self.__dataclass_fields__:
+            return default
+        return getattr(self, key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.__dataclass_fields__
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Shallow plain-dict copy; nested records are converted too."""
+        return {
+            f.name: _plain(getattr(self, f.name))
+            for f in fields(self)
+        }
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, _FieldAccess):
+        return value.to_dict()
+    if isinstance(value, MessageVariants):
+        return asdict(value)
+    if isinstance(value, tuple):
+        return [_plain(v) for v in value]
+    return value
+
+
+@dataclass(frozen=True, slots=True)
+class Student(_FieldAccess):
+    """The slice of a students document a reminder carries."""
+
+    id: Any
+    name: str
+    preferred_first_name: Optional[str]
+    email: Optional[str]
+    sid: Any
+
+
+@dataclass(frozen=True, slots=True)
+class Channel(_FieldAccess):
+    # "email", "sms", "discord", or "none" when the student opted into nothing
+    type: str
+    target: str
+
+
+@dataclass(frozen=True, slots=True)
+class AssignmentPayload(_FieldAccess):
+    assignment_code: str
+    assignment_name: str
+    base_deadline: Optional[datetime]
+    personal_deadline: Optional[datetime]
+    offset_days: int
+    notification_window_days: int
+    resources: List[Dict[str, Any]]
+    # "due" or "release"
+    reason: str = "due"
+    # Canvas payloads link to the assignment and name their source
+    html_url: Optional[str] = None
+    source: Optional[str] = None
+
+
+Record = Union[Mapping[str, Any], _FieldAccess]
+
+
+@dataclass(frozen=True, slots=True)
+class Reminder(_FieldAccess):
+    student: Union[Student, Mapping[str, Any]]
+    channels: Tuple[Record, ...]
+    assignments: Tuple[Record, ...]
+    message: str = ""
+    # Per-channel bodies, set once the reminder's final message is composed;
+    # without them every channel gets `message`.
+    variants: Optional[MessageVariants] = None
+
+
+def as_reminder(entry: Record) -> Reminder:
+    """`entry` as a Reminder, converting a dict-shaped one without copying its parts."""
+    if isinstance(entry, Reminder):
+        return entry
+    return Reminder(
+        student=entry.get("student") or {},
+        channels=tuple(entry.get("channels") or ()),
+        assignments=tuple(entry.get("assignments") or ()),
+        message=entry.get("message", ""),
+        variants=entry.get("variants"),
+    )
@@ -0,0 +1,120 @@
+"""
+Shared test data for the reminder tests: run arguments, a small Firestore term
+served by FakeFirestore, and a varied assignment catalog and roster generator.
+"""
+
+from argparse import Namespace
+from datetime import datetime, timedelta, timezone
+
+import db_fetch
+from fake_firestore import FakeFirestore
+
+UTC = timezone.utc
+
+
+def make_args(**overrides):
+    """The argparse namespace a reminder run reads, with no CSV exports."""
+    args = dict(
+        debug=False, limit=None, deadlines_table="deadlines", resources_table="assignment_resources",
+        engine="python", snapshot=None, discord_csv=False, sms_csv=False, gmail_csv=False,
+    )
+    args.update(overrides)
+    return Namespace(**args)
+
+
+ARGS = make_args()
+
+
+def due_in(days):
+    return (datetime.now(db_fetch.PROJECT_TZ) + timedelta(days=days)).replace(tzinfo=None).isoformat()
+
+
+def make_db(**overrides):
+    """
+    One live CS10 lab (LAB1, due tomorrow) and one far off (LAB9), two students,
+    a Canvas essay for a@ and the study allowlist (a@ in group 1, b@ waitlisted).
+    An override of None makes that collection unreadable.
+    """
+    collections = {
+        "deadlines": [
+            {"course_code": "CS10", "assignment_code": "LAB1", "assignment_name": "Lab 1", "due": due_in(1)},
+            {"course_code": "CS10", "assignment_code": "LAB9", "assignment_name": "Lab 9", "due": due_in(40)},
+        ],
+        "assignment_resources": [
+            {"course_code": "CS10", "assignment_code": "LAB1", "assignment_name": "Lab 1", "link": "https://x/1"},
+            {"course_code": "CS10", "assignment_code": "LAB9", "assignment_name": "Lab 9", "link": "https://x/9"},
+        ],
+        "assignment_submissions": [
+            {"email": "a@berkeley.edu", "assignment_name": "Lab 1", "status": "2026-03-01"},
+            {"email": "a@berkeley.edu", "assignment_name": "Lab 9", "status": "Missing"},
+        ],
+        "students": [
+            {"email": "a@berkeley.edu", "course_code": "CS10", "days_before_deadline": 1, "canvas_connected": True,
+             "email_pref": True},
+            {"email": "b@berkeley.edu", "course_code": "CS10", "days_before_deadline": 1},
+        ],
+        "canvas_deadlines": [{"email": "a@berkeley.edu", "assignment_name": "Essay", "course_code": "ENG1",
+                              "due": (datetime.now(db_fetch.PROJECT_TZ) + timedelta(days=1)).isoformat()}],
+        db_fetch.STUDY_CONFIG_TABLE: {db_fetch.STUDY_CONFIG_DOC: {"access_open": False}},
+        db_fetch.STUDY_PARTICIPANTS_TABLE: [{"email": "A@berkeley.edu", "group": 1}, {"email": "b@berkeley.edu", "group": 2}],
+    }
+    collections.update(overrides)
+    unreadable = [name for name, rows in collections.items() if rows is None]
+    return FakeFirestore(
+        {name: rows for name, rows in collections.items() if rows is not None},
+        unreadable=unreadable,
+    )
+
+
+def make_lookup():
+    """Two courses, aliases, a checkpoint, a quiz, aware deadlines across DST changes."""
+    def entry(code, name, deadline, release=None):
+        return {
+            "assignment_code": code,
+            "assignment_name": name,
+            "resources": [{"resource_name": f"{name} spec", "link": f"https://x/{code}"}],
+            "deadline": deadline,
+            "release": release,
+        }
+
+    return {
+        "CS61A": {
+            "HW05": entry("HW05", "Homework 5", datetime(2026, 3, 9, 23, 59), datetime(2026, 3, 3, 9, 0)),
+            "LAB04": entry("LAB04", "Lab 4", datetime(2026, 3, 10, 6, 59, tzinfo=UTC)),
+            "PROJ01": entry("PROJ01", "Hog", datetime(2026, 3, 12, 6, 59, tzinfo=UTC), datetime(2026, 3, 6, 8, 0, tzinfo=UTC)),
+            "PROJ01CP": entry("PROJ01CP", "Hog Checkpoint", datetime(2026, 3, 8, 9, 30, tzinfo=UTC)),
+            "QUIZ1": entry("QUIZ1", "Quiz 1", datetime(2026, 3, 7, 23, 0)),
+            "MT1": entry("MT1", "Midterm 1", None, datetime(2026, 3, 6, 0, 0)),
+        },
+        "CS10": {
+            "PROJ1": entry("PROJ1", "Project 1", datetime(2026, 11, 2, 7, 30, tzinfo=UTC)),
+            "LAB1": entry("LAB1", "Lab 1", datetime(2026, 10, 31, 23, 59)),
+        },
+    }
+
+
+def make_student(rng, n):
+    student = {
+        "id": f"stu{n}",
+        "email": f"s{n}@berkeley.edu",
+        "first_name": f"S{n}",
+        "sid": str(3030000000 + n),
+        "phone_number": f"+1510555{n:04d}",
+        "discord_id": str(10**17 + n),
+        "course_code": rng.choice(["CS61A", "CS61A", "CS10", "", "BOGUS", " CS61A "]),
+    }
+    if rng.random() < 0.85:
+        student["days_before_deadline"] = rng.choice([0, 1, 2, 3, 5, "4", "x"])
+    else:
+        student["notif_freq_1"] = rng.randint(0, 3)
+        student["notif_freq_2"] = rng.randint(0, 3)
+    for code in ("HW05", "LAB04", "PROJ01", "PROJ01CP", "PROJ1", "LAB1"):
+        if rng.random() < 0.3:
+            student[code] = rng.choice([1, 2, 3, "2", "x", None, 0])
+    if rng.random() < 0.5:
+        student["category_prefs"] = {c: rng.random() < 0.8 for c in ("lab", "homework", "midterm", "quiz", "project")}
+    if rng.random() < 0.4:
+        student["project_early_reminder"] = True
+    if rng.random() < 0.3:
+        student["release_reminder"] = rng.choice([False, True, None])
+    return student
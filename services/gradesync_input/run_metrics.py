@@ -0,0 +1,63 @@
+"""
+Stage timers and counters for a reminder run.
+
+db_fetch wraps each stage of run_reminder_mode in `RUN_METRICS.stage(name)` and
+bumps counters as reminders flow through; the run ends with one JSON line
+summarizing both. Stages that run once per student (evaluation, merge, gate,
+CSV writes) accumulate, so each reports its total time and how often it ran.
+Collections are fetched from several threads, so their stage times overlap and
+can add up to more than the run's wall time.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+
+class RunMetrics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started = time.perf_counter()
+            # name -> [seconds, calls]
+            self.stages: Dict[str, list] = {}
+            self.counters: Dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                totals = self.stages.setdefault(name, [0.0, 0])
+                totals[0] += elapsed
+                totals[1] += 1
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def summary(self, **extra: Any) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "event": "reminder_run_metrics",
+                "wall_seconds": round(time.perf_counter() - self.started, 4),
+                "stages": {
+                    name: {"seconds": round(seconds, 4), "calls": calls}
+                    for name, (seconds, calls) in self.stages.items()
+                },
+                "counters": dict(self.counters),
+                **extra,
+            }
+
+    def summary_line(self, **extra: Any) -> str:
+        return json.dumps(self.summary(**extra), sort_keys=True)
@@ -0,0 +1,212 @@
+"""
+Local snapshot of the Firestore collections the reminder run reads.
+
+Each run lists a collection's document IDs with their server-side
+`update_time` (a `__name__`-only projection, so no field data is transferred),
+re-reads only the documents whose `update_time` differs from the snapshot,
+drops the ones that disappeared, and serves everything else from a SQLite file.
+Firestore's own `update_time` is used rather than the `updated_at` field the
+apps write, because not every writer stamps `updated_at`.
+
+The file can live in a GCS bucket between runs (see `download_snapshot` /
+`upload_snapshot`) for jobs whose working directory doesn't persist.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+
+# Document reads per batched get
+GET_ALL_CHUNK_SIZE = 300
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    collection TEXT NOT NULL,
+    doc_id TEXT NOT NULL,
+    update_time TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (collection, doc_id)
+)
+"""
+
+
+@dataclass
+class SnapshotDelta:
+    """A collection as of this run, and what it took to bring it up to date."""
+
+    rows: List[Dict[str, Any]] = field(default_factory=list)
+    # Documents in the ID listing
+    listed: int = 0
+    # Documents re-read because they are new or changed
+    changed: int = 0
+    deleted: int = 0
+
+
+def _encode(value: Any) -> Any:
+    """
+    JSON form of the Firestore values json can't store, as a single-key tagged
+    dict that _decode turns back. A reference is kept as its path, since the
+    snapshot has no client to rebuild it against; any other type is kept as
+    its str() rather than failing the run.
+    """
+    # Firestore timestamps come back as datetime subclasses.
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, bytes):
+        return {"__bytes__": base64.b64encode(value).decode("ascii")}
+    from google.cloud.firestore_v1 import DocumentReference, GeoPoint
+
+    if isinstance(value, GeoPoint):
+        return {"__geopoint__": [value.latitude, value.longitude]}
+    if isinstance(value, DocumentReference):
+        return {"__reference__": value.path}
+    return {"__str__": str(value)}
+
+
+def _decode(obj: Dict[str, Any]) -> Any:
+    if len(obj) != 1:
+        return obj
+    (tag, value), = obj.items()
+    if tag == "__datetime__":
+        return datetime.fromisoformat(value)
+    if tag == "__bytes__":
+        return base64.b64decode(value)
+    if tag == "__geopoint__":
+        from google.cloud.firestore_v1 import GeoPoint
+
+        return GeoPoint(*value)
+    if tag in ("__reference__", "__str__"):
+        return value
+    return obj
+
+
+def _version_key(update_time: Any, fields: Optional[Sequence[str]]) -> str:
+    """
+    Comparable form of a document's update_time, nanoseconds included. The
+    projection is part of it so that asking for different fields re-reads
+    every document instead of serving rows missing the new ones.
+    """
+    if hasattr(update_time, "rfc3339"):
+        key = update_time.rfc3339()
+    elif isinstance(update_time, datetime):
+        key = update_time.isoformat()
+    else:
+        key = str(update_time)
+    if fields is not None:
+        key += "|" + ",".join(sorted(fields))
+    return key
+
+
+class SnapshotStore:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Collections are fetched from several threads; the lock serializes
+        # access to the one connection.
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute(SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "SnapshotStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def _stored_times(self, collection_name: str) -> Dict[str, str]:
+        cursor = self._conn.execute(
+            "SELECT doc_id, update_time FROM documents WHERE collection = ?",
+            (collection_name,),
+        )
+        return dict(cursor.fetchall())
+
+    def _stored_rows(self, collection_name: str) -> Dict[str, Dict[str, Any]]:
+        cursor = self._conn.execute(
+            "SELECT doc_id, data FROM documents WHERE collection = ?",
+            (collection_name,),
+        )
+        return {doc_id: json.loads(data, object_hook=_decode) for doc_id, data in cursor}
+
+    def fetch(
+        self, db: Any, collection_name: str, fields: Optional[Sequence[str]] = None
+    ) -> SnapshotDelta:
+        """
+        Bring the snapshot of `collection_name` up to date and return its
+        documents, in document-ID order like a full collection stream. With
+        `fields`, only those fields are read and stored.
+        """
+        collection = db.collection(collection_name)
+        live = {
+            doc.id: _version_key(doc.update_time, fields)
+            for doc in collection.select(["__name__"]).stream()
+        }
+        with self._lock:
+            stored = self._stored_times(collection_name)
+
+        stale = [doc_id for doc_id, updated in live.items() if stored.get(doc_id) != updated]
+        gone = [doc_id for doc_id in stored if doc_id not in live]
+
+        upserts = []
+        for start in range(0, len(stale), GET_ALL_CHUNK_SIZE):
+            refs = [collection.document(doc_id) for doc_id in stale[start:start + GET_ALL_CHUNK_SIZE]]
+            for doc in db.get_all(refs, field_paths=list(fields) if fields is not None else None):
+                if not doc.exists:
+                    # Deleted between the listing and the read
+                    gone.append(doc.id)
+                    live.pop(doc.id, None)
+                    continue
+                upserts.append((
+                    collection_name,
+                    doc.id,
+                    _version_key(doc.update_time, fields),
+                    json.dumps(doc.to_dict(), default=_encode),
+                ))
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO documents (collection, doc_id, update_time, data) "
+                "VALUES (?, ?, ?, ?)",
+                upserts,
+            )
+            self._conn.executemany(
+                "DELETE FROM documents WHERE collection = ? AND doc_id = ?",
+                [(collection_name, doc_id) for doc_id in gone],
+            )
+
+        with self._lock:
+            rows = self._stored_rows(collection_name)
+        return SnapshotDelta(
+            rows=[rows[doc_id] for doc_id in sorted(live) if doc_id in rows],
+            listed=len(live),
+            changed=len(upserts),
+            deleted=len(gone),
+        )
+
+
+def download_snapshot(bucket_name: str, blob_name: str, path: Path) -> bool:
+    """Fetch the snapshot file from GCS. Returns False if there is none yet."""
+    from google.cloud import storage
+
+    blob = storage.Client().bucket(bucket_name).blob(blob_name)
+    if not blob.exists():
+        return False
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    blob.download_to_filename(str(path))
+    return True
+
+
+def upload_snapshot(bucket_name: str, blob_name: str, path: Path) -> None:
+    from google.cloud import storage
+
+    storage.Client().bucket(bucket_name).blob(blob_name).upload_from_filename(str(path))
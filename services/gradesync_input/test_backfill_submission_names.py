@@ -0,0 +1,46 @@
+"""Tests for stripped submission assignment names.
+
+db_fetch reads submissions with `in` queries on the catalog's stripped names, so a
+stored name with stray whitespace is never read and the student gets reminded for
+work they already handed in. gradesync_to_db now writes stripped names and the
+backfill strips the ones written before it did.
+"""
+
+import pandas as pd
+
+import backfill_submission_names as backfill
+import db_fetch
+import gradesync_to_db
+from fake_firestore import FakeFirestore
+
+
+def test_decides_only_names_with_surrounding_whitespace():
+    assert backfill.decide_assignment_name({"assignment_name": "Lab 1 "}) == "Lab 1"
+    assert backfill.decide_assignment_name({"assignment_name": "\tLab 1"}) == "Lab 1"
+    assert backfill.decide_assignment_name({"assignment_name": "Lab 1"}) is None
+    assert backfill.decide_assignment_name({}) is None
+
+
+def test_backfilled_trailing_whitespace_name_is_found_by_the_live_query():
+    db = FakeFirestore({"assignment_submissions": {
+        "Lab_1___Ada": {"email": "a@berkeley.edu", "assignment_name": "Lab 1 ", "status": "2026-03-01"},
+        "Lab_2__Ada": {"email": "a@berkeley.edu", "assignment_name": "Lab 2", "status": "2026-03-08"},
+    }})
+    assert db_fetch.fetch_submissions_for_assignments(db, ["Lab 1"]) == []
+
+    planned = backfill.plan_updates(db)
+    backfill.apply_updates(db, planned)
+
+    assert planned == [("Lab_1___Ada", "Lab 1 ", "Lab 1")]
+    assert [row["status"] for row in db_fetch.fetch_submissions_for_assignments(db, ["Lab 1"])] == ["2026-03-01"]
+
+
+def test_upsert_strips_the_name_but_keeps_the_document_id():
+    db = FakeFirestore({"assignment_submissions": {}})
+    df = pd.DataFrame([{"assignment": "Lab 1 ", "name": "Ada", "sid": "1", "email": "a@berkeley.edu",
+                        "status": "2026-03-01"}])
+
+    gradesync_to_db.upsert_submissions_to_firestore(df, db, "assignment_submissions")
+
+    assert list(db.collections["assignment_submissions"]) == ["Lab_1___Ada"]
+    assert [row["email"] for row in db_fetch.fetch_submissions_for_assignments(db, ["Lab 1"])] == ["a@berkeley.edu"]
@@ -0,0 +1,40 @@
+"""Smoke test for benchmark_engine.py at a size that runs in a moment."""
+
+from datetime import datetime
+
+import pytest
+
+import benchmark_engine
+import db_fetch
+from fake_firestore import FakeFirestore
+
+SMALL = ["--students", "120", "--courses", "2", "--assignments", "8", "--repeat", "1"]
+
+
+def test_synthetic_term_produces_reminders_on_both_engines():
+    args = benchmark_engine.parse_args(SMALL)
+    db = FakeFirestore(benchmark_engine.make_term(args, datetime.now(db_fetch.PROJECT_TZ)))
+
+    python = benchmark_engine.run_engine(db, "python")
+    vectorized = benchmark_engine.run_engine(db, "vectorized")
+
+    assert python["students"] == 120
+    assert python["reminders"] > 0
+    assert python["live_codes"] < python["assignment_codes"]
+    assert python == vectorized
+
+
+def test_term_queries_filter_project_and_reject_unknown_operators():
+    db = FakeFirestore({"rows": [{"a": 1, "b": 2}, {"a": 2, "b": 3}, {"a": 3, "b": 4}]})
+
+    docs = db.collection("rows").where("a", "in", [1, 3]).select(["b"]).stream()
+
+    assert [doc.to_dict() for doc in docs] == [{"b": 2}, {"b": 4}]
+    with pytest.raises(ValueError, match="'>='"):
+        db.collection("rows").where("a", ">=", 2)
+
+
+def test_thresholds_fail_the_run(capsys):
+    assert benchmark_engine.main(SMALL + ["--engine", "python"]) == 0
+    assert benchmark_engine.main(SMALL + ["--engine", "python", "--min-students-per-sec", "1e12"]) == 1
+    assert "students/s is below" in capsys.readouterr().out
@@ -0,0 +1,74 @@
+"""Tests for the bulk Canvas deadline prefetch in gather_canvas_reminders.
+
+The Canvas step used to issue one `canvas_deadlines` query per connected student.
+It now loads every connected student's deadlines up front with chunked `in`
+queries, so the number of round trips grows with students / 30 rather than with
+students.
+"""
+
+from argparse import Namespace
+from datetime import datetime, timedelta
+
+import db_fetch
+from fake_firestore import FakeFirestore
+
+
+def due_in(days):
+    return (datetime.now(db_fetch.PROJECT_TZ) + timedelta(days=days)).isoformat()
+
+
+def make_student(n):
+    return {
+        "email": f"s{n}@berkeley.edu",
+        "canvas_connected": True,
+        "days_before_deadline": 1,
+        "email_pref": True,
+        "first_name": f"S{n}",
+    }
+
+
+def make_db(n_students):
+    students = [make_student(n) for n in range(n_students)]
+    deadlines = [
+        {"email": s["email"], "assignment_name": "Essay", "course_code": "ENG1", "due": due_in(1)}
+        for s in students
+    ]
+    return FakeFirestore({"students": students, "canvas_deadlines": deadlines})
+
+
+def test_prefetch_groups_deadlines_by_email():
+    db = make_db(3)
+    index = db_fetch.prefetch_canvas_deadlines(db, ["s0@berkeley.edu", "s2@berkeley.edu", "nobody@x.edu"])
+    assert [r["assignment_name"] for r in index["s0@berkeley.edu"]] == ["Essay"]
+    assert len(index["s2@berkeley.edu"]) == 1
+    assert index["nobody@x.edu"] == []
+    assert "s1@berkeley.edu" not in index
+
+
+def test_prefetch_chunks_in_queries():
+    db = make_db(65)
+    emails = [f"s{n}@berkeley.edu" for n in range(65)]
+    db_fetch.prefetch_canvas_deadlines(db, emails)
+    assert db.queries == 3  # 30 + 30 + 5
+
+
+def test_gather_canvas_reminders_no_longer_queries_per_student():
+    db = make_db(40)
+    db_fetch.reset_firestore_reads()
+    reminders = db_fetch.gather_canvas_reminders(db, Namespace(limit=None, debug=False))
+    assert len(reminders) == 40
+    # One students scan plus two chunked canvas_deadlines queries.
+    assert db.queries == 3
+    assert db_fetch.FIRESTORE_READS["queries"] == 3
+    assert db_fetch.FIRESTORE_READS["documents"] == 80
+
+
+def test_per_student_query_still_works_without_an_index():
+    db = make_db(1)
+    student = make_student(0)
+    today = datetime.now(db_fetch.PROJECT_TZ)
+    reminder = db_fetch._build_canvas_reminder_for_student(
+        db, student, today, today.date(), Namespace(debug=False)
+    )
+    assert reminder is not None
+    assert reminder["assignments"][0]["assignment_name"] == "Essay"
@@ -0,0 +1,79 @@
+"""Tests for the date-window index that narrows each run to live assignments.
+
+Pruning is only an optimization: a run over the narrowed lookup must produce exactly
+the reminders a run over the full lookup does, while skipping assignments that are
+long past due or not yet close.
+"""
+
+import random
+from datetime import date, datetime, timedelta
+
+import db_fetch
+from reminder_test_data import ARGS, make_lookup, make_student
+
+
+def reminders(students, lookup, today):
+    return [
+        db_fetch._build_reminder_for_student(student, lookup, {}, today, ARGS)
+        for student in students
+    ]
+
+
+def test_pruned_lookup_yields_identical_reminders():
+    rng = random.Random(13)
+    lookup = make_lookup()
+    students = [make_student(rng, n) for n in range(200)]
+    students[0]["HW05"] = 7  # a long extension widens only HW05's window
+
+    days = [datetime(2026, 2, 20, 10, 0) + timedelta(days=d) for d in range(30)]
+    days += [datetime(2026, 10, 25, 10, 0) + timedelta(days=d) for d in range(12)]
+    for today in days:
+        narrowed = db_fetch.live_assignment_lookup(lookup, students, today.date())
+        assert reminders(students, narrowed, today) == reminders(students, lookup, today)
+
+
+def test_far_off_assignments_are_pruned_but_courses_kept():
+    students = [{"email": "a@berkeley.edu", "course_code": "CS61A", "days_before_deadline": 2}]
+
+    narrowed = db_fetch.live_assignment_lookup(make_lookup(), students, date(2026, 3, 10))
+
+    assert set(narrowed) == {"CS61A", "CS10"}
+    assert narrowed["CS10"] == {}
+    # MT1 has no deadline; QUIZ1 (due 3/7) and PROJ01CP (due 3/8) are past even
+    # the day of DST slack. HW05 and LAB04 (due 3/9) are still inside it.
+    assert sorted(narrowed["CS61A"]) == ["HW05", "LAB04", "PROJ01"]
+
+
+def test_unbounded_roster_disables_pruning():
+    lookup = make_lookup()
+    students = [{"email": "a@berkeley.edu", "course_code": "CS61A", "HW05": float("inf")}]
+
+    assert db_fetch.live_assignment_lookup(lookup, students, date(2026, 8, 1)) is lookup
+
+
+def test_oversized_offset_disables_pruning_instead_of_failing_the_run():
+    lookup = make_lookup()
+    students = [
+        {"email": "a@berkeley.edu", "course_code": "CS61A", "days_before_deadline": 2},
+        {"email": "b@berkeley.edu", "course_code": "CS61A", "HW05": 5000000},
+    ]
+
+    assert db_fetch.live_assignment_lookup(lookup, students, date(2026, 3, 10)) is lookup
+    # The bad row is the reference path's problem, reported per student as before
+    today = datetime(2026, 3, 10, 10, 0)
+    assert reminders(students[:1], lookup, today) == reminders(
+        students[:1], db_fetch.live_assignment_lookup(lookup, students[:1], today.date()), today
+    )
+
+
+def test_contact_fields_do_not_disable_pruning():
+    # sid, phone_number and discord_id all parse as offsets far beyond any window
+    rng = random.Random(5)
+    lookup = make_lookup()
+    students = [make_student(rng, n) for n in range(50)]
+
+    narrowed = db_fetch.live_assignment_lookup(lookup, students, date(2026, 3, 10))
+
+    assert narrowed is not lookup
+    assert sum(map(len, narrowed.values())) < sum(map(len, lookup.values()))
+    assert narrowed["CS10"] == {}
@@ -0,0 +1,51 @@
+"""Tests for the precompiled "Project {n}" index behind find_deadline_for_entry.
+
+load_deadlines_from_rows indexes project numbers once so matching a code such as
+PROJ2 no longer scans every deadline name. The index must pick exactly the record
+the original scan did: the first name, in load order, containing "Project {n}".
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import db_fetch
+
+
+def load(names):
+    due = datetime(2026, 3, 1, 23, 59)
+    return db_fetch.load_deadlines_from_rows([
+        {"course_code": "CS10", "assignment_name": name, "due": (due + timedelta(days=i)).isoformat()}
+        for i, name in enumerate(names)
+    ])
+
+
+def scan(deadlines, number):
+    """The original linear fallback."""
+    phrase = f"Project {number}"
+    return next((r for name, r in deadlines["CS10"]["name"].items() if phrase in name), None)
+
+
+def test_index_matches_the_linear_scan():
+    rng = random.Random(14)
+    pieces = ["Project 1", "Project 10", "Project 2 Checkpoint", "Project 012", "Lab 3", "Final Project 3", "project 4"]
+    for _ in range(50):
+        deadlines = load(rng.sample(pieces, rng.randint(1, len(pieces))))
+        for number in range(0, 13):
+            assert db_fetch._match_project_phrase(deadlines["CS10"], number) is scan(deadlines, number)
+
+
+def test_project_code_resolves_through_the_index():
+    deadlines = load(["Lab 1", "Project 12: Scheme", "Project 1: Hog"])
+
+    record = db_fetch.find_deadline_for_entry("CS10", "Hog", "PROJ1", deadlines)
+
+    # "Project 1" is a substring of "Project 12: Scheme", which loaded first.
+    assert record is deadlines["CS10"]["name"]["Project 12: Scheme"]
+    assert deadlines["CS10"]["project"]["1"] == "Project 12: Scheme"
+
+
+def test_hand_built_maps_without_an_index_still_match():
+    record = {"due": datetime(2026, 3, 1), "release": None}
+    deadlines = {"CS10": {"code": {}, "name": {"Project 3: Ants": record}}}
+
+    assert db_fetch.find_deadline_for_entry("CS10", None, "PROJ3", deadlines) is record
@@ -0,0 +1,75 @@
+"""Tests for the per-run MessageRenderer behind compose_message.
+
+Cached fragments must produce exactly the messages rendering every block from
+scratch does, including section order, numbering, offsets and resources.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import db_fetch
+from reminder_test_data import ARGS, make_db, make_lookup, make_student
+
+
+def payloads_for(student, lookup, today):
+    codes = db_fetch.collect_assignment_codes(student, lookup)
+    return [p for p in (db_fetch.build_assignment_payload(student, c, lookup, today) for c in codes) if p]
+
+
+def test_cached_messages_match_the_uncached_builder():
+    rng = random.Random(7)
+    lookup = make_lookup()
+    students = [make_student(rng, n) for n in range(200)]
+    compared = 0
+    for day in range(8):
+        today = datetime(2026, 3, 2, 10, 0) + timedelta(days=day)
+        renderer = db_fetch.MessageRenderer(today.date())
+        for student in students:
+            payloads = payloads_for(student, lookup, today)
+            if not payloads:
+                continue
+            expected = db_fetch.compose_message_uncached(student, payloads, today)
+            assert renderer.compose(student, payloads) == expected
+            assert db_fetch.compose_message(student, payloads, today) == expected
+            compared += 1
+    assert compared > 50
+
+
+def test_shared_assignments_render_once():
+    lookup = make_lookup()
+    today = datetime(2026, 3, 8, 10, 0)
+    renderer = db_fetch.MessageRenderer(today.date())
+    student = {"course_code": "CS61A", "days_before_deadline": 1, "first_name": "Al"}
+    payloads = payloads_for(student, lookup, today)
+
+    for _ in range(50):
+        renderer.compose(student, payloads)
+
+    assert len(renderer._blocks) == len(payloads)
+
+
+def test_dict_payloads_without_resources_do_not_grow_the_cache():
+    today = datetime(2026, 3, 8, 10, 0)
+    renderer = db_fetch.MessageRenderer(today.date())
+    payload = {"assignment_code": "LAB1", "assignment_name": "Lab 1", "personal_deadline": datetime(2026, 3, 9, 23, 59)}
+
+    for _ in range(10):
+        renderer.compose({"first_name": "Al"}, [dict(payload)])
+
+    assert len(renderer._blocks) == 1
+
+
+def test_each_run_composes_with_its_own_renderer(monkeypatch):
+    created = []
+
+    class CountingRenderer(db_fetch.MessageRenderer):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            created.append(self)
+
+    monkeypatch.setattr(db_fetch, "MessageRenderer", CountingRenderer)
+    for _ in range(2):
+        db_fetch.run_reminder_mode(make_db(assignment_submissions=[]), ARGS)
+
+    assert len(created) == 2
+    assert all(renderer._blocks for renderer in created)
@@ -0,0 +1,110 @@
+"""Tests for the per-channel message variants MessageRenderer.render produces.
+
+SMS bodies stay in GSM-7 and within the segment budget, Discord bodies within
+Discord's length limit, and the email carries an HTML part next to the
+plain-text body, which must stay exactly compose_message's output.
+"""
+
+from datetime import datetime, timedelta
+
+import db_fetch
+from message_variants import DISCORD_MESSAGE_LIMIT, GSM7_BASIC, GSM7_EXTENDED, sms_segments, to_gsm7
+from reminder_model import Channel, Reminder, Student
+
+TODAY = datetime(2026, 3, 8, 10, 0)
+
+
+def payload(n, **overrides):
+    entry = {
+        "assignment_code": f"LAB{n:02d}",
+        "assignment_name": f"Lab {n}",
+        "personal_deadline": TODAY + timedelta(days=1 + n % 3, hours=13),
+        "resources": [{"resource_name": f"Lab {n} spec", "resource_type": "spec", "link": f"https://example.edu/lab{n}"}],
+    }
+    entry.update(overrides)
+    return entry
+
+
+def render(student, assignments, sms_segments=2):
+    return db_fetch.MessageRenderer(TODAY.date(), sms_segments=sms_segments).render(student, assignments)
+
+
+def test_to_gsm7_keeps_the_message_in_the_gsm_alphabet():
+    assert to_gsm7("Müller’s lab → “due”…") == "Müller's lab -> \"due\"..."
+    assert to_gsm7("Zoë") == "Zoe"
+    assert to_gsm7("Kōhei") == "Kohei"
+    assert all(c in GSM7_BASIC or c in GSM7_EXTENDED for c in to_gsm7("Łukasz 😀 — ok"))
+
+
+def test_text_variant_is_compose_message():
+    student = {"first_name": "Al"}
+    assignments = [payload(1), payload(2, reason="release", offset_days=1)]
+
+    variants = db_fetch.compose_variants(student, assignments, TODAY)
+
+    assert variants.text == db_fetch.compose_message(student, assignments, TODAY)
+
+
+def test_sms_variant_fits_its_segment_budget():
+    assignments = [payload(n) for n in range(12)]
+
+    one = render({"first_name": "Zoë"}, assignments, sms_segments=1)
+    two = render({"first_name": "Zoë"}, assignments, sms_segments=2)
+
+    assert one.sms.startswith("Hey Zoe, AutoRemind here.\nDue soon:\n1. Lab 0 (LAB00) due in 1 day")
+    assert sms_segments(one.sms) == 1
+    assert sms_segments(two.sms) <= 2
+    assert one.sms.endswith("more due soon.")
+    # The bigger budget keeps more assignments
+    assert two.sms.count("(LAB") > one.sms.count("(LAB") > 0
+    # Resource links are left to the email
+    assert "http" not in two.sms
+
+
+def test_sms_overflow_names_what_was_cut():
+    released = [payload(n, reason="release") for n in range(12)]
+    mixed = [payload(n, reason="release") for n in range(6)] + [payload(n) for n in range(6, 12)]
+
+    assert render({"first_name": "Al"}, released, sms_segments=1).sms.endswith("more just released.")
+    assert render({"first_name": "Al"}, mixed, sms_segments=1).sms.endswith("more reminders.")
+    assert render({"first_name": "Al"}, mixed, sms_segments=2).sms.endswith("more due soon.")
+
+
+def test_discord_variant_is_markdown_within_the_limit():
+    few = render({"first_name": "Al"}, [payload(1, assignment_name="Lab_1 *draft*")])
+    assert "**Lab\\_1 \\*draft\\***" in few.discord
+    assert "<https://example.edu/lab1>" in few.discord
+
+    many = render({"first_name": "Al"}, [payload(n, resources=[
+        {"resource_name": f"Resource {r}", "link": f"https://example.edu/lab{n}/r{r}"} for r in range(10)
+    ]) for n in range(30)])
+    assert len(many.discord) <= DISCORD_MESSAGE_LIMIT
+    assert "check your email for the full list" in many.discord
+    assert many.discord.endswith(db_fetch.CLOSING_LINE)
+
+
+def test_html_variant_escapes_and_links():
+    variants = render({"first_name": "<Al>"}, [payload(1, assignment_name="Lab 1 & 2")])
+
+    assert "Hey &lt;Al&gt;," in variants.html
+    assert "Lab 1 &amp; 2" in variants.html
+    assert '<a href="https://example.edu/lab1">Lab 1 spec [spec]</a>' in variants.html
+
+
+def test_channel_messages_use_their_variant():
+    assignments = (payload(1),)
+    variants = db_fetch.compose_variants({"first_name": "Al"}, list(assignments), TODAY)
+    reminder = Reminder(
+        student=Student(id="s1", name="Al Smith", preferred_first_name=None, email="al@berkeley.edu", sid="1"),
+        channels=(Channel("discord", "123"), Channel("sms", "+15105550100"), Channel("email", "al@berkeley.edu")),
+        assignments=assignments,
+        message=variants.text,
+        variants=variants,
+    )
+
+    assert db_fetch.discord_message_for(reminder).message == variants.discord
+    assert db_fetch.sms_message_for(reminder).text_message == variants.sms
+    email = db_fetch.email_message_for(reminder)
+    assert email.message_requests.startswith(variants.text)
+    assert email.message_html.startswith(variants.html)
+    assert "Manage your reminders at" in email.message_html
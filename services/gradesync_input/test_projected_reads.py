@@ -0,0 +1,35 @@
+"""Tests for projected reads in fetch_collection_docs.
+
+Callers pass the fields they use so Firestore returns only those, which matters
+most for assignment_submissions (students × assignments documents).
+"""
+
+import db_fetch
+from fake_firestore import FakeFirestore
+
+
+def test_fields_project_each_document():
+    db = FakeFirestore({"assignment_submissions": [
+        {"email": "a@berkeley.edu", "assignment_name": "Lab 1", "status": "Missing", "score": 0, "sid": "1"},
+        {"email": "b@berkeley.edu", "assignment_name": "Lab 1", "sid": "2"},
+    ]})
+
+    rows = db_fetch.fetch_collection_docs(
+        db, "assignment_submissions", fields=db_fetch.SUBMISSION_FIELDS
+    )
+
+    assert rows == [
+        {"email": "a@berkeley.edu", "assignment_name": "Lab 1", "status": "Missing"},
+        {"email": "b@berkeley.edu", "assignment_name": "Lab 1"},
+    ]
+    assert db_fetch.build_submission_lookup(rows) == {
+        ("a@berkeley.edu", "Lab 1"): "Missing",
+        ("b@berkeley.edu", "Lab 1"): "",
+    }
+
+
+def test_without_fields_documents_are_read_whole():
+    row = {"email": "a@berkeley.edu", "LAB1": 2, "course_code": "CS10"}
+    db = FakeFirestore({"students": [row]})
+
+    assert db_fetch.fetch_collection_docs(db, "students") == [row]
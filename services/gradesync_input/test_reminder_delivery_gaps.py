@@ -55,7 +55,7 @@ def make_lookup(assignment_name="Lab 7", course="CS61A", release=RELEASED_TODAY,
 
 def build(student, lookup, submissions):
     return db_fetch._build_reminder_for_student(
-        student, lookup, submissions, TODAY, "___no_target___", Args
+        student, lookup, submissions, TODAY, Args
     )
 
 
@@ -108,3 +108,20 @@ def test_matching_course_code_still_resolves():
     payload = db_fetch.build_assignment_payload(make_student(course_code="CS61A"), "Lab 7", make_lookup(), TODAY)
     assert payload is not None
     assert payload["assignment_name"] == "Lab 7"
+
+
+def test_only_the_students_own_catalog_is_evaluated():
+    lookup = {**make_lookup(), **make_lookup(assignment_name="Project 1", course="CS10")}
+    assert db_fetch.collect_assignment_codes(make_student(course_code="CS61A"), lookup) == ["Lab 7"]
+    assert db_fetch.collect_assignment_codes(make_student(course_code=" CS10 "), lookup) == ["Project 1"]
+    assert db_fetch.collect_assignment_codes(make_student(course_code=None), lookup) == []
+
+
+def test_another_courses_code_cannot_alias_into_this_catalog():
+    """A CS10 "LAB07B" used to resolve via its LAB07 alias to CS61A's LAB07 and be listed twice."""
+    lookup = {
+        "CS61A": {"LAB07": make_lookup()["CS61A"]["Lab 7"]},
+        "CS10": {"LAB07B": make_lookup(course="CS10")["CS10"]["Lab 7"]},
+    }
+    reminder = build(make_student(), lookup, {})
+    assert [a["assignment_code"] for a in reminder["assignments"]] == ["LAB07"]
@@ -0,0 +1,97 @@
+"""Tests for the slotted reminder records and the copy-on-write merge.
+
+Reminders are frozen __slots__ dataclasses that still read like the dicts the
+CSV writers, outbox builders and tests use, so both shapes flow through the same
+code.
+"""
+
+from dataclasses import FrozenInstanceError
+from datetime import datetime
+
+import pytest
+
+import db_fetch
+from reminder_model import AssignmentPayload, Channel, Reminder, Student
+
+DUE = datetime(2026, 3, 10, 23, 59)
+
+
+def make_payload(name="Lab 3", reason="due"):
+    return AssignmentPayload(
+        assignment_code=name.upper().replace(" ", ""),
+        assignment_name=name,
+        base_deadline=DUE,
+        personal_deadline=DUE,
+        offset_days=0,
+        notification_window_days=1,
+        resources=[],
+        reason=reason,
+    )
+
+
+def make_reminder(*payloads, channels=(Channel("email", "jo@berkeley.edu"),)):
+    return Reminder(
+        student=Student(id="stu1", name="Jo Student", preferred_first_name=None,
+                        email="jo@berkeley.edu", sid="123"),
+        channels=tuple(channels),
+        assignments=payloads or (make_payload(),),
+        message="Hey Jo,",
+    )
+
+
+def test_records_read_like_dicts_without_a_dict():
+    reminder = make_reminder()
+
+    assert reminder["student"]["email"] == "jo@berkeley.edu"
+    assert reminder.get("message") == "Hey Jo,"
+    assert reminder["assignments"][0].get("reason", "due") == "due"
+    assert reminder.get("nope", "default") == "default"
+    with pytest.raises(KeyError):
+        reminder["nope"]
+    assert not hasattr(reminder, "__dict__")
+    with pytest.raises(FrozenInstanceError):
+        reminder.message = "changed"
+
+
+def test_to_dict_matches_the_old_dict_shape():
+    as_dict = make_reminder().to_dict()
+
+    assert as_dict["student"] == {
+        "id": "stu1", "name": "Jo Student", "preferred_first_name": None,
+        "email": "jo@berkeley.edu", "sid": "123",
+    }
+    assert as_dict["channels"] == [{"type": "email", "target": "jo@berkeley.edu"}]
+    assert as_dict["assignments"][0]["assignment_name"] == "Lab 3"
+
+
+def test_single_source_students_keep_their_tuples():
+    reminder = make_reminder()
+
+    (merged,) = db_fetch.merge_reminders_by_student([reminder])
+
+    assert merged.assignments is reminder.assignments
+    assert merged.channels is reminder.channels
+
+
+def test_merge_accepts_dicts_and_records_without_touching_either():
+    record = make_reminder(make_payload("Lab 3", "release"))
+    canvas = {
+        "student": {"email": "JO@berkeley.edu", "name": "Jo Student"},
+        "channels": [{"type": "sms", "target": "+15105550100"}],
+        "assignments": [make_payload("Lab 3").to_dict(), make_payload("Essay").to_dict()],
+        "message": "",
+    }
+
+    (merged,) = db_fetch.merge_reminders_by_student([record, canvas])
+
+    assert [a["reason"] for a in merged.assignments] == ["due", "due"]
+    assert [c["type"] for c in merged.channels] == ["email", "sms"]
+    assert record.assignments[0].reason == "release"
+    assert len(canvas["assignments"]) == 2
+
+
+def test_outbox_reads_records():
+    outbox = db_fetch.build_outbox([make_reminder(channels=(Channel("email", "jo@berkeley.edu"), Channel("sms", "+1")))])
+
+    assert [m.email for m in outbox.email] == ["jo@berkeley.edu"]
+    assert [m.phone_number for m in outbox.sms] == ["+1"]
@@ -0,0 +1,58 @@
+"""Tests for the in-memory outbox run_reminder_mode hands to the senders.
+
+When the pipeline runs in-process the senders consume a ReminderOutbox rather than
+re-parsing CSVs, so the outbox must carry exactly what the CSV exports would.
+"""
+
+import csv
+
+import db_fetch
+from shared.outbox import DiscordMessage, EmailMessage, SmsMessage
+
+
+def make_reminder(email="jo@berkeley.edu", channels=("email", "discord", "sms")):
+    targets = {"email": email, "discord": "jo#1", "sms": "+15105550100"}
+    return {
+        "student": {"id": "stu1", "name": "Jo Student", "email": email, "sid": "123"},
+        "channels": [{"type": t, "target": targets[t]} for t in channels],
+        "assignments": [{"assignment_code": "LAB03", "assignment_name": "Lab 3", "reason": "release"}],
+        "message": "Hey there,\n\nLab 3 is out.",
+    }
+
+
+def read_csv(path):
+    with path.open(newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_outbox_groups_messages_by_channel():
+    outbox = db_fetch.build_outbox([
+        make_reminder(),
+        make_reminder(email="al@berkeley.edu", channels=("email",)),
+    ])
+
+    assert outbox.discord == [DiscordMessage(discord_id="jo#1", message="Hey there,\n\nLab 3 is out.")]
+    assert outbox.sms == [SmsMessage(phone_number="+15105550100", text_message="Hey there,\n\nLab 3 is out.")]
+    assert [m.email for m in outbox.email] == ["jo@berkeley.edu", "al@berkeley.edu"]
+    assert len(outbox) == 4
+
+
+def test_email_message_carries_footer_and_kind():
+    (message,) = db_fetch.build_email_messages([make_reminder(channels=("email",))])
+
+    assert isinstance(message, EmailMessage)
+    assert message.message_kind == "release"
+    assert message.message_requests == db_fetch.append_manage_prefs_footer("Hey there,\n\nLab 3 is out.")
+
+
+def test_csv_exports_match_the_outbox(tmp_path):
+    reminders = [make_reminder()]
+    outbox = db_fetch.build_outbox(reminders)
+
+    db_fetch.write_gmail_csv(reminders, tmp_path)
+    db_fetch.write_discord_csv(reminders, tmp_path / "discord.csv")
+    db_fetch.write_sms_csv(reminders, tmp_path / "sms.csv")
+
+    assert read_csv(tmp_path / "message_requests.csv") == [vars(m) for m in outbox.email]
+    assert read_csv(tmp_path / "discord.csv") == [vars(m) for m in outbox.discord]
+    assert read_csv(tmp_path / "sms.csv") == [vars(m) for m in outbox.sms]
@@ -0,0 +1,48 @@
+"""Tests for load_run_context, the single up-front load of a reminder run.
+
+Independent collections are read concurrently, students are read once for both
+the GradeSync and Canvas reminders, and the study allowlist comes with it.
+"""
+
+import pytest
+
+import db_fetch
+from reminder_test_data import ARGS, make_db
+
+
+def test_context_holds_everything_the_run_reads():
+    db = make_db()
+
+    context = db_fetch.load_run_context(db, ARGS)
+
+    assert db.streams["students"] == 1
+    assert list(context.assignment_lookup["CS10"]) == ["LAB1"]
+    assert context.submission_lookup == {("a@berkeley.edu", "Lab 1"): "2026-03-01"}
+    assert [r["assignment_name"] for r in context.canvas_index["a@berkeley.edu"]] == ["Essay"]
+    assert context.study_access == frozenset({"a@berkeley.edu"})
+    with pytest.raises(AttributeError):
+        context.students = ()
+    with pytest.raises(TypeError):
+        context.assignment_lookup["CS10"]["LAB9"] = {}
+    with pytest.raises(TypeError):
+        context.submission_lookup[("b@berkeley.edu", "Lab 1")] = "Missing"
+    with pytest.raises(AttributeError):
+        context.canvas_index["a@berkeley.edu"].append({})
+
+
+def test_both_reminder_sources_share_one_students_read():
+    db = make_db()
+    context = db_fetch.load_run_context(db, ARGS)
+
+    db_fetch.gather_reminders(db, ARGS, context)
+    canvas = db_fetch.gather_canvas_reminders(db, ARGS, context)
+
+    assert db.streams["students"] == 1
+    assert [r["student"]["email"] for r in canvas] == ["a@berkeley.edu"]
+
+
+def test_unreadable_study_data_still_aborts_the_run():
+    db = make_db(**{db_fetch.STUDY_PARTICIPANTS_TABLE: None})
+
+    with pytest.raises(RuntimeError, match="study gating"):
+        db_fetch.load_run_context(db, ARGS)
@@ -0,0 +1,60 @@
+"""Tests for the stage timers and the JSON metrics line run_reminder_mode prints."""
+
+import json
+import pstats
+
+import db_fetch
+from reminder_test_data import make_args, make_db
+from run_metrics import RunMetrics
+
+
+def test_stages_accumulate_time_and_calls():
+    metrics = RunMetrics()
+    for _ in range(3):
+        with metrics.stage("merge"):
+            pass
+    metrics.count("reminders", 2)
+    metrics.count("reminders")
+
+    summary = metrics.summary(firestore_reads={"queries": 1})
+
+    assert summary["stages"]["merge"]["calls"] == 3
+    assert summary["counters"] == {"reminders": 3}
+    assert summary["firestore_reads"] == {"queries": 1}
+
+
+def test_stage_is_recorded_when_it_raises():
+    metrics = RunMetrics()
+    try:
+        with metrics.stage("fetch.students"):
+            raise ValueError
+    except ValueError:
+        pass
+
+    assert metrics.summary()["stages"]["fetch.students"]["calls"] == 1
+
+
+def test_run_reminder_mode_prints_a_json_summary(capsys):
+    db = make_db(assignment_submissions=[])
+    for student in db.rows("students"):
+        student["email_pref"] = True
+
+    db_fetch.run_reminder_mode(db, make_args())
+
+    lines = [line for line in capsys.readouterr().out.splitlines() if '"reminder_run_metrics"' in line]
+    assert len(lines) == 1
+    summary = json.loads(lines[0])
+    for stage in ("load_context", "fetch.deadlines", "fetch.students", "build.assignment_lookup",
+                  "evaluate.gradesync", "merge", "gate", "messages.email"):
+        assert stage in summary["stages"]
+    assert summary["counters"]["reminders"] == 1
+    assert summary["counters"]["gated_out"] == 1
+    assert summary["counters"]["messages.email"] == 1
+    assert summary["firestore_reads"]["documents"] > 0
+
+
+def test_profile_flag_writes_a_cprofile_dump(tmp_path):
+    path = tmp_path / "run.prof"
+    db_fetch.main(["--profile", str(path)], db=make_db(assignment_submissions=[]))
+
+    assert pstats.Stats(str(path)).total_calls > 0
@@ -0,0 +1,71 @@
+"""Tests for loading assignment_submissions only for today's live assignments.
+
+gather_reminders used to read the whole term's submissions; it now asks for the
+rows of the assignments still in the lookup after date-window pruning, 30 names
+per `in` query.
+"""
+
+import db_fetch
+from fake_firestore import FakeFirestore
+from reminder_test_data import ARGS, due_in, make_db
+
+
+def test_only_named_assignments_are_read_in_chunks():
+    rows = [
+        {"email": f"s{n}@berkeley.edu", "assignment_name": f"Lab {n % 40}", "status": "Missing", "score": 0}
+        for n in range(200)
+    ]
+    db = FakeFirestore({db_fetch.SUBMISSIONS_TABLE: rows})
+    names = [f"Lab {n}" for n in range(35)]
+
+    fetched = db_fetch.fetch_submissions_for_assignments(db, names)
+
+    assert db.queries == 2
+    assert len(fetched) == 175
+    assert {r["assignment_name"] for r in fetched} == set(names)
+    assert all(set(r) == set(db_fetch.SUBMISSION_FIELDS) for r in fetched)
+
+
+def test_no_live_assignments_means_no_query():
+    db = FakeFirestore({db_fetch.SUBMISSIONS_TABLE: [
+        {"email": "a@berkeley.edu", "assignment_name": "Lab 1", "status": "Missing"},
+    ]})
+
+    assert db_fetch.fetch_submissions_for_assignments(db, []) == []
+    assert db.queries == 0
+
+
+def test_live_names_match_the_payload_names():
+    lookup = {
+        "CS10": {
+            "LAB1": {"assignment_code": "LAB1", "assignment_name": "Lab 1 "},
+            "PROJ1": {"assignment_code": "PROJ1"},
+        },
+        "CS61A": {},
+    }
+
+    assert db_fetch.live_assignment_names(lookup) == ["Lab 1", "Lab 1 ", "PROJ1"]
+
+
+def test_run_reads_only_the_live_assignments_submissions():
+    # A realistic roster (ids, phones, Discord IDs) and a term of 40 labs, one due tomorrow
+    labs = [(f"LAB{n}", f"Lab {n}", due_in(1 if n == 1 else 30 + n)) for n in range(1, 41)]
+    students = [
+        {"email": f"s{n}@berkeley.edu", "course_code": "CS10", "days_before_deadline": 2,
+         "sid": str(3035550000 + n), "phone_number": f"+1510555{n:04d}", "discord_id": str(10**17 + n)}
+        for n in range(20)
+    ]
+    db = make_db(
+        deadlines=[{"course_code": "CS10", "assignment_code": c, "assignment_name": name, "due": due}
+                   for c, name, due in labs],
+        assignment_resources=[{"course_code": "CS10", "assignment_code": c, "assignment_name": name}
+                              for c, name, _ in labs],
+        assignment_submissions=[{"email": s["email"], "assignment_name": name, "status": "Missing"}
+                                for s in students for _, name, _ in labs],
+        students=students,
+    )
+
+    context = db_fetch.load_run_context(db, ARGS)
+
+    assert db.streams[db_fetch.SUBMISSIONS_TABLE] == 1
+    assert {name for _, name in context.submission_lookup} == {"Lab 1"}
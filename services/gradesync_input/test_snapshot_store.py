@@ -0,0 +1,104 @@
+"""Tests for the --snapshot delta fetch.
+
+With a snapshot, a run lists each collection's document IDs and update_times and
+re-reads only the documents that are new or changed since the last run; the rest
+come from the local SQLite file.
+"""
+
+from datetime import datetime, timezone
+
+import db_fetch
+from fake_firestore import FakeFirestore
+from snapshot_store import SnapshotStore
+
+
+def make_db(collection, docs):
+    """FakeFirestore holding {doc_id: (update_time, data)} in `collection`."""
+    db = FakeFirestore({})
+    for doc_id, (update_time, data) in docs.items():
+        db.set(collection, doc_id, data, update_time)
+    return db
+
+
+def stamp(minute):
+    return datetime(2026, 3, 9, 8, minute, tzinfo=timezone.utc)
+
+
+def test_second_run_rereads_only_changed_documents(tmp_path):
+    db = make_db("students", {
+        "a": (stamp(0), {"email": "a@berkeley.edu", "joined": stamp(30)}),
+        "b": (stamp(0), {"email": "b@berkeley.edu"}),
+        "c": (stamp(0), {"email": "c@berkeley.edu"}),
+    })
+
+    with SnapshotStore(tmp_path / "snap.sqlite3") as store:
+        first = store.fetch(db, "students")
+    assert first.changed == 3
+    assert sorted(db.reads) == ["a", "b", "c"]
+
+    db.reads.clear()
+    db.set("students", "b", {"email": "b@berkeley.edu", "email_pref": False}, stamp(5))
+    db.delete("students", "c")
+    db.set("students", "d", {"email": "d@berkeley.edu"}, stamp(5))
+
+    with SnapshotStore(tmp_path / "snap.sqlite3") as store:
+        second = store.fetch(db, "students")
+
+    assert sorted(db.reads) == ["b", "d"]
+    assert (second.listed, second.changed, second.deleted) == (3, 2, 1)
+    assert second.rows == [
+        {"email": "a@berkeley.edu", "joined": stamp(30)},
+        {"email": "b@berkeley.edu", "email_pref": False},
+        {"email": "d@berkeley.edu"},
+    ]
+
+
+def test_fetch_collection_docs_counts_listing_and_rereads(tmp_path):
+    db = make_db("deadlines", {
+        "hw1": (stamp(0), {"assignment_code": "HW1"}),
+        "hw2": (stamp(0), {"assignment_code": "HW2"}),
+    })
+
+    with SnapshotStore(tmp_path / "snap.sqlite3") as store:
+        db_fetch.fetch_collection_docs(db, "deadlines", snapshot=store)
+        db_fetch.reset_firestore_reads()
+        rows = db_fetch.fetch_collection_docs(db, "deadlines", snapshot=store)
+
+    assert rows == [{"assignment_code": "HW1"}, {"assignment_code": "HW2"}]
+    # Two IDs listed, nothing re-read
+    assert db_fetch.FIRESTORE_READS == {"queries": 1, "documents": 2}
+
+
+def test_changing_the_projection_rereads_everything(tmp_path):
+    db = make_db("assignment_submissions", {
+        "1": (stamp(0), {"email": "a@berkeley.edu", "assignment_name": "Lab 1", "status": "Missing", "score": 0}),
+    })
+
+    with SnapshotStore(tmp_path / "snap.sqlite3") as store:
+        narrow = store.fetch(db, "assignment_submissions", fields=("email", "status"))
+        wide = store.fetch(db, "assignment_submissions", fields=db_fetch.SUBMISSION_FIELDS)
+
+    assert narrow.rows == [{"email": "a@berkeley.edu", "status": "Missing"}]
+    assert wide.changed == 1
+    assert wide.rows == [{"email": "a@berkeley.edu", "assignment_name": "Lab 1", "status": "Missing"}]
+
+
+def test_geopoints_references_and_bytes_round_trip(tmp_path):
+    from google.cloud.firestore_v1 import DocumentReference, GeoPoint
+
+    ref = DocumentReference("students", "a", client=object())
+    db = make_db("students", {
+        "a": (stamp(0), {"where": GeoPoint(37.87, -122.26), "advisor": ref, "avatar": b"\x89PNG", "n": 1}),
+    })
+
+    with SnapshotStore(tmp_path / "snap.sqlite3") as store:
+        store.fetch(db, "students")
+    db.reads.clear()
+    with SnapshotStore(tmp_path / "snap.sqlite3") as store:
+        (row,) = store.fetch(db, "students").rows
+
+    assert db.reads == []
+    assert row["where"] == GeoPoint(37.87, -122.26)
+    assert row["advisor"] == "students/a"
+    assert row["avatar"] == b"\x89PNG"
+    assert row["n"] == 1
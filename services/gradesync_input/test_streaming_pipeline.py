@@ -0,0 +1,74 @@
+"""Tests for the streaming reminder pipeline in run_reminder_mode.
+
+Reminders are produced one student at a time (GradeSync and Canvas entries merged
+per email), gated, and handed straight to the channel sinks.
+"""
+
+import types
+
+import pytest
+
+import db_fetch
+from reminder_test_data import make_args, make_db
+
+
+def test_reminders_are_yielded_lazily_and_merged_per_student():
+    db = make_db(students=[
+        {"email": "a@berkeley.edu", "course_code": "CS10", "days_before_deadline": 1,
+         "email_pref": True, "canvas_connected": True, "first_name": "Al"},
+        {"email": "b@berkeley.edu", "course_code": "CS10", "days_before_deadline": 1, "email_pref": True},
+    ], assignment_submissions=[])
+    args = make_args()
+    context = db_fetch.load_run_context(db, args)
+
+    stream = db_fetch.iter_reminders(db, args, context)
+    assert isinstance(stream, types.GeneratorType)
+
+    first = next(stream)
+    assert first["student"]["email"] == "a@berkeley.edu"
+    # Lab 1 from GradeSync and the Canvas essay land in one message
+    assert [a["assignment_name"] for a in first["assignments"]] == ["Lab 1", "Essay"]
+    assert [r["student"]["email"] for r in stream] == ["b@berkeley.edu"]
+
+
+def test_run_reminder_mode_gates_before_the_outbox():
+    db = make_db(assignment_submissions=[])
+    for student in db.rows("students"):
+        student["email_pref"] = True
+
+    outbox = db_fetch.run_reminder_mode(db, make_args())
+
+    # b@ is waitlisted in the study, so only a@ gets an email
+    assert [m.email for m in outbox.email] == ["a@berkeley.edu"]
+
+
+def test_standalone_run_collects_no_outbox():
+    db = make_db(assignment_submissions=[])
+
+    assert db_fetch.run_reminder_mode(db, make_args(), collect_outbox=False) is None
+
+
+def test_failed_run_leaves_the_previous_csv_export_in_place(tmp_path, monkeypatch):
+    db = make_db(assignment_submissions=[])
+    for student in db.rows("students"):
+        student["email_pref"] = True
+    export_path = tmp_path / "message_requests.csv"
+    export_path.write_text("yesterday\n")
+    monkeypatch.setattr(db_fetch, "open_csv_exports", lambda args: {"email": db_fetch.gmail_csv(tmp_path)})
+
+    def fail(entry):
+        raise RuntimeError("stream broke")
+
+    monkeypatch.setattr(db_fetch, "_print_reminder", fail)
+    with pytest.raises(RuntimeError):
+        db_fetch.run_reminder_mode(db, make_args())
+
+    assert export_path.read_text() == "yesterday\n"
+    assert [p.name for p in tmp_path.iterdir()] == ["message_requests.csv"]
+
+    monkeypatch.undo()
+    monkeypatch.setattr(db_fetch, "open_csv_exports", lambda args: {"email": db_fetch.gmail_csv(tmp_path)})
+    db_fetch.run_reminder_mode(db, make_args())
+
+    assert "a@berkeley.edu" in export_path.read_text()
+    assert [p.name for p in tmp_path.iterdir()] == ["message_requests.csv"]
@@ -0,0 +1,74 @@
+"""Tests for per-student tracing (REMINDER_TRACE_EMAILS / --trace-email).
+
+Only configured students are traced, and with nobody configured the run prints
+no per-student diagnostics at all.
+"""
+
+import pytest
+
+import db_fetch
+from reminder_test_data import make_args, make_db
+from tracing import Tracer
+
+
+def run(capsys, monkeypatch, env="", **args):
+    monkeypatch.setattr(db_fetch.settings, "REMINDER_TRACE_EMAILS", env)
+    db = make_db(assignment_submissions=[])
+    for student in db.rows("students"):
+        student["email_pref"] = True
+    db_fetch.run_reminder_mode(db, make_args(**args))
+    return capsys.readouterr().out
+
+
+def test_tracer_matches_configured_emails_only():
+    tracer = Tracer.from_config(" A@Berkeley.edu, ,", ["b@berkeley.edu"], "summary")
+
+    assert tracer.emails == {"a@berkeley.edu", "b@berkeley.edu"}
+    assert tracer.traces("a@berkeley.edu ")
+    assert not tracer.traces("aa@berkeley.edu")
+    assert tracer.traced_indices([{"email": "x@berkeley.edu"}, {"email": "B@berkeley.edu"}]) == {1}
+    with pytest.raises(ValueError):
+        Tracer([], "verbose")
+
+
+def test_untraced_run_prints_no_student_diagnostics(capsys, monkeypatch):
+    out = run(capsys, monkeypatch)
+
+    assert "TRACE" not in out
+    assert "🔍 DEBUG" not in out
+    assert "📋 Processing student" not in out
+
+
+def test_summary_level_traces_outcomes_without_the_evaluation_detail(capsys, monkeypatch):
+    out = run(capsys, monkeypatch, env="a@berkeley.edu", trace_level="summary")
+
+    assert "🔎 TRACE a@berkeley.edu student.loaded" in out
+    assert "🔎 TRACE a@berkeley.edu reminder.built" in out
+    assert "b@berkeley.edu student.loaded" not in out
+    assert "🔍 DEBUG" not in out
+
+
+def test_detail_level_adds_evaluation_for_traced_students_only(capsys, monkeypatch):
+    out = run(capsys, monkeypatch, trace_email=["b@berkeley.edu"], trace_level="detail")
+
+    assert "🔎 TRACE b@berkeley.edu reminder.built" in out
+    assert "📋 Processing student: b@berkeley.edu" in out
+    assert "📋 Processing student: a@berkeley.edu" not in out
+
+
+def test_missing_traced_student_is_reported(capsys, monkeypatch):
+    out = run(capsys, monkeypatch, env="nobody@berkeley.edu")
+
+    assert "🔎 TRACE nobody@berkeley.edu student.missing" in out
+
+
+def test_trace_level_from_the_environment_is_validated(capsys, monkeypatch):
+    monkeypatch.setenv("REMINDER_TRACE_LEVEL", "summary")
+    assert db_fetch.parse_args([]).trace_level == "summary"
+
+    monkeypatch.setenv("REMINDER_TRACE_LEVEL", "verbose")
+    with pytest.raises(SystemExit):
+        db_fetch.parse_args([])
+    assert "REMINDER_TRACE_LEVEL must be one of summary, detail (got 'verbose')" in capsys.readouterr().err
+
+    assert db_fetch.parse_args(["--trace-level", "detail"]).trace_level == "detail"
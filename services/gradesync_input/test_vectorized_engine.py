@@ -0,0 +1,61 @@
+"""Tests for the vectorized evaluation engine (--engine vectorized).
+
+The engine must be a drop-in replacement for calling build_assignment_payload per
+(student, assignment) pair, so these tests run both paths over a varied roster and
+require identical reminders.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import db_fetch
+from reminder_test_data import ARGS, UTC, make_lookup, make_student
+
+
+def reminders_both_ways(students, lookup, today):
+    vectorized = db_fetch.evaluate_payloads_vectorized(students, lookup, today)
+    for idx, student in enumerate(students):
+        expected = db_fetch._build_reminder_for_student(student, lookup, {}, today, ARGS)
+        actual = db_fetch._build_reminder_for_student(
+            student, lookup, {}, today, ARGS, payloads=vectorized.get(idx)
+        )
+        yield idx in vectorized, expected, actual
+
+
+def test_engines_agree_across_days_and_timezones():
+    rng = random.Random(61)
+    lookup = make_lookup()
+    students = [make_student(rng, n) for n in range(300)]
+    days = [datetime(2026, 3, 2, 10, 0) + timedelta(days=d) for d in range(12)]
+    days += [datetime(2026, 10, 28, 8, 0, tzinfo=db_fetch.PROJECT_TZ) + timedelta(days=d) for d in range(6)]
+    days.append(datetime(2026, 3, 8, 7, 30, tzinfo=UTC))
+
+    matched = 0
+    for today in days:
+        for vectorized, expected, actual in reminders_both_ways(students, lookup, today):
+            assert vectorized
+            assert actual == expected
+            matched += expected is not None
+    # The roster must actually exercise the matching rules, not just agree on "nothing".
+    assert matched > 100
+
+
+def test_huge_offset_falls_back_to_reference_path():
+    lookup = make_lookup()
+    student = {"email": "s@berkeley.edu", "course_code": "CS61A", "days_before_deadline": 1, "HW05": 10**9}
+
+    assert db_fetch.evaluate_payloads_vectorized([student], lookup, datetime(2026, 3, 8, 9, 0)) == {}
+
+
+def test_excluded_students_are_left_to_the_reference_path():
+    lookup = make_lookup()
+    students = [
+        {"email": "a@berkeley.edu", "course_code": "CS61A", "days_before_deadline": 1},
+        {"email": "b@berkeley.edu", "course_code": "CS61A", "days_before_deadline": 1},
+    ]
+
+    result = db_fetch.evaluate_payloads_vectorized(students, lookup, datetime(2026, 3, 8, 9, 0), exclude={1})
+
+    assert set(result) == {0}
+    # LAB04's 06:59 UTC deadline falls on March 9 in Berkeley, like HW05's.
+    assert sorted(p["assignment_code"] for p in result[0]) == ["HW05", "LAB04"]
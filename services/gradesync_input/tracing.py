@@ -0,0 +1,55 @@
+"""
+Per-student decision tracing for the reminder run.
+
+Tracing follows a configured set of student emails (REMINDER_TRACE_EMAILS or
+db_fetch's --trace-email) through the run. At the "summary" level each traced
+student gets one line per outcome; at "detail" every assignment evaluation
+prints the same diagnostics --debug does, for those students only.
+
+Whether a student is traced is decided once per run, from the roster, so the
+per-student and per-assignment code only ever checks a bool. With no emails
+configured nothing is checked at all.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Iterable, Optional, Sequence
+
+TRACE_LEVELS = ("summary", "detail")
+
+
+class Tracer:
+    def __init__(self, emails: Iterable[str] = (), level: str = "detail"):
+        if level not in TRACE_LEVELS:
+            raise ValueError(f"Unknown trace level {level!r}; expected one of {TRACE_LEVELS}")
+        self.emails = frozenset(e.strip().lower() for e in emails if e and e.strip())
+        self.level = level
+
+    @classmethod
+    def from_config(cls, env_emails: Optional[str], cli_emails: Optional[Sequence[str]], level: str) -> "Tracer":
+        """Trace the comma-separated `env_emails` plus every --trace-email."""
+        emails = [e for e in (env_emails or "").split(",")]
+        emails.extend(cli_emails or ())
+        return cls(emails, level)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.emails)
+
+    @property
+    def detail(self) -> bool:
+        return self.level == "detail"
+
+    def traces(self, email: Any) -> bool:
+        return str(email or "").strip().lower() in self.emails
+
+    def traced_indices(self, students: Sequence[dict]) -> frozenset:
+        """Roster positions of the traced students."""
+        if not self.emails:
+            return frozenset()
+        return frozenset(idx for idx, student in enumerate(students) if self.traces(student.get("email")))
+
+    def emit(self, email: Any, event: str, **fields: Any) -> None:
+        """One structured trace line for a traced student."""
+        print(f"🔎 TRACE {email} {event} {json.dumps(fields, default=str, sort_keys=True)}")
@@ -1,11 +1,22 @@
 """
 Shared delivery logging utility for all notification services.
 Logs message delivery attempts to Firestore 'message_delivery_logs' collection.
+
+By default each call writes its own document. Senders that log many deliveries
+should wrap their send loop in `buffered_delivery_logs()`, which queues entries
+and commits them with batched writes instead of one round trip per message.
 """
 
+import atexit
+import json
 import logging
+import secrets
+import string
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional, Dict, Any
+from pathlib import Path
+from typing import Optional, Dict, Any, Iterator, List, Tuple
 
 import firebase_admin
 from firebase_admin import credentials as fb_creds, firestore as fb_firestore
@@ -34,6 +45,190 @@ def _get_firestore() -> fb_firestore.Client:
     return _db
 
 
+DELIVERY_LOGS_COLLECTION = "message_delivery_logs"
+
+# Firestore rejects a WriteBatch holding more than 500 writes.
+MAX_BATCH_WRITES = 500
+
+_AUTO_ID_ALPHABET = string.ascii_letters + string.digits
+
+
+def _auto_id() -> str:
+    """Return a 20-character document ID in the same form Firestore generates."""
+    return "".join(secrets.choice(_AUTO_ID_ALPHABET) for _ in range(20))
+
+
+def _commit_entries(db: fb_firestore.Client, entries: List[Tuple[str, Dict[str, Any]]]) -> None:
+    """Write (doc_id, entry) pairs in WriteBatch chunks of at most MAX_BATCH_WRITES."""
+    collection = db.collection(DELIVERY_LOGS_COLLECTION)
+    for start in range(0, len(entries), MAX_BATCH_WRITES):
+        batch = db.batch()
+        for doc_id, entry in entries[start:start + MAX_BATCH_WRITES]:
+            batch.set(collection.document(doc_id), entry)
+        batch.commit()
+
+
+class BufferedDeliveryLogger:
+    """Queue delivery log entries and write them to Firestore in batches.
+
+    Entries are committed by a background thread every `flush_interval` seconds,
+    as soon as a full batch of MAX_BATCH_WRITES is waiting, and on `close()`.
+    Document IDs are generated client-side, so callers still get an ID back
+    immediately. If a commit fails, the entries are appended to a local JSON-lines
+    spill file rather than lost; `replay_spilled_logs` uploads them later.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = 5.0,
+        spill_path: Optional[Path] = None,
+        db: Optional[fb_firestore.Client] = None,
+    ):
+        self.flush_interval = flush_interval
+        self.spill_path = Path(spill_path or settings.DELIVERY_LOG_SPILL_PATH)
+        self._db = db
+        self._buffer: List[Tuple[str, Dict[str, Any]]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.written = 0
+        self.spilled = 0
+
+    def __enter__(self) -> "BufferedDeliveryLogger":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="delivery-log-flusher", daemon=True
+            )
+            self._thread.start()
+
+    def add(self, entry: Dict[str, Any]) -> str:
+        """Queue one entry and return the document ID it will be written under."""
+        doc_id = _auto_id()
+        with self._lock:
+            self._buffer.append((doc_id, entry))
+            full = len(self._buffer) >= MAX_BATCH_WRITES
+        if full:
+            self._wake.set()
+        return doc_id
+
+    def flush(self) -> None:
+        """Commit everything queued so far, spilling to disk if Firestore fails."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._buffer = self._buffer, []
+            if not pending:
+                return
+            try:
+                db = self._db or _get_firestore()
+                _commit_entries(db, pending)
+                self.written += len(pending)
+                logger.info(f"Flushed {len(pending)} delivery log(s) to Firestore")
+            except Exception as e:
+                logger.error(f"Failed to flush {len(pending)} delivery log(s): {e}")
+                self._spill(pending)
+
+    def close(self) -> None:
+        """Stop the background thread and flush whatever is still queued."""
+        self._closed.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._closed.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def _spill(self, entries: List[Tuple[str, Dict[str, Any]]]) -> None:
+        try:
+            self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.spill_path.open("a", encoding="utf-8") as f:
+                for doc_id, entry in entries:
+                    f.write(json.dumps({"id": doc_id, "entry": entry}, default=str) + "\n")
+            self.spilled += len(entries)
+            logger.warning(f"Spilled {len(entries)} delivery log(s) to {self.spill_path}")
+        except Exception as e:
+            logger.error(f"Could not spill delivery logs to {self.spill_path}: {e}")
+
+
+def replay_spilled_logs(spill_path: Optional[Path] = None) -> int:
+    """
+    Upload entries left in the spill file by a failed flush, then remove it.
+
+    Entries keep the document IDs they were given when first logged, so replaying
+    the same file twice does not create duplicates.
+
+    Returns:
+        Number of entries uploaded (0 if there was nothing to replay or Firestore
+        is still unreachable)
+    """
+    path = Path(spill_path or settings.DELIVERY_LOG_SPILL_PATH)
+    if not path.exists():
+        return 0
+    try:
+        with path.open(encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        _commit_entries(_get_firestore(), [(r["id"], r["entry"]) for r in records])
+        path.unlink()
+    except Exception as e:
+        logger.error(f"Failed to replay spilled delivery logs from {path}: {e}")
+        return 0
+    logger.info(f"Replayed {len(records)} spilled delivery log(s) from {path}")
+    return len(records)
+
+
+_active_buffer: Optional[BufferedDeliveryLogger] = None
+_active_users = 0
+_active_lock = threading.Lock()
+
+
+@contextmanager
+def buffered_delivery_logs(flush_interval: float = 5.0) -> Iterator[BufferedDeliveryLogger]:
+    """
+    Route every log_delivery call made inside the block through one shared buffer.
+
+    Nested or concurrent blocks (e.g. several senders running in one process)
+    share the same buffer; it is flushed and closed when the last block exits.
+    """
+    global _active_buffer, _active_users
+    with _active_lock:
+        if _active_buffer is None:
+            replay_spilled_logs()
+            _active_buffer = BufferedDeliveryLogger(flush_interval=flush_interval)
+            _active_buffer.start()
+        _active_users += 1
+        buffer = _active_buffer
+    try:
+        yield buffer
+    finally:
+        with _active_lock:
+            _active_users -= 1
+            last_user = _active_users == 0
+            if last_user:
+                _active_buffer = None
+        if last_user:
+            buffer.close()
+
+
+@atexit.register
+def _flush_active_buffer() -> None:
+    """Last-chance flush if the process exits while a buffered block is still open."""
+    buffer = _active_buffer
+    if buffer is not None:
+        buffer.close()
+
+
 def log_delivery(
     channel: str,
     recipient: str,
@@ -52,7 +247,8 @@ def log_delivery(
     Args:
         channel: 'email', 'sms', or 'discord'
         recipient: Email address, phone number, or Discord ID
-        status: 'sent' or 'failed'
+        status: 'sent', 'failed', or 'unknown' (the request may have reached the
+            provider, so it was neither confirmed nor retried)
         provider_message_id: ID from the provider (Gmail, Twilio, Discord)
         assignment_name: Name of the assignment
         course_code: Course code
@@ -62,11 +258,10 @@ def log_delivery(
         metadata: Additional data
 
     Returns:
-        Document ID of the created log entry, or None on failure
+        Document ID of the created log entry, or None on failure. Inside
+        `buffered_delivery_logs()` the ID is returned before the write lands.
     """
     try:
-        db = _get_firestore()
-
         log_entry = {
             "channel": channel,
             "recipient": recipient,
@@ -81,7 +276,14 @@ def log_delivery(
             "metadata": metadata or {}
         }
 
-        doc_ref = db.collection("message_delivery_logs").add(log_entry)
+        buffer = _active_buffer
+        if buffer is not None:
+            doc_id = buffer.add(log_entry)
+            logger.info(f"Queued {channel} delivery log: {status} to {recipient} (doc: {doc_id})")
+            return doc_id
+
+        db = _get_firestore()
+        doc_ref = db.collection(DELIVERY_LOGS_COLLECTION).add(log_entry)
         doc_id = doc_ref[1].id
 
         logger.info(f"Logged {channel} delivery: {status} to {recipient} (doc: {doc_id})")
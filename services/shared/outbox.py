@@ -0,0 +1,60 @@
+"""
+Typed in-memory handoff between reminder generation and the channel senders.
+
+`db_fetch.run_reminder_mode` returns a `ReminderOutbox`; when the pipeline runs
+in-process the senders consume it directly. Field names match the columns of
+the CSVs the senders read when run standalone, so `asdict()` of a message is
+exactly its CSV row.
+"""
+
+from dataclasses import asdict, dataclass, field, fields
+from typing import Any, Dict, List
+
+
+@dataclass(frozen=True)
+class DiscordMessage:
+    discord_id: str
+    message: str
+
+
+@dataclass(frozen=True)
+class SmsMessage:
+    phone_number: str
+    text_message: str
+
+
+@dataclass(frozen=True)
+class EmailMessage:
+    name: str
+    sid: str
+    email: str
+    # Summary of assignment names; drives the subject line and logging only
+    assignment: str
+    # Fully composed body, footer included
+    message_requests: str
+    # "due" or "release"; selects the subject line
+    message_kind: str
+    # HTML alternative to message_requests, footer included; empty for plain-text only
+    message_html: str = ""
+
+
+@dataclass
+class ReminderOutbox:
+    """Every message one reminder run wants delivered, grouped by channel."""
+
+    discord: List[DiscordMessage] = field(default_factory=list)
+    sms: List[SmsMessage] = field(default_factory=list)
+    email: List[EmailMessage] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.discord) + len(self.sms) + len(self.email)
+
+
+def csv_fieldnames(message_type: type) -> List[str]:
+    """CSV header for a message type, in field order."""
+    return [f.name for f in fields(message_type)]
+
+
+def to_row(message: Any) -> Dict[str, str]:
+    """CSV row for a message."""
+    return asdict(message)
@@ -30,6 +30,20 @@ FIREBASE_SERVICE_ACCOUNT_PATH = Path(_sa_env) if _sa_env else SERVICE_ACCOUNT_PA
 # auto-enrolled at consent time know where to change their preferences.
 AUTOREMIND_SITE_URL = os.getenv("AUTOREMIND_SITE_URL", "https://autoremind.eecs.berkeley.edu")
 
+# Local file that buffered delivery logs fall back to when Firestore is
+# unreachable. Holds recipient emails/phone numbers, so keep it out of git.
+_spill_env = os.getenv("DELIVERY_LOG_SPILL_PATH")
+DELIVERY_LOG_SPILL_PATH = Path(_spill_env) if _spill_env else SERVICES_DIR / "delivery_log_spill.jsonl"
+
+# Optional GCS home for db_fetch's --snapshot file, for jobs whose working
+# directory doesn't survive between runs. Unset keeps the snapshot local only.
+REMINDER_SNAPSHOT_BUCKET = os.getenv("REMINDER_SNAPSHOT_BUCKET")
+REMINDER_SNAPSHOT_BLOB = os.getenv("REMINDER_SNAPSHOT_BLOB", "reminder_snapshot.sqlite3")
+
+# Comma-separated student emails whose reminder decisions db_fetch traces
+# (see --trace-email). Unset traces no one.
+REMINDER_TRACE_EMAILS = os.getenv("REMINDER_TRACE_EMAILS", "")
+
 # Twilio Configuration
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
@@ -1,7 +1,9 @@
 import os
 import csv
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import List, Optional
 from twilio.rest import Client
 from twilio.base.exceptions import TwilioRestException
 
@@ -11,7 +13,9 @@ if str(SERVICES_DIR) not in sys.path:
     sys.path.append(str(SERVICES_DIR))
 
 from shared import settings
-from shared.delivery_logger import log_sms_delivery
+from shared.delivery_logger import buffered_delivery_logs, log_sms_delivery
+from shared.outbox import SmsMessage
+from shared.rate_limit import TokenBucket, backoff_delay
 
 ACCOUNT_SID = settings.TWILIO_ACCOUNT_SID
 AUTH_TOKEN = settings.TWILIO_AUTH_TOKEN
@@ -19,6 +23,15 @@ FROM_NUMBER = "+18556796659"
 
 CSV_FOLDER = Path(os.getenv("CSV_FOLDER", "message_requests"))
 
+# Messages per second the sending number / Messaging Service is provisioned for
+# (toll-free numbers default to 3). Twilio queues anything beyond it, so going
+# faster only moves the wait to their side.
+MESSAGES_PER_SECOND = float(os.getenv("TWILIO_MPS", "3"))
+MAX_WORKERS = int(os.getenv("TWILIO_MAX_WORKERS", "8"))
+MAX_RETRIES = 3
+# 20429 is Twilio's "Too Many Requests" error code.
+RATE_LIMIT_ERROR_CODES = {20429}
+
 
 def parse_csv(file_path: Path) -> list[dict]:
     rows = []
@@ -32,9 +45,8 @@ def parse_csv(file_path: Path) -> list[dict]:
     return rows
 
 
-def send_text_messages():
-    client = Client(ACCOUNT_SID, AUTH_TOKEN)
-
+def read_csv_folder() -> Optional[list[dict]]:
+    """Rows from every CSV in CSV_FOLDER, or None if there are no CSVs."""
     csv_folder = Path(__file__).resolve().parent / CSV_FOLDER if not CSV_FOLDER.is_absolute() else CSV_FOLDER
 
     if not csv_folder.exists():
@@ -43,42 +55,105 @@ def send_text_messages():
     csv_files = list(csv_folder.glob("*.csv"))
     if not csv_files:
         print(f"No CSV files found in {csv_folder}")
-        return
-
-    total_sent = 0
-    total_failed = 0
+        return None
 
+    rows = []
     for csv_path in csv_files:
         print(f"\nProcessing {csv_path.name}...")
-        rows = parse_csv(csv_path)
-
-        if not rows:
+        file_rows = parse_csv(csv_path)
+        if not file_rows:
             print(f"  No valid rows in {csv_path.name}, skipping")
             continue
+        rows.extend(file_rows)
+    return rows
 
-        for row in rows:
-            to = row["phone_number"]
-            body = row["text_message"]
-            try:
-                msg = client.messages.create(
-                    body=body,
-                    to=to,
-                    from_=FROM_NUMBER,
-                )
-                print(f"Sent to {to}, SID: {msg.sid}")
-                log_sms_delivery(recipient=to, status="sent", twilio_sid=msg.sid)
-                total_sent += 1
-                time.sleep(0.25)
-            except TwilioRestException as e:
-                print(f"Twilio error for {to}: {e.status} {e.code} {e.msg}")
-                log_sms_delivery(recipient=to, status="failed", error_message=e.msg, error_code=str(e.code))
-                total_failed += 1
-            except Exception as e:
-                print(f"Error for {to}: {e}")
-                log_sms_delivery(recipient=to, status="failed", error_message=str(e))
-                total_failed += 1
-
-    print(f"\nDone. Sent: {total_sent}, Failed: {total_failed}")
+
+def _is_retryable(e: TwilioRestException) -> bool:
+    return e.status == 429 or e.code in RATE_LIMIT_ERROR_CODES
+
+
+def _log_unknown(to: str, error: str, error_code: Optional[str] = None) -> None:
+    print(f"Outcome unknown for {to} ({error}); not retrying, to avoid a duplicate text")
+    log_sms_delivery(recipient=to, status="unknown", error_message=error, error_code=error_code)
+
+
+def send_one(client: Client, limiter: TokenBucket, to: str, body: str) -> bool:
+    """
+    Send one SMS, retrying rate-limit rejections. Returns True if sent.
+
+    Message creation takes no idempotency key, so a server error or a transport
+    failure may still have queued the text; those are logged as "unknown" and
+    not retried.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        limiter.acquire()
+        try:
+            msg = client.messages.create(
+                body=body,
+                to=to,
+                from_=FROM_NUMBER,
+            )
+            print(f"Sent to {to}, SID: {msg.sid}")
+            log_sms_delivery(recipient=to, status="sent", twilio_sid=msg.sid)
+            return True
+        except TwilioRestException as e:
+            if _is_retryable(e) and attempt < MAX_RETRIES:
+                delay = backoff_delay(attempt)
+                print(f"Twilio {e.status} {e.code} for {to}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            if (e.status or 0) >= 500:
+                _log_unknown(to, f"Twilio {e.status} {e.code} {e.msg}", str(e.code))
+                return False
+            print(f"Twilio error for {to}: {e.status} {e.code} {e.msg}")
+            log_sms_delivery(recipient=to, status="failed", error_message=e.msg, error_code=str(e.code))
+            return False
+        except Exception as e:
+            # Raised by the HTTP transport, possibly after Twilio received the request
+            _log_unknown(to, str(e))
+            return False
+    return False
+
+
+def send_text_messages(
+    messages_per_second: float = MESSAGES_PER_SECOND,
+    max_workers: int = MAX_WORKERS,
+    messages: Optional[List[SmsMessage]] = None,
+):
+    """
+    Text every reminder. `messages` comes from db_fetch's outbox when the
+    pipeline runs in-process; otherwise the CSVs in CSV_FOLDER are read.
+    """
+    client = Client(ACCOUNT_SID, AUTH_TOKEN)
+    limiter = TokenBucket(messages_per_second)
+
+    if messages is not None:
+        rows = [
+            {"phone_number": m.phone_number.strip(), "text_message": m.text_message.strip()}
+            for m in messages
+            if m.phone_number.strip() and m.text_message.strip()
+        ]
+    else:
+        rows = read_csv_folder()
+        if rows is None:
+            return
+
+    started = time.monotonic()
+    # Workers overlap Twilio round trips; the shared limiter keeps the account
+    # at its provisioned MPS. Delivery logs are committed in batches.
+    with buffered_delivery_logs():
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(
+                lambda row: send_one(client, limiter, row["phone_number"], row["text_message"]),
+                rows,
+            ))
+
+    elapsed = time.monotonic() - started
+    total_sent = sum(results)
+    total_failed = len(results) - total_sent
+    rate = total_sent / elapsed if elapsed > 0 else 0.0
+    print(f"\nDone. Sent: {total_sent}, Failed: {total_failed} "
+          f"in {elapsed:.1f}s ({rate:.2f} msg/s, limit {messages_per_second:g} msg/s)")
 
 
 if __name__ == "__main__":